@@ -1,10 +1,13 @@
 """Agent 工厂类"""
 
+from bi_agent.agent.agent_basics import AgentExecution, AgentState
 from bi_agent.agent.bi_agent import BIAgent
+from bi_agent.utils.llm_clients.caching_client import CachingLLMClient
 from bi_agent.utils.llm_clients.llm_client import LLMClient
 from bi_agent.utils.trajectory_recorder import TrajectoryRecorder
 from bi_agent.utils.console_output import ConsoleOutput
 from bi_agent.utils.memory_manager import MemoryConfig
+from bi_agent.utils.semantic_cache import SemanticTaskCache
 
 
 class Agent:
@@ -22,6 +25,8 @@ class Agent:
         user_id: str | None = None,
         session_id: str | None = None,
         clear_memory: bool = False,
+        enable_llm_cache: bool = False,
+        semantic_cache: SemanticTaskCache | None = None,
     ):
         """初始化 Agent
 
@@ -36,14 +41,21 @@ class Agent:
             user_id: 用户 ID（用于长期记忆）
             session_id: 会话 ID（用于短期记忆）
             clear_memory: 是否在执行任务前清空会话记忆
+            enable_llm_cache: 是否对完全相同的 LLM 请求启用响应缓存（默认关闭）。
+                缓存键不包含记忆消息，检索到的记忆不同时也可能复用之前的响应
+            semantic_cache: 语义任务缓存（可选，命中时直接复用相似任务的执行结果）
         """
+        if enable_llm_cache and not isinstance(llm_client, CachingLLMClient):
+            llm_client = CachingLLMClient(llm_client)
         self.llm_client = llm_client
         self.data_dir = data_dir
         self.output_dir = output_dir
         self.max_steps = max_steps
         self.clear_memory = clear_memory
+        self.semantic_cache = semantic_cache
 
-        # 设置轨迹记录器
+        # 设置轨迹记录器（未指定轨迹文件时按时间戳生成）
+        self._auto_trajectory_file = trajectory_file is None
         if trajectory_file is not None:
             self.trajectory_file = trajectory_file
             self.trajectory_recorder = TrajectoryRecorder(trajectory_file)
@@ -68,6 +80,17 @@ class Agent:
 
         self.agent.set_trajectory_recorder(self.trajectory_recorder)
 
+    def reset(self):
+        """复用 Agent 执行新任务前调用
+
+        每次任务的状态在 new_task 中重置；轨迹文件按时间戳自动生成时，为新任务创建新的
+        轨迹记录器，避免覆盖上一次任务的轨迹。
+        """
+        if self._auto_trajectory_file:
+            self.trajectory_recorder = TrajectoryRecorder()
+            self.trajectory_file = str(self.trajectory_recorder.trajectory_path)
+            self.agent.set_trajectory_recorder(self.trajectory_recorder)
+
     async def run(self, task: str, extra_args: dict[str, str] | None = None):
         """运行任务
 
@@ -92,6 +115,39 @@ class Agent:
                         step_number=0
                     )
         
+        # 查询语义任务缓存，命中时直接复用之前的执行结果
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(task, self.agent.data_dir, self.agent.output_dir)
+            if cached is not None:
+                if self.console_output:
+                    self.console_output.print_info(
+                        f"命中语义任务缓存，复用相似任务的执行结果：{cached.task}", step_number=0
+                    )
+                execution = AgentExecution(
+                    task=task,
+                    agent_state=AgentState.COMPLETED,
+                    success=True,
+                    final_result=cached.final_result,
+                    report_paths=list(cached.report_paths),
+                )
+                # 命中缓存也记录轨迹，便于追溯结果来源
+                self.trajectory_recorder.start_recording(
+                    task=task,
+                    provider="unknown",
+                    model="unknown",
+                    max_steps=self.max_steps,
+                    data_dir=self.data_dir,
+                    output_dir=self.output_dir,
+                )
+                self.trajectory_recorder.end_recording(
+                    success=True,
+                    final_result=cached.final_result,
+                    summary=f"命中语义任务缓存，复用任务：{cached.task}",
+                )
+                if self.console_output:
+                    self.console_output.print_summary(execution)
+                return execution
+
         # 开始记录轨迹
         self.trajectory_recorder.start_recording(
             task=task,
@@ -114,6 +170,16 @@ class Agent:
             final_result=execution.final_result,
         )
 
+        # 缓存成功的执行结果
+        if self.semantic_cache is not None and execution.success and execution.final_result:
+            self.semantic_cache.insert(
+                task,
+                execution.final_result,
+                self.agent.data_dir,
+                self.agent.output_dir,
+                report_paths=execution.report_paths,
+            )
+
         # 显示执行摘要
         if self.console_output:
             self.console_output.print_summary(execution)
@@ -1,10 +1,14 @@
 """Agent 基础数据类型"""
 
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
 
 from bi_agent.tools.base import ToolCall, ToolResult
-from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse, LLMUsage
+from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse, LLMResponseSummary, LLMUsage
+
+# 执行过程中在内存中保留的最近步骤数（完整轨迹由 TrajectoryRecorder 逐步写入磁盘）
+MAX_RETAINED_STEPS = 50
 
 
 class AgentState(Enum):
@@ -25,16 +29,20 @@ class AgentStepState(Enum):
     ERROR = "error"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentStep:
-    """表示 Agent 执行过程中的单个步骤"""
+    """表示 Agent 执行过程中的单个步骤
+
+    步骤处理完毕后 llm_response 会被替换为 LLMResponseSummary，tool_results 被清空，
+    完整内容保存在执行轨迹中。
+    """
 
     step_number: int
     state: AgentStepState
     thought: str | None = None
     tool_calls: list[ToolCall] | None = None
     tool_results: list[ToolResult] | None = None
-    llm_response: LLMResponse | None = None
+    llm_response: LLMResponse | LLMResponseSummary | None = None
     reflection: str | None = None
     error: str | None = None
     extra: dict[str, object] | None = None
@@ -48,14 +56,35 @@ class AgentStep:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentExecution:
-    """表示 Agent 的完整执行过程"""
+    """表示 Agent 的完整执行过程
+
+    steps 只保留最近 MAX_RETAINED_STEPS 个步骤，总步数见 step_count。
+    """
 
     task: str
-    steps: list[AgentStep]
+    steps: deque[AgentStep] = field(default_factory=lambda: deque(maxlen=MAX_RETAINED_STEPS))
     agent_state: AgentState = AgentState.IDLE
     success: bool = False
     final_result: str | None = None
     execution_time: float = 0.0
+    step_count: int = 0
+    # report_generator 工具成功生成的报告路径（按生成顺序）
+    report_paths: list[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        if not isinstance(self.steps, deque) or self.steps.maxlen is None:
+            self.steps = deque(self.steps, maxlen=MAX_RETAINED_STEPS)
+        self.step_count = max(self.step_count, len(self.steps))
+
+    def add_step(self, step: AgentStep) -> None:
+        """记录一个已完成的步骤"""
+        self.steps.append(step)
+        self.step_count += 1
+
+    @property
+    def last_step(self) -> AgentStep | None:
+        """最后一个步骤"""
+        return self.steps[-1] if self.steps else None
 
@@ -1,16 +1,62 @@
 """Agent 基类"""
 
 import asyncio
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Union, Optional
+from collections import deque
+from typing import AsyncIterator, Union, Optional
 
 from bi_agent.agent.agent_basics import AgentExecution, AgentState, AgentStep, AgentStepState
 from bi_agent.tools.base import Tool, ToolCall, ToolExecutor, ToolResult
-from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse
+from bi_agent.utils.llm_clients.llm_basics import (
+    MEMORY_CONTEXT_PREFIX,
+    MEMORY_MESSAGE_PREFIX,
+    LLMMessage,
+    LLMResponse,
+    LLMResponseSummary,
+)
 from bi_agent.utils.llm_clients.llm_client import LLMClient
 from bi_agent.utils.trajectory_recorder import TrajectoryRecorder
 from bi_agent.utils.console_output import ConsoleOutput
-from bi_agent.utils.memory_manager import MemoryManager, MemoryConfig
+from bi_agent.utils.json_utils import dumps
+from bi_agent.utils.memory_manager import BackgroundMemoryWriter, MemoryManager, MemoryConfig
+
+# 助手响应与上次记忆查询时的话题相似度（词集合 Jaccard）低于该值时重新查询相关记忆
+MEMORY_REFRESH_SIMILARITY = 0.3
+# 用于判断话题变化的响应前缀长度
+MEMORY_TOPIC_PREFIX_LEN = 200
+# 英文/数字按单词切分，中文按单字切分
+_TOPIC_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+|[\u4e00-\u9fff]")
+
+# 判断任务完成的关键词，预编译为一个正则，单次扫描响应内容（关键词均为中文，无需转小写）
+COMPLETION_KEYWORDS = ("完成", "已完成", "任务完成", "分析完成", "报告已生成")
+_COMPLETION_PATTERN = re.compile("|".join(map(re.escape, COMPLETION_KEYWORDS)))
+
+# 初始任务消息前缀（不计入最近交互）
+TASK_MESSAGE_PREFIX = "数据分析任务："
+# "最近对话"记忆消息前缀
+RECENT_INTERACTION_PREFIX = MEMORY_MESSAGE_PREFIX + " 最近对话]: "
+
+# 最近对话摘要中各类内容的预览长度
+CONTENT_PREVIEW_LEN = 300
+ARGUMENTS_PREVIEW_LEN = 200
+# 写入会话记忆的步骤响应长度
+STEP_MEMORY_PREVIEW_LEN = 500
+
+
+def _preview(obj: object, limit: int) -> str:
+    """生成截断后的预览文本，超出长度时以 "..." 结尾
+
+    字符串直接切片，不做额外转换；字典用 JSON 序列化，其他对象使用 repr。
+    """
+    if isinstance(obj, str):
+        text = obj
+    elif isinstance(obj, dict):
+        text = dumps(obj, default=str)
+    else:
+        text = repr(obj)
+    return text if len(text) <= limit else text[:limit] + "..."
 
 
 class BaseAgent(ABC):
@@ -45,6 +91,15 @@ class BaseAgent(ABC):
         self._initial_messages: list[LLMMessage] = []
         self._trajectory_recorder: TrajectoryRecorder | None = None
         self._console_output = console_output
+        # 最近的对话交互摘要（按时间顺序），用于生成"最近对话"记忆消息
+        self._recent_interactions: deque[dict[str, str]] = deque(maxlen=4)
+        # 任务开始时预取的相关记忆，话题明显变化时才在后台重新查询
+        self._cached_memories: list[LLMMessage] = []
+        # 上次查询相关记忆时使用的话题词集合，以及正在后台执行的记忆查询
+        self._memory_topic_tokens: frozenset[str] = frozenset()
+        self._memory_prefetch: asyncio.Task | None = None
+        # 已写入轨迹的消息数量，每一步只记录新增的消息
+        self._last_recorded_msg_idx: int = 0
         
         # 初始化记忆管理器
         self._memory_manager = MemoryManager(
@@ -52,6 +107,8 @@ class BaseAgent(ABC):
             user_id=user_id,
             session_id=session_id,
         )
+        # 记忆写入在后台批量执行，不阻塞 LLM 调用
+        self._memory_writer = BackgroundMemoryWriter(self._memory_manager)
 
     @property
     def llm_client(self) -> LLMClient:
@@ -88,14 +145,33 @@ class BaseAgent(ABC):
 
     async def execute_task(self) -> AgentExecution:
         """执行任务"""
-        import time
+        execution = AgentExecution(task=self._task)
+        async for _ in self.stream_steps(execution):
+            pass
+        return execution
+
+    async def stream_steps(self, execution: AgentExecution | None = None) -> AsyncIterator[AgentStep]:
+        """执行任务，每完成一个步骤就产出该步骤
 
-        start_time = time.time()
-        execution = AgentExecution(task=self._task, steps=[])
+        Args:
+            execution: 用于记录执行状态的对象（可选），执行结束后其中包含最终状态和结果
+        """
+        # 使用单调时钟计时，不受系统时间调整影响
+        start_time = time.perf_counter()
+        if execution is None:
+            execution = AgentExecution(task=self._task)
         step: AgentStep | None = None
 
         try:
-            messages = self._initial_messages
+            messages = list(self._initial_messages)
+            self._last_recorded_msg_idx = 0
+            self._recent_interactions.clear()
+            for msg in messages:
+                self._track_interaction(msg)
+            # 任务开始时按任务描述查询一次相关记忆，之后只在话题变化时后台刷新
+            self._cancel_memory_prefetch()
+            self._memory_topic_tokens = self._topic_tokens(self._task)
+            self._cached_memories = await self._fetch_relevant_memories(self._task, "任务开始") or []
             step_number = 1
             execution.agent_state = AgentState.RUNNING
 
@@ -109,15 +185,19 @@ class BaseAgent(ABC):
                 try:
                     messages = await self._run_llm_step(step, messages, execution)
                     await self._finalize_step(step, messages, execution)
-                    if execution.agent_state == AgentState.COMPLETED:
-                        break
-                    step_number += 1
                 except Exception as error:
                     execution.agent_state = AgentState.ERROR
                     step.state = AgentStepState.ERROR
                     step.error = str(error)
                     await self._finalize_step(step, messages, execution)
+                    yield step
+                    self._compact_step(step)
+                    break
+                yield step
+                self._compact_step(step)
+                if execution.agent_state == AgentState.COMPLETED:
                     break
+                step_number += 1
 
             if step_number > self._max_steps and not execution.success:
                 execution.final_result = "任务执行超过最大步数，未完成。"
@@ -128,10 +208,10 @@ class BaseAgent(ABC):
             execution.agent_state = AgentState.ERROR
 
         finally:
+            self._cancel_memory_prefetch()
+            await self._memory_writer.close()
             await self._close_tools()
-
-        execution.execution_time = time.time() - start_time
-        return execution
+            execution.execution_time = time.perf_counter() - start_time
 
     async def _run_llm_step(
         self, step: AgentStep, messages: list[LLMMessage], execution: AgentExecution
@@ -140,160 +220,60 @@ class BaseAgent(ABC):
         step.state = AgentStepState.THINKING
         step.thought = "正在思考..."
 
-        # 获取相关记忆并添加到消息中
-        memory_messages = []
-        
-        if self._task:
-            # 基于任务查询相关记忆
-            relevant_memories = self._memory_manager.get_relevant_memories(
-                query=self._task,
-                context="当前任务执行中",
-            )
-            if relevant_memories:
-                memory_messages.extend(relevant_memories)
-        
-        # 获取最近的对话交互作为记忆消息
-        # 包括：大模型响应、工具调用、工具结果
-        # 排除系统消息、记忆消息和初始任务消息
-        recent_interactions = []
-        
-        # 从后往前遍历消息，收集最近的交互
-        for msg in reversed(messages):
-            # 排除系统消息和记忆消息
-            if msg.role == "system" and msg.content and msg.content.startswith("[记忆 -"):
-                continue
-            
-            # 排除初始任务消息
-            if msg.role == "user" and msg.content and msg.content.startswith("数据分析任务："):
-                continue
-            
-            # 优先检查工具结果消息（role 是 "user" 但包含 tool_result）
-            if msg.tool_result:
-                tool_result = msg.tool_result
-                result_parts = []
-                
-                result_parts.append(f"工具 {tool_result.name} 执行结果")
-                if tool_result.success:
-                    if tool_result.result:
-                        result_preview = str(tool_result.result)
-                        if len(result_preview) > 300:
-                            result_preview = result_preview[:300] + "..."
-                        result_parts.append(f"成功: {result_preview}")
-                    else:
-                        result_parts.append("成功（无返回内容）")
-                else:
-                    error_preview = str(tool_result.error) if tool_result.error else "未知错误"
-                    if len(error_preview) > 300:
-                        error_preview = error_preview[:300] + "..."
-                    result_parts.append(f"失败: {error_preview}")
-                
-                recent_interactions.append({
-                    "role": "tool_result",
-                    "content": " | ".join(result_parts)
-                })
-            
-            # 收集 assistant 消息（包含响应和工具调用）
-            elif msg.role == "assistant":
-                interaction_parts = []
-                
-                # 添加响应内容
-                if msg.content:
-                    content_preview = msg.content[:300] + "..." if len(msg.content) > 300 else msg.content
-                    interaction_parts.append(f"响应: {content_preview}")
-                
-                # 添加工具调用信息
-                if msg.tool_calls:
-                    tool_calls_info = []
-                    for tool_call in msg.tool_calls:
-                        tool_info = f"调用工具 {tool_call.name}"
-                        if tool_call.arguments:
-                            # 简化参数显示（只显示关键参数）
-                            args_str = str(tool_call.arguments)
-                            if len(args_str) > 200:
-                                args_str = args_str[:200] + "..."
-                            tool_info += f" (参数: {args_str})"
-                        tool_calls_info.append(tool_info)
-                    interaction_parts.append(f"工具调用: {'; '.join(tool_calls_info)}")
-                elif msg.tool_call:  # 向后兼容
-                    tool_info = f"调用工具 {msg.tool_call.name}"
-                    if msg.tool_call.arguments:
-                        args_str = str(msg.tool_call.arguments)
-                        if len(args_str) > 200:
-                            args_str = args_str[:200] + "..."
-                        tool_info += f" (参数: {args_str})"
-                    interaction_parts.append(f"工具调用: {tool_info}")
-                
-                if interaction_parts:
-                    recent_interactions.append({
-                        "role": "assistant",
-                        "content": " | ".join(interaction_parts)
-                    })
-            
-            # 收集用户消息（非初始任务，且不是工具结果消息）
-            elif msg.role == "user" and msg.content and not msg.tool_result:
-                content_preview = msg.content[:300] + "..." if len(msg.content) > 300 else msg.content
-                recent_interactions.append({
-                    "role": "user",
-                    "content": content_preview
-                })
-            
-            # 收集足够的交互（最近的两条完整交互：assistant + tool_result，或 user + assistant）
-            # 我们收集最近的 2-4 条消息，确保包含完整的交互循环
-            if len(recent_interactions) >= 4:
-                break
-        
-        # 反转列表，恢复时间顺序
-        recent_interactions.reverse()
-        
-        # 将最近的交互转换为记忆消息
-        if recent_interactions:
-            # 只取最后两条交互（避免记忆过长）
-            for interaction in recent_interactions[-2:]:
-                memory_msg = LLMMessage(
-                    role="system",
-                    content=f"[记忆 - 最近对话]: {interaction['role']}: {interaction['content']}",
-                )
-                memory_messages.append(memory_msg)
-        
-        # 将记忆消息添加到消息列表中
-        if memory_messages:
-            # 先移除之前添加的记忆消息（避免重复累积）
-            # 记忆消息的特征：role="system" 且 content 以 "[记忆 -" 开头
-            messages = [
-                msg for msg in messages 
-                if not (msg.role == "system" and msg.content and msg.content.startswith("[记忆 -"))
-            ]
-            
-            # 找到系统消息的位置
-            system_idx = -1
-            for i, msg in enumerate(messages):
-                if msg.role == "system":
-                    system_idx = i
-                    break
-            
-            if system_idx >= 0:
-                # 在系统消息后插入记忆消息
-                messages = messages[:system_idx+1] + memory_messages + messages[system_idx+1:]
-            else:
-                # 如果没有系统消息，添加到开头
-                messages = memory_messages + messages
+        # 未配置记忆后端时跳过整个记忆处理
+        memory_context = None
+        if self._memory_manager.enabled:
+            # 获取相关记忆并添加到消息中
+            memory_messages = []
+
+            # 基于任务的相关记忆（任务开始时预取，话题变化时后台刷新，未完成时沿用上次结果）
+            self._collect_memory_prefetch()
+            if self._cached_memories:
+                memory_messages.extend(self._cached_memories)
+
+            # 最近的对话交互（大模型响应、工具调用、工具结果）在追加消息时增量维护，
+            # 不再每一步反向扫描整个消息历史
+            recent_interactions = list(self._recent_interactions)
+
+            # 将最近的交互转换为记忆消息
+            if recent_interactions:
+                # 只取最后两条交互（避免记忆过长）
+                for interaction in recent_interactions[-2:]:
+                    memory_msg = LLMMessage(
+                        role="system",
+                        content="".join(
+                            (RECENT_INTERACTION_PREFIX, interaction["role"], ": ", interaction["content"])
+                        ),
+                    )
+                    memory_messages.append(memory_msg)
 
-        # 显示 LLM 输入
-        if self._console_output:
-            self._console_output.print_llm_input(messages, step.step_number)
+            # 将记忆合并为一条临时的用户消息追加在消息末尾，只在本次 LLM 调用期间存在。
+            # 这样消息前缀（系统消息、任务消息和历史对话）在各步骤之间保持字节级一致，
+            # 服务端的前缀缓存（KV cache）可以复用，只需重新计算末尾部分
+            memory_context = self._build_memory_context(memory_messages)
+        if memory_context is not None:
+            messages.append(memory_context)
 
-        # 调用 LLM
         try:
-            response: LLMResponse = await self._llm_client.chat(messages, tools=self._tools)
-        except Exception as e:
-            # 捕获 LLM 调用错误
-            step.state = AgentStepState.ERROR
-            step.error = f"LLM 调用失败: {str(e)}"
-            execution.agent_state = AgentState.ERROR
-            execution.final_result = f"LLM 调用失败: {str(e)}"
+            # 显示 LLM 输入
             if self._console_output:
-                self._console_output.print_error(str(e), step.step_number)
-            raise
+                self._console_output.print_llm_input(messages, step.step_number)
+
+            # 调用 LLM
+            try:
+                response: LLMResponse = await self._llm_client.chat(messages, tools=self._tools)
+            except Exception as e:
+                # 捕获 LLM 调用错误
+                step.state = AgentStepState.ERROR
+                step.error = f"LLM 调用失败: {str(e)}"
+                execution.agent_state = AgentState.ERROR
+                execution.final_result = f"LLM 调用失败: {str(e)}"
+                if self._console_output:
+                    self._console_output.print_error(str(e), step.step_number)
+                raise
+        finally:
+            if memory_context is not None:
+                messages.pop()
         
         step.llm_response = response
         step.llm_usage = response.usage
@@ -302,6 +282,8 @@ class BaseAgent(ABC):
         if self._console_output:
             self._console_output.print_llm_output(response, step.step_number)
 
+        self._refresh_memories_on_topic_change(response.content)
+
         # 将 assistant 的响应添加到消息历史（保留之前的消息）
         # 如果有工具调用，需要包含工具调用信息
         if response.tool_calls:
@@ -314,20 +296,23 @@ class BaseAgent(ABC):
             )
             # 将 assistant 响应添加到消息历史（保留之前的消息）
             messages.append(assistant_message)
+            self._track_interaction(assistant_message)
             # 添加到记忆管理器
-            self._memory_manager.add_message(assistant_message)
+            self._memory_writer.add_message(assistant_message)
             
             # 处理工具调用，获取工具结果
             tool_result_messages = await self._tool_call_handler(response.tool_calls, step)
             # 将工具结果添加到消息历史
             messages.extend(tool_result_messages)
+            for tool_result_msg in tool_result_messages:
+                self._track_interaction(tool_result_msg)
             
             # 将工具结果添加到记忆管理器，并检查是否有 task_done 工具调用
             task_done_called = False
             task_done_summary = ""
             
             for tool_result_msg in tool_result_messages:
-                self._memory_manager.add_message(tool_result_msg)
+                self._memory_writer.add_message(tool_result_msg)
                 # 如果工具执行成功，将结果添加到短期记忆
                 if tool_result_msg.tool_result and tool_result_msg.tool_result.success:
                     tool_name = tool_result_msg.tool_result.name
@@ -346,8 +331,16 @@ class BaseAgent(ABC):
                                 if summary:
                                     task_done_summary = str(summary)
                                     break
+                    elif tool_name == "report_generator":
+                        # 记录报告路径，调用方无需再扫描输出目录查找报告
+                        for tool_call in response.tool_calls:
+                            if tool_call.call_id == tool_result_msg.tool_result.call_id and tool_call.arguments:
+                                output_path = tool_call.arguments.get("output_path")
+                                if output_path:
+                                    execution.report_paths.append(str(output_path))
+                                break
                     
-                    self._memory_manager.add_memory(
+                    self._memory_writer.add_memory(
                         content=f"工具 {tool_name} 执行结果: {tool_result}",
                         memory_type="session",
                         metadata={
@@ -362,7 +355,7 @@ class BaseAgent(ABC):
                 execution.success = True
                 execution.final_result = task_done_summary or "任务已完成"
                 # 将任务完成信息添加到长期记忆
-                self._memory_manager.add_memory(
+                self._memory_writer.add_memory(
                     content=f"任务完成: {self._task}\n总结: {task_done_summary}",
                     memory_type="user",
                     metadata={"task": self._task, "status": "completed"},
@@ -371,8 +364,9 @@ class BaseAgent(ABC):
             # 没有工具调用，添加 assistant 响应到消息历史（保留之前的消息）
             assistant_message = LLMMessage(role="assistant", content=response.content)
             messages.append(assistant_message)
+            self._track_interaction(assistant_message)
             # 添加到记忆管理器
-            self._memory_manager.add_message(assistant_message)
+            self._memory_writer.add_message(assistant_message)
             
             # 检查是否完成任务
             if self._is_task_complete(response.content):
@@ -380,7 +374,7 @@ class BaseAgent(ABC):
                 execution.success = True
                 execution.final_result = response.content
                 # 将任务完成信息添加到长期记忆
-                self._memory_manager.add_memory(
+                self._memory_writer.add_memory(
                     content=f"任务完成: {self._task}\n结果: {response.content}",
                     memory_type="user",
                     metadata={"task": self._task, "status": "completed"},
@@ -388,6 +382,163 @@ class BaseAgent(ABC):
 
         return messages
 
+    async def _fetch_relevant_memories(self, query: str, context: str) -> list[LLMMessage] | None:
+        """在线程池中查询相关记忆（mem0 查询为同步的网络/向量检索调用）
+
+        Returns:
+            相关记忆消息列表；查询失败时返回 None
+        """
+        if not query or not self._memory_manager.enabled:
+            return []
+        try:
+            return await asyncio.to_thread(
+                self._memory_manager.get_relevant_memories,
+                query=query,
+                context=context,
+            )
+        except Exception as e:
+            print(f"警告：查询相关记忆失败: {e}")
+            return None
+
+    def _refresh_memories_on_topic_change(self, content: str | None) -> None:
+        """助手响应的话题与上次查询时差异较大时，在后台按新话题查询相关记忆
+
+        查询结果由下一步的 _collect_memory_prefetch 取用，不阻塞当前步骤。
+        """
+        if not content or not self._memory_manager.enabled:
+            return
+        if self._memory_prefetch is not None:
+            # 上一次刷新尚未被取用，不重复查询
+            return
+        topic = content[:MEMORY_TOPIC_PREFIX_LEN]
+        tokens = self._topic_tokens(topic)
+        if not tokens:
+            return
+        union = tokens | self._memory_topic_tokens
+        similarity = len(tokens & self._memory_topic_tokens) / len(union)
+        if similarity >= MEMORY_REFRESH_SIMILARITY:
+            return
+        # 基准只在发起查询时更新，与上次查询所用的话题比较，而不是与上一条响应比较
+        self._memory_topic_tokens = tokens
+        self._memory_prefetch = asyncio.create_task(
+            self._fetch_relevant_memories(topic, "当前任务执行中")
+        )
+
+    def _collect_memory_prefetch(self) -> None:
+        """取用已完成的后台记忆查询结果（查询失败时保留原有记忆）"""
+        prefetch = self._memory_prefetch
+        if prefetch is None or not prefetch.done():
+            return
+        self._memory_prefetch = None
+        if prefetch.cancelled():
+            return
+        memories = prefetch.result()
+        if memories is not None:
+            self._cached_memories = memories
+
+    def _cancel_memory_prefetch(self) -> None:
+        """取消尚未完成的后台记忆查询"""
+        if self._memory_prefetch is not None:
+            self._memory_prefetch.cancel()
+            self._memory_prefetch = None
+
+    @staticmethod
+    def _topic_tokens(text: str) -> frozenset[str]:
+        """提取用于比较话题的词集合"""
+        return frozenset(token.lower() for token in _TOPIC_TOKEN_PATTERN.findall(text))
+
+    @staticmethod
+    def _build_memory_context(memory_messages: list[LLMMessage]) -> LLMMessage | None:
+        """将记忆消息合并为一条追加在消息末尾的用户消息"""
+        if not memory_messages:
+            return None
+        return LLMMessage(
+            role="user",
+            content=MEMORY_CONTEXT_PREFIX + "\n" + "\n".join(msg.content for msg in memory_messages if msg.content),
+        )
+
+    def _track_interaction(self, msg: LLMMessage) -> None:
+        """记录追加到消息历史中的一条交互"""
+        if not self._memory_manager.enabled:
+            return
+        interaction = self._summarize_interaction(msg)
+        if interaction is not None:
+            self._recent_interactions.append(interaction)
+
+    @staticmethod
+    def _summarize_interaction(msg: LLMMessage) -> dict[str, str] | None:
+        """将消息转换为交互摘要
+
+        排除系统消息、记忆消息和初始任务消息，返回 None 表示该消息不计入最近交互。
+        """
+        # 排除系统消息和记忆消息
+        if msg.is_memory:
+            return None
+        
+        # 排除初始任务消息
+        if msg.role == "user" and msg.content and msg.content.startswith(TASK_MESSAGE_PREFIX):
+            return None
+        
+        # 优先检查工具结果消息（role 是 "user" 但包含 tool_result）
+        if msg.tool_result:
+            tool_result = msg.tool_result
+            result_parts = []
+            
+            result_parts.append(f"工具 {tool_result.name} 执行结果")
+            if tool_result.success:
+                if tool_result.result:
+                    result_parts.append(f"成功: {_preview(tool_result.result, CONTENT_PREVIEW_LEN)}")
+                else:
+                    result_parts.append("成功（无返回内容）")
+            else:
+                error_preview = _preview(tool_result.error, CONTENT_PREVIEW_LEN) if tool_result.error else "未知错误"
+                result_parts.append(f"失败: {error_preview}")
+            
+            return {
+                "role": "tool_result",
+                "content": " | ".join(result_parts)
+            }
+        
+        # 收集 assistant 消息（包含响应和工具调用）
+        if msg.role == "assistant":
+            interaction_parts = []
+            
+            # 添加响应内容
+            if msg.content:
+                interaction_parts.append(f"响应: {_preview(msg.content, CONTENT_PREVIEW_LEN)}")
+            
+            # 添加工具调用信息
+            if msg.tool_calls:
+                tool_calls_info = []
+                for tool_call in msg.tool_calls:
+                    tool_info = f"调用工具 {tool_call.name}"
+                    if tool_call.arguments:
+                        # 简化参数显示（只显示关键参数）
+                        tool_info += f" (参数: {_preview(tool_call.arguments, ARGUMENTS_PREVIEW_LEN)})"
+                    tool_calls_info.append(tool_info)
+                interaction_parts.append(f"工具调用: {'; '.join(tool_calls_info)}")
+            elif msg.tool_call:  # 向后兼容
+                tool_info = f"调用工具 {msg.tool_call.name}"
+                if msg.tool_call.arguments:
+                    tool_info += f" (参数: {_preview(msg.tool_call.arguments, ARGUMENTS_PREVIEW_LEN)})"
+                interaction_parts.append(f"工具调用: {tool_info}")
+            
+            if not interaction_parts:
+                return None
+            return {
+                "role": "assistant",
+                "content": " | ".join(interaction_parts)
+            }
+        
+        # 收集用户消息（非初始任务，且不是工具结果消息）
+        if msg.role == "user" and msg.content:
+            return {
+                "role": "user",
+                "content": _preview(msg.content, CONTENT_PREVIEW_LEN)
+            }
+        
+        return None
+
     async def _tool_call_handler(
         self, tool_calls: list[ToolCall] | None, step: AgentStep
     ) -> list[LLMMessage]:
@@ -402,8 +553,8 @@ class BaseAgent(ABC):
         step.state = AgentStepState.CALLING_TOOL
         step.tool_calls = tool_calls
 
-        # 执行工具调用（顺序执行）
-        tool_results = await self._tool_caller.sequential_tool_call(tool_calls)
+        # 执行工具调用（相互独立的调用并发执行，结果顺序与调用顺序一致）
+        tool_results = await self._tool_caller.parallel_tool_call(tool_calls)
         step.tool_results = tool_results
 
         # 显示工具执行结果
@@ -422,21 +573,23 @@ class BaseAgent(ABC):
         if not content:
             return False
         # 简单的完成判断逻辑，可以根据需要扩展
-        completion_keywords = ["完成", "已完成", "任务完成", "分析完成", "报告已生成"]
-        content_lower = content.lower()
-        return any(keyword in content_lower for keyword in completion_keywords)
+        return _COMPLETION_PATTERN.search(content) is not None
 
     async def _finalize_step(
         self, step: AgentStep, messages: list[LLMMessage], execution: AgentExecution
     ) -> None:
         """完成步骤，记录轨迹"""
-        execution.steps.append(step)
+        execution.add_step(step)
 
         if self._trajectory_recorder:
+            # 消息历史只追加不修改，只记录上一步之后新增的消息，避免每步重复序列化完整历史
+            new_messages = messages[self._last_recorded_msg_idx:]
+            self._last_recorded_msg_idx = len(messages)
             self._trajectory_recorder.record_agent_step(
                 step_number=step.step_number,
                 state=step.state.name,
-                llm_messages=messages,
+                llm_messages=new_messages,
+                is_delta=True,
                 llm_response=step.llm_response,
                 tool_calls=step.tool_calls,
                 tool_results=step.tool_results,
@@ -447,8 +600,8 @@ class BaseAgent(ABC):
         # 将步骤的关键信息添加到记忆
         if step.llm_response and step.llm_response.content:
             # 提取关键信息
-            key_info = step.llm_response.content[:500]  # 前500字符
-            self._memory_manager.add_memory(
+            key_info = step.llm_response.content[:STEP_MEMORY_PREVIEW_LEN]
+            self._memory_writer.add_memory(
                 content=f"步骤 {step.step_number}: {key_info}",
                 memory_type="session",
                 metadata={
@@ -457,6 +610,13 @@ class BaseAgent(ABC):
                 },
             )
 
+    @staticmethod
+    def _compact_step(step: AgentStep) -> None:
+        """释放已处理步骤中的大对象（完整内容已写入轨迹）"""
+        if step.llm_response is not None:
+            step.llm_response = LLMResponseSummary.from_response(step.llm_response)
+        step.tool_results = None
+
     async def _close_tools(self):
         """关闭工具"""
         await self._tool_caller.close_tools()
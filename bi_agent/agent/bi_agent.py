@@ -1,10 +1,11 @@
 """BI-Agent 实现"""
 
+from functools import lru_cache
 from pathlib import Path
 
 from bi_agent.utils.typing_compat import override
 
-from bi_agent.agent.base_agent import BaseAgent
+from bi_agent.agent.base_agent import TASK_MESSAGE_PREFIX, BaseAgent
 from bi_agent.prompts.system_prompt import BI_AGENT_SYSTEM_PROMPT
 from bi_agent.tools.base import Tool
 from bi_agent.tools.bash_tool import BashTool
@@ -17,6 +18,64 @@ from bi_agent.utils.llm_clients.llm_client import LLMClient
 from bi_agent.utils.system_info import get_system_info
 
 
+# 系统提示词消息在所有任务间保持不变，共享同一个实例
+_SYSTEM_MESSAGE = LLMMessage(role="system", content=BI_AGENT_SYSTEM_PROMPT)
+
+
+@lru_cache(maxsize=1)
+def _cached_system_info() -> str:
+    """获取系统环境信息（进程内只采集一次）"""
+    return get_system_info()
+
+
+@lru_cache(maxsize=64)
+def _task_context(data_dir: Path, output_dir: Path) -> str:
+    """构建用户任务消息中除任务描述之外的部分
+
+    这部分只依赖系统环境信息和数据/输出目录，按目录缓存。
+    """
+    system_info = _cached_system_info()
+    return f"""
+
+## 环境信息
+{system_info}
+
+## 工作目录
+数据目录：{data_dir}
+输出目录：{output_dir}
+
+请按照以下步骤完成分析：
+1. 首先使用 `bash` 工具执行 `ls {data_dir}` 命令，扫描数据目录，了解有哪些数据文件
+2. 读取说明文件（如果有），理解数据结构和业务含义
+3. 使用 `python_executor` 工具编写 Python 代码读取数据文件，了解数据基本信息
+   - 数据目录路径：{data_dir}（在代码中使用 DATA_DIR 变量）
+   - 输出目录路径：{output_dir}（在代码中使用 OUTPUT_DIR 变量）
+   - 可以使用 pandas 读取 Excel/CSV：`pd.read_excel(f'{{DATA_DIR}}/文件名.xlsx')` 或 `pd.read_csv(f'{{DATA_DIR}}/文件名.csv')`
+4. 根据需求使用 `python_executor` 工具编写代码进行数据清洗（处理缺失值、重复值、异常值等）
+5. 使用 `python_executor` 工具编写代码进行数据分析和可视化
+   - 可以使用 matplotlib 生成图表：`plt.figure()`, `plt.plot()`, `plt.bar()` 等
+   - 图表保存到输出目录：`plt.savefig(f'{{OUTPUT_DIR}}/图表名称.png')`
+6. 使用 `report_generator` 工具生成分析报告
+7. **任务完成时，必须调用 `task_done` 工具**，在 summary 参数中提供任务完成总结
+
+**重要约束 - 必须在数据目录及其子目录下操作：**
+- **数据目录（所有操作必须在此目录及其子目录下）**：{data_dir}
+- **输出目录**：{output_dir}
+- **严禁修改或删除原始数据文件**
+- **使用 bash 工具时**：
+  - ✅ **正确**：
+    - `ls {data_dir}` - 列出数据目录内容
+    - `cat {data_dir}/README.md` - 读取数据目录下的文件
+    - `find {data_dir} -name "*.csv"` - 在数据目录下查找文件
+    - `ls {data_dir}/example` - 列出数据目录子目录内容
+    - `cat {data_dir}/example/sales_data.csv` - 读取子目录下的文件
+  - ❌ **错误**：`ls`、`ls -la`、`pwd`、`cat README.md`（这些会在当前工作目录执行，不是数据目录）
+  - ❌ **禁止**：不要使用数据目录外的路径
+- **所有文件路径必须使用绝对路径，且路径必须在数据目录或其子目录下**
+- 如果文件不存在，工具会列出数据目录下可用的文件，请使用列出的文件路径
+"""
+
+
 class BIAgent(BaseAgent):
     """BI-Agent：数据分析智能代理"""
 
@@ -86,52 +145,11 @@ class BIAgent(BaseAgent):
         """创建新任务"""
         self._task = task
 
-        # 构建初始消息
-        system_message = LLMMessage(role="system", content=BI_AGENT_SYSTEM_PROMPT)
-
-        # 获取系统环境信息
-        system_info = get_system_info()
-
-        # 构建用户消息
-        user_content = f"""数据分析任务：{task}
-
-## 环境信息
-{system_info}
-
-## 工作目录
-数据目录：{self.data_dir}
-输出目录：{self.output_dir}
-
-请按照以下步骤完成分析：
-1. 首先使用 `bash` 工具执行 `ls {self.data_dir}` 命令，扫描数据目录，了解有哪些数据文件
-2. 读取说明文件（如果有），理解数据结构和业务含义
-3. 使用 `python_executor` 工具编写 Python 代码读取数据文件，了解数据基本信息
-   - 数据目录路径：{self.data_dir}（在代码中使用 DATA_DIR 变量）
-   - 输出目录路径：{self.output_dir}（在代码中使用 OUTPUT_DIR 变量）
-   - 可以使用 pandas 读取 Excel/CSV：`pd.read_excel(f'{{DATA_DIR}}/文件名.xlsx')` 或 `pd.read_csv(f'{{DATA_DIR}}/文件名.csv')`
-4. 根据需求使用 `python_executor` 工具编写代码进行数据清洗（处理缺失值、重复值、异常值等）
-5. 使用 `python_executor` 工具编写代码进行数据分析和可视化
-   - 可以使用 matplotlib 生成图表：`plt.figure()`, `plt.plot()`, `plt.bar()` 等
-   - 图表保存到输出目录：`plt.savefig(f'{{OUTPUT_DIR}}/图表名称.png')`
-6. 使用 `report_generator` 工具生成分析报告
-7. **任务完成时，必须调用 `task_done` 工具**，在 summary 参数中提供任务完成总结
+        # 构建初始消息（系统消息在所有任务间共享同一个实例）
+        system_message = _SYSTEM_MESSAGE
 
-**重要约束 - 必须在数据目录及其子目录下操作：**
-- **数据目录（所有操作必须在此目录及其子目录下）**：{self.data_dir}
-- **输出目录**：{self.output_dir}
-- **严禁修改或删除原始数据文件**
-- **使用 bash 工具时**：
-  - ✅ **正确**：
-    - `ls {self.data_dir}` - 列出数据目录内容
-    - `cat {self.data_dir}/README.md` - 读取数据目录下的文件
-    - `find {self.data_dir} -name "*.csv"` - 在数据目录下查找文件
-    - `ls {self.data_dir}/example` - 列出数据目录子目录内容
-    - `cat {self.data_dir}/example/sales_data.csv` - 读取子目录下的文件
-  - ❌ **错误**：`ls`、`ls -la`、`pwd`、`cat README.md`（这些会在当前工作目录执行，不是数据目录）
-  - ❌ **禁止**：不要使用数据目录外的路径
-- **所有文件路径必须使用绝对路径，且路径必须在数据目录或其子目录下**
-- 如果文件不存在，工具会列出数据目录下可用的文件，请使用列出的文件路径
-"""
+        # 构建用户消息（除任务描述外的部分按目录缓存）
+        user_content = "".join((TASK_MESSAGE_PREFIX, task, _task_context(self.data_dir, self.output_dir)))
 
         if extra_args:
             for key, value in extra_args.items():
@@ -4,7 +4,7 @@
 """
 
 from bi_agent.channel.channel_factory import ChannelFactory
-from bi_agent.channel.channel import ApiClientBase, ReportReplyBase, ChannelServerBase
+from bi_agent.channel.channel import ApiClientBase, ReportReplyBase, ChannelServerBase, MultipartFileBody
 from bi_agent.channel.common import UserManager, TaskHandler, MessageQueue, MessageTask, UserFileInfo
 
 __all__ = [
@@ -12,6 +12,7 @@ __all__ = [
     'ApiClientBase',
     'ReportReplyBase',
     'ChannelServerBase',
+    'MultipartFileBody',
     'UserManager',
     'TaskHandler',
     'MessageQueue',
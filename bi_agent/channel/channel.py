@@ -1,15 +1,204 @@
 """Channel 基础接口和抽象类"""
 
+import asyncio
+import io
 import logging
+import os
+import uuid
+import weakref
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
 
+class MultipartFileBody:
+    """流式 multipart/form-data 请求体（单个文件 + 普通表单字段）
+
+    requests 的 files= 参数会先把整个文件读入内存再拼接成请求体；这里只在内存中保留
+    表单头和结尾，文件内容在发送时按块读取。提供 __len__，requests 会据此设置 Content-Length。
+    """
+
+    def __init__(self, fields: Dict[str, str], file_field: str, file_path: Path, content_type: str):
+        """初始化请求体
+
+        Args:
+            fields: 普通表单字段
+            file_field: 文件字段名
+            file_path: 文件路径
+            content_type: 文件的 MIME 类型
+        """
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        head = io.StringIO()
+        for name, value in fields.items():
+            head.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n')
+        filename = file_path.name.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+        head.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        head_bytes = head.getvalue().encode("utf-8")
+        tail_bytes = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        self._file = open(file_path, "rb")
+        self._parts = [io.BytesIO(head_bytes), self._file, io.BytesIO(tail_bytes)]
+        self._length = len(head_bytes) + os.fstat(self._file.fileno()).st_size + len(tail_bytes)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        """按顺序从表单头、文件和结尾读取"""
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        """关闭文件"""
+        self._file.close()
+
+    def __enter__(self) -> "MultipartFileBody":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class ApiClientBase(ABC):
-    """API 客户端基类"""
+    """API 客户端基类
+
+    所有 HTTP 请求应通过 ``self._session`` 发出，复用同一个长连接池，
+    避免每次调用都重新进行 DNS 解析、TCP 和 TLS 握手。
+    """
+
+    # 连接池配置
+    POOL_CONNECTIONS = 32
+    POOL_MAXSIZE = 64
+    MAX_RETRIES = 3
+    # 限流和服务端临时错误时自动重试（urllib3 默认只对幂等方法按状态码重试，POST 不会被重复发送）
+    RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+    # 并发上传图片的最大数量
+    UPLOAD_CONCURRENCY = 5
+    # 异步流式下载的分块大小
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        """初始化 HTTP 会话和连接池"""
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            max_retries=Retry(
+                total=self.MAX_RETRIES,
+                backoff_factor=0.2,
+                status_forcelist=self.RETRY_STATUS_FORCELIST,
+                # 重试耗尽后返回最后一次响应，由调用方按状态码处理
+                raise_on_status=False,
+            ),
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # 异步 HTTP 客户端绑定事件循环，每个事件循环各用一个
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def close(self):
+        """关闭 HTTP 会话，释放连接池
+
+        异步客户端只能在所属事件循环中关闭，这里只释放引用，连接随事件循环一起释放。
+        """
+        self._session.close()
+        self._async_clients.clear()
+
+    async def download_file_async(
+        self,
+        file_key: str,
+        save_path: Path,
+        message_id: Optional[str] = None,
+        resource_type: str = "file",
+        **kwargs,
+    ) -> Path:
+        """异步下载文件
+
+        默认在线程中执行 download_file；子类可以改为流式下载，边接收边写盘。
+        参数同 download_file。
+        """
+        return await asyncio.to_thread(
+            self.download_file, file_key, save_path, message_id=message_id, resource_type=resource_type, **kwargs
+        )
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环的异步 HTTP 客户端"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.POOL_MAXSIZE, keepalive_expiry=75),
+                timeout=30,
+                # 与同步下载（requests）一致跟随重定向，签名下载地址可能返回 3xx
+                follow_redirects=True,
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def _stream_to_file(
+        self,
+        url: str,
+        save_path: Path,
+        headers: Optional[Dict[str, str]] = None,
+        on_error=None,
+    ) -> Path:
+        """流式下载到文件
+
+        Args:
+            url: 下载地址
+            save_path: 保存路径
+            headers: 请求头（可选）
+            on_error: HTTP 状态码不是 200 时调用的函数 ``(status_code, body)``，可以抛出平台特定的异常
+
+        Returns:
+            保存的文件路径
+        """
+        client = self._get_async_client()
+        async with client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code != 200:
+                body = await resp.aread()
+                if on_error is not None:
+                    on_error(resp.status_code, body)
+                resp.raise_for_status()
+
+            save_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(save_path, "wb") as f:
+                # 已知文件大小时预先分配磁盘空间，减少碎片
+                content_length = resp.headers.get("Content-Length")
+                if content_length and hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(f.fileno(), 0, int(content_length))
+                    except (OSError, ValueError):
+                        pass
+                async for chunk in resp.aiter_bytes(self.DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                # 内容经过压缩传输时实际大小可能小于 Content-Length
+                f.truncate(f.tell())
+
+        logger.info(f"文件已下载: {save_path} (大小: {save_path.stat().st_size} bytes)")
+        return save_path
 
     @abstractmethod
     def send_text_message(
@@ -37,6 +226,32 @@ class ApiClientBase(ABC):
         """发送富文本消息"""
         pass
 
+    async def send_rich_text_message_async(
+        self,
+        receive_id_type: str,
+        receive_id: str,
+        content: Dict[str, Any],
+        message_id: Optional[str] = None,
+        is_group: bool = False,
+        session_webhook: Optional[str] = None,
+        **kwargs,
+    ):
+        """异步发送富文本消息
+
+        默认在线程中执行 send_rich_text_message，避免阻塞事件循环；子类可以改为原生异步请求。
+        参数同 send_rich_text_message。
+        """
+        return await asyncio.to_thread(
+            self.send_rich_text_message,
+            receive_id_type,
+            receive_id,
+            content,
+            message_id=message_id,
+            is_group=is_group,
+            session_webhook=session_webhook,
+            **kwargs,
+        )
+
     @abstractmethod
     def download_file(
         self,
@@ -53,6 +268,27 @@ class ApiClientBase(ABC):
         """上传图片并获取 image_key"""
         pass
 
+    async def upload_images(self, image_paths: List[Path]) -> List[Union[str, Exception]]:
+        """并发上传多张图片
+
+        Args:
+            image_paths: 图片文件路径列表
+
+        Returns:
+            与 image_paths 一一对应的 image_key；上传失败的位置为对应的异常
+        """
+        # 限制同时进行的上传数量，避免触发平台限流
+        semaphore = asyncio.Semaphore(self.UPLOAD_CONCURRENCY)
+
+        async def upload(image_path: Path) -> str:
+            async with semaphore:
+                return await asyncio.to_thread(self.upload_image, image_path)
+
+        return await asyncio.gather(
+            *(upload(image_path) for image_path in image_paths),
+            return_exceptions=True,
+        )
+
 
 class ReportReplyBase(ABC):
     """报告回复基类"""
@@ -86,10 +322,62 @@ class ReportReplyBase(ABC):
         pass
 
     @abstractmethod
-    def _build_rich_text_content(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_rich_text_content(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None) -> Dict[str, Any]:
         """构建富文本消息内容（平台特定格式）"""
         pass
 
+    def _resolve_image_path(self, image_url: str, base_dir: Optional[Path] = None) -> Tuple[Path, str]:
+        """解析报告中的图片路径
+
+        Args:
+            image_url: 报告中的图片路径
+            base_dir: 相对路径的基准目录（默认为 output_dir）
+
+        Returns:
+            (图片路径, 用于去重的标准化路径)
+        """
+        path_str = self._join_output_dir(image_url, base_dir)
+        # 去重只需要规范化的字符串，不解析符号链接，避免 resolve() 逐级访问文件系统
+        return Path(path_str), os.path.abspath(path_str)
+
+    def _join_output_dir(self, image_url: str, base_dir: Optional[Path] = None) -> str:
+        """相对路径拼接到 base_dir（默认 output_dir）下（按字符串处理，不构造 Path）"""
+        if os.path.isabs(image_url):
+            return image_url
+        return os.path.join(str(base_dir if base_dir is not None else self.output_dir), image_url)
+
+    def _collect_report_images(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None) -> Dict[str, Path]:
+        """收集报告中存在的本地图片（标准化路径 -> 图片路径，已去重）"""
+        image_paths: Dict[str, Path] = {}
+        for _, _, image_url in parsed.get('image_placeholders', []):
+            path_str = self._join_output_dir(image_url, base_dir)
+            key = os.path.abspath(path_str)
+            # 只为确实存在且未收集过的图片构造 Path
+            if key not in image_paths and os.path.exists(path_str):
+                image_paths[key] = Path(path_str)
+        return image_paths
+
+    async def _upload_report_images(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None):
+        """并发上传报告中的所有本地图片，结果保存在 parsed["uploaded_images"]（标准化路径 -> image_key 或异常）"""
+        image_paths = self._collect_report_images(parsed, base_dir)
+        if not image_paths:
+            return
+        results = await self.api_client.upload_images(list(image_paths.values()))
+        parsed['uploaded_images'] = dict(zip(image_paths, results))
+
+    def _upload_image_once(self, parsed: Dict[str, Any], key: str, image_path: Path) -> str:
+        """获取图片的 image_key，优先使用 _upload_report_images 预先上传的结果
+
+        Raises:
+            预先上传失败时抛出当时的异常
+        """
+        result = parsed.get('uploaded_images', {}).get(key)
+        if result is None:
+            return self.api_client.upload_image(image_path)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
 
 class ChannelServerBase(ABC):
     """Channel 服务器基类"""
@@ -114,3 +402,17 @@ class ChannelServerBase(ABC):
     def run(self, host: str = "0.0.0.0", port: int = 3000, debug: bool = False):
         """运行服务器"""
         pass
+
+    def stop(self):
+        """停止服务器，停止消息队列，关闭 API 客户端的连接池和消息去重存储"""
+        message_queue = getattr(self, "message_queue", None)
+        if message_queue is not None:
+            message_queue.stop()
+
+        api_client = getattr(self, "api_client", None)
+        if api_client is not None:
+            api_client.close()
+
+        deduplicator = getattr(self, "deduplicator", None)
+        if deduplicator is not None:
+            deduplicator.close()
@@ -1,15 +1,28 @@
 """Channel 工厂（创建不同平台的 Channel）"""
 
+import functools
+import importlib
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Type
 
 from bi_agent.channel.channel import ChannelServerBase
-from bi_agent.channel.feishu.server import FeishuServer
-from bi_agent.channel.dingTalk.server import DingTalkServer
 
 logger = logging.getLogger(__name__)
 
+# Channel 类型 -> (服务器模块, 服务器类名)，首次使用时才导入对应平台的 SDK
+_REGISTRY = {
+    "feishu": ("bi_agent.channel.feishu.server", "FeishuServer"),
+    "dingtalk": ("bi_agent.channel.dingTalk.server", "DingTalkServer"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_server_class(channel_type: str) -> Type[ChannelServerBase]:
+    """导入并返回 Channel 类型对应的服务器类"""
+    module_name, class_name = _REGISTRY[channel_type]
+    return getattr(importlib.import_module(module_name), class_name)
+
 
 class ChannelFactory:
     """Channel 工厂类"""
@@ -38,20 +51,13 @@ class ChannelFactory:
             ValueError: 不支持的 Channel 类型
         """
         channel_type_lower = channel_type.lower()
-
-        if channel_type_lower == "feishu":
-            return FeishuServer(
-                base_dir=base_dir,
-                llm_provider=llm_provider,
-                llm_model=llm_model,
-                **kwargs
-            )
-        elif channel_type_lower == "dingtalk":
-            return DingTalkServer(
-                base_dir=base_dir,
-                llm_provider=llm_provider,
-                llm_model=llm_model,
-                **kwargs
-            )
-        else:
-            raise ValueError(f"不支持的 Channel 类型: {channel_type}，支持的类型: feishu, dingtalk")
+        if channel_type_lower not in _REGISTRY:
+            raise ValueError(f"不支持的 Channel 类型: {channel_type}，支持的类型: {', '.join(_REGISTRY)}")
+
+        server_class = _load_server_class(channel_type_lower)
+        return server_class(
+            base_dir=base_dir,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
+            **kwargs
+        )
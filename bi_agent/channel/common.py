@@ -1,17 +1,64 @@
 """Channel 通用组件（用户管理器、任务处理器、消息队列等）"""
 
 import asyncio
+import functools
+import inspect
 import logging
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional, List, Callable, Any
-from dataclasses import dataclass
-from queue import Queue, Empty
-from threading import Thread
+from typing import Dict, Optional, List, Callable, Any, Awaitable, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, RLock, Thread, current_thread, local
+from types import MappingProxyType
 
+from bi_agent.agent.agent import Agent
 from bi_agent.channel.channel import ApiClientBase, ReportReplyBase
+from bi_agent.utils.llm_clients.caching_client import CachingLLMClient
+from bi_agent.utils.json_utils import dump_to_file, load_from_file
 
 logger = logging.getLogger(__name__)
 
+# 缓存的 Agent 空闲超过该时间（秒）后被回收
+AGENT_IDLE_TTL = 30 * 60
+
+# 消息队列默认容量（每个消费者）
+QUEUE_SIZE_PER_WORKER = 32
+
+# 用户目录下记录已下载文件的索引文件
+FILE_INDEX_NAME = "files_index.json"
+
+# UserManager 在内存中保留状态的最大用户数
+MAX_CACHED_USERS = 10000
+
+# 上传文件扩展名 -> 文件类型
+FILE_KINDS = MappingProxyType({".xlsx": "excel", ".xls": "excel", ".csv": "csv"})
+
+
+def file_extension(file_name: str) -> str:
+    """取文件名的小写扩展名（含点号，无扩展名时返回空串）"""
+    dot = file_name.rfind(".")
+    return file_name[dot:].lower() if dot > 0 else ""
+
+
+def file_kind(file_name: str) -> str:
+    """按扩展名判断上传文件的类型（excel / csv / other）"""
+    return FILE_KINDS.get(file_extension(file_name), "other")
+
+
+@functools.lru_cache(maxsize=None)
+def _supports_robot_code(client_cls: type) -> bool:
+    """API 客户端的 download_file 是否接受 robot_code 参数（按类型缓存）"""
+    return 'robot_code' in inspect.signature(client_cls.download_file).parameters
+
+
+def _is_coroutine_handler(handler: Callable) -> bool:
+    """处理函数是否为协程函数（支持 functools.partial 包装）"""
+    while isinstance(handler, functools.partial):
+        handler = handler.func
+    return asyncio.iscoroutinefunction(handler)
+
 
 @dataclass
 class UserFileInfo:
@@ -32,16 +79,99 @@ class UserManager:
     为每个用户创建独立的文件夹，管理用户上传的文件。
     """
 
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, max_users: int = MAX_CACHED_USERS):
         """初始化用户管理器
 
         Args:
             base_dir: 基础目录路径
+            max_users: 内存中保留状态的最大用户数，超出时按最近最少使用淘汰（磁盘上的文件保留）
         """
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
-        self.user_files: Dict[str, List[UserFileInfo]] = {}  # user_id -> [UserFileInfo]
-        logger.info(f"用户管理器已初始化，基础目录: {self.base_dir}")
+        self.max_users = max_users
+        # user_id -> {file_key: UserFileInfo}
+        self.user_files: Dict[str, Dict[str, UserFileInfo]] = {}
+        # 内存中有状态的用户，按最近使用时间排列（值无意义），用于统一淘汰各项按用户保存的状态
+        self._recent_users: "OrderedDict[str, None]" = OrderedDict()
+        # 每个用户一把锁，保护该用户的文件记录和已下载文件索引（多个工作线程会同时读写）
+        self._user_locks: Dict[str, RLock] = {}
+        self._global_lock = Lock()
+        # 用户目录缓存：user_id -> (用户目录, 数据目录, 输出目录)，目录只在首次访问时创建
+        self._dir_cache: Dict[str, Tuple[Path, Path, Path]] = {}
+        self._dir_lock = Lock()
+        # 已下载文件索引：user_id -> {file_key: {"path", "size", "mtime_ns"}}，持久化在用户目录下，
+        # 服务重启后同一 file_key 的文件无需重新下载
+        self._file_index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        logger.info("用户管理器已初始化，基础目录: %s", self.base_dir)
+
+    def _ensure_user_dirs(self, user_id: str) -> Tuple[Path, Path, Path]:
+        """创建并缓存用户的目录
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            (用户目录, 数据目录, 输出目录)
+        """
+        with self._dir_lock:
+            dirs = self._dir_cache.get(user_id)
+            if dirs is None:
+                user_dir = self.base_dir / f"user_{user_id}"
+                dirs = (user_dir, user_dir / "data", user_dir / "output")
+                for path in dirs:
+                    path.mkdir(parents=True, exist_ok=True)
+                self._dir_cache[user_id] = dirs
+        self._touch_user(user_id)
+        return dirs
+
+    def _touch_user(self, user_id: str):
+        """标记用户为最近使用，并淘汰超出上限的最久未使用用户的内存状态"""
+        with self._global_lock:
+            self._touch_user_locked(user_id)
+
+    def _touch_user_locked(self, user_id: str):
+        """标记用户为最近使用并按上限淘汰（调用方需持有 _global_lock）
+
+        文件记录、锁、目录缓存和文件索引一起释放；锁正被持有（有操作进行中）的用户跳过，
+        留到之后再淘汰。用户目录中的文件保留在磁盘上，已下载文件索引也已持久化，
+        用户再次使用时可以直接复用。
+        """
+        self._recent_users[user_id] = None
+        self._recent_users.move_to_end(user_id)
+        excess = len(self._recent_users) - self.max_users
+        if excess <= 0:
+            return
+
+        # 从最久未使用的用户开始挑选，只尝试获取锁、不等待，避免与持有用户锁的线程死锁
+        evicted: list[tuple[str, Optional[RLock]]] = []
+        for candidate in self._recent_users:
+            if len(evicted) >= excess or candidate == user_id:
+                break
+            lock = self._user_locks.get(candidate)
+            if lock is not None and not lock.acquire(blocking=False):
+                continue
+            evicted.append((candidate, lock))
+
+        for evicted_id, lock in evicted:
+            try:
+                del self._recent_users[evicted_id]
+                self.user_files.pop(evicted_id, None)
+                self._user_locks.pop(evicted_id, None)
+                self._file_index.pop(evicted_id, None)
+                self._dir_cache.pop(evicted_id, None)
+            finally:
+                if lock is not None:
+                    lock.release()
+            logger.info("用户 %s 长时间未使用，已释放其内存中的状态", evicted_id)
+
+    def _lock_for(self, user_id: str) -> RLock:
+        """获取用户的锁（首次访问时创建），同时标记用户为最近使用"""
+        with self._global_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = RLock()
+            self._touch_user_locked(user_id)
+        return lock
 
     def get_user_dir(self, user_id: str) -> Path:
         """获取用户目录
@@ -52,9 +182,7 @@ class UserManager:
         Returns:
             用户目录路径
         """
-        user_dir = self.base_dir / f"user_{user_id}"
-        user_dir.mkdir(parents=True, exist_ok=True)
-        return user_dir
+        return (self._dir_cache.get(user_id) or self._ensure_user_dirs(user_id))[0]
 
     def get_user_data_dir(self, user_id: str) -> Path:
         """获取用户数据目录（用于存放上传的文件）
@@ -65,9 +193,7 @@ class UserManager:
         Returns:
             用户数据目录路径
         """
-        data_dir = self.get_user_dir(user_id) / "data"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        return data_dir
+        return (self._dir_cache.get(user_id) or self._ensure_user_dirs(user_id))[1]
 
     def get_user_output_dir(self, user_id: str) -> Path:
         """获取用户输出目录（用于存放分析结果）
@@ -78,9 +204,7 @@ class UserManager:
         Returns:
             用户输出目录路径
         """
-        output_dir = self.get_user_dir(user_id) / "output"
-        output_dir.mkdir(parents=True, exist_ok=True)
-        return output_dir
+        return (self._dir_cache.get(user_id) or self._ensure_user_dirs(user_id))[2]
 
     def add_file(self, user_id: str, file_key: str, file_name: str, file_type: str, message_id: Optional[str] = None, robot_code: Optional[str] = None):
         """添加文件记录（延迟下载，先不下载）
@@ -93,7 +217,6 @@ class UserManager:
             message_id: 消息 ID（用于下载文件）
             robot_code: 机器人 Code（钉钉需要，用于文件下载）
         """
-        import time
         file_info = UserFileInfo(
             file_key=file_key,
             file_name=file_name,
@@ -104,11 +227,16 @@ class UserManager:
             robot_code=robot_code,
         )
 
-        if user_id not in self.user_files:
-            self.user_files[user_id] = []
+        # 之前下载过且本地文件未被改动时直接复用
+        local_path = self._lookup_downloaded(user_id, file_key)
+        if local_path is not None:
+            file_info.downloaded = True
+            file_info.local_path = local_path
+            logger.info("文件已在本地缓存: %s", local_path)
 
-        self.user_files[user_id].append(file_info)
-        logger.info(f"用户 {user_id} 添加文件记录: {file_name} (key: {file_key}, message_id: {message_id})")
+        with self._lock_for(user_id):
+            self.user_files.setdefault(user_id, {})[file_key] = file_info
+        logger.info("用户 %s 添加文件记录: %s (key: %s, message_id: %s)", user_id, file_name, file_key, message_id)
 
     def download_file(
         self,
@@ -134,38 +262,127 @@ class UserManager:
         Returns:
             保存的文件路径
         """
+        file_info, save_path, kwargs = self._prepare_download(
+            user_id, file_key, api_client, save_path, message_id, resource_type, robot_code
+        )
+        if file_info is None:
+            return save_path
+
+        api_client.download_file(file_key, save_path, **kwargs)
+        self._mark_downloaded(user_id, file_info, save_path)
+        return save_path
+
+    async def download_file_async(
+        self,
+        user_id: str,
+        file_key: str,
+        api_client: ApiClientBase,
+        save_path: Optional[Path] = None,
+        message_id: Optional[str] = None,
+        resource_type: str = "file",
+        robot_code: Optional[str] = None
+    ) -> Path:
+        """异步下载文件（参数同 download_file）"""
+        file_info, save_path, kwargs = self._prepare_download(
+            user_id, file_key, api_client, save_path, message_id, resource_type, robot_code
+        )
+        if file_info is None:
+            return save_path
+
+        await api_client.download_file_async(file_key, save_path, **kwargs)
+        self._mark_downloaded(user_id, file_info, save_path)
+        return save_path
+
+    def _prepare_download(
+        self,
+        user_id: str,
+        file_key: str,
+        api_client: ApiClientBase,
+        save_path: Optional[Path],
+        message_id: Optional[str],
+        resource_type: str,
+        robot_code: Optional[str],
+    ) -> Tuple[Optional[UserFileInfo], Path, Dict[str, Any]]:
+        """确定下载参数
+
+        Returns:
+            (文件信息, 保存路径, 传给 API 客户端的参数)；文件已下载时文件信息为 None，保存路径为已有文件
+        """
         # 查找文件信息
         file_info = self._find_file(user_id, file_key)
         if not file_info:
             raise ValueError(f"未找到文件记录: {file_key}")
 
         # 如果已下载，直接返回
-        if file_info.downloaded and file_info.local_path and file_info.local_path.exists():
-            logger.info(f"文件已存在，跳过下载: {file_info.local_path}")
-            return file_info.local_path
+        with self._lock_for(user_id):
+            downloaded, local_path = file_info.downloaded, file_info.local_path
+        if downloaded and local_path and local_path.exists():
+            logger.info("文件已存在，跳过下载: %s", local_path)
+            return None, local_path, {}
 
         # 确定保存路径
         if save_path is None:
             data_dir = self.get_user_data_dir(user_id)
             save_path = data_dir / file_info.file_name
 
-        file_message_id = file_info.message_id or message_id
-        resource_type_param = resource_type or "file"
-        actual_robot_code = getattr(file_info, 'robot_code', None) or robot_code
-        
-        import inspect
-        sig = inspect.signature(api_client.download_file)
-        if 'robot_code' in sig.parameters:
-            api_client.download_file(file_key, save_path, message_id=file_message_id, resource_type=resource_type_param, robot_code=actual_robot_code)
-        else:
-            api_client.download_file(file_key, save_path, message_id=file_message_id, resource_type=resource_type_param)
+        kwargs: Dict[str, Any] = {
+            "message_id": file_info.message_id or message_id,
+            "resource_type": resource_type or "file",
+        }
+        if _supports_robot_code(type(api_client)):
+            kwargs["robot_code"] = getattr(file_info, 'robot_code', None) or robot_code
+        return file_info, save_path, kwargs
+
+    def _mark_downloaded(self, user_id: str, file_info: UserFileInfo, save_path: Path):
+        """更新文件信息为已下载，并写入已下载文件索引"""
+        stat = save_path.stat()
+        with self._lock_for(user_id):
+            file_info.downloaded = True
+            file_info.local_path = save_path
+            index = self._get_file_index(user_id)
+            index[file_info.file_key] = {
+                "path": str(save_path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+            try:
+                dump_to_file(index, self.get_user_dir(user_id) / FILE_INDEX_NAME)
+            except OSError as e:
+                logger.warning("保存文件索引失败: %s", e)
+        logger.info("文件已下载: %s", save_path)
 
-        # 更新文件信息
-        file_info.downloaded = True
-        file_info.local_path = save_path
-        logger.info(f"文件已下载: {save_path}")
+    def _lookup_downloaded(self, user_id: str, file_key: str) -> Optional[Path]:
+        """查找之前下载过的文件
 
-        return save_path
+        Returns:
+            本地文件路径；未下载过、文件已删除或已被改动时返回 None
+        """
+        with self._lock_for(user_id):
+            entry = self._get_file_index(user_id).get(file_key)
+        if not entry:
+            return None
+        path = Path(entry["path"])
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if stat.st_size == 0 or stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        return path
+
+    def _get_file_index(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        """获取用户的已下载文件索引（首次访问时从磁盘加载，调用方需持有该用户的锁）"""
+        index = self._file_index.get(user_id)
+        if index is None:
+            index_path = self.get_user_dir(user_id) / FILE_INDEX_NAME
+            index = {}
+            if index_path.exists():
+                try:
+                    index = load_from_file(index_path)
+                except Exception as e:
+                    logger.warning("加载文件索引失败: %s", e)
+            self._file_index[user_id] = index
+        return index
 
     def download_all_files(self, user_id: str, api_client: ApiClientBase, message_id: Optional[str] = None, robot_code: Optional[str] = None):
         """下载用户的所有文件
@@ -176,17 +393,72 @@ class UserManager:
             message_id: 消息 ID（如果提供，使用消息资源 API）
             robot_code: 机器人 Code（钉钉需要）
         """
-        if user_id not in self.user_files:
-            return
+        with self._lock_for(user_id):
+            files = list(self.user_files.get(user_id, {}).values())
 
-        for file_info in self.user_files[user_id]:
+        for file_info in files:
             if not file_info.downloaded:
                 try:
                     file_message_id = file_info.message_id or message_id
                     file_robot_code = getattr(file_info, 'robot_code', None) or robot_code
                     self.download_file(user_id, file_info.file_key, api_client, message_id=file_message_id, robot_code=file_robot_code)
                 except Exception as e:
-                    logger.error(f"下载文件失败 {file_info.file_name}: {e}")
+                    logger.error("下载文件失败 %s: %s", file_info.file_name, e)
+
+    async def download_all_files_async(
+        self,
+        user_id: str,
+        api_client: ApiClientBase,
+        message_id: Optional[str] = None,
+        robot_code: Optional[str] = None,
+    ):
+        """并发下载用户的所有未下载文件
+
+        各文件并发流式下载，总耗时取决于最慢的文件而不是所有文件之和。
+
+        Args:
+            user_id: 用户ID
+            api_client: API 客户端
+            message_id: 消息 ID（如果提供，使用消息资源 API）
+            robot_code: 机器人 Code（钉钉需要）
+        """
+        with self._lock_for(user_id):
+            pending = [file_info for file_info in self.user_files.get(user_id, {}).values() if not file_info.downloaded]
+        if not pending:
+            return
+
+        results = await asyncio.gather(
+            *(
+                self.download_file_async(
+                    user_id,
+                    file_info.file_key,
+                    api_client,
+                    message_id=file_info.message_id or message_id,
+                    robot_code=getattr(file_info, 'robot_code', None) or robot_code,
+                )
+                for file_info in pending
+            ),
+            return_exceptions=True,
+        )
+        for file_info, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.error("下载文件失败 %s: %s", file_info.file_name, result)
+
+    def get_downloaded_paths(self, user_id: str) -> List[Path]:
+        """获取用户已下载文件的本地路径
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            本地文件路径列表
+        """
+        with self._lock_for(user_id):
+            return [
+                file_info.local_path
+                for file_info in self.user_files.get(user_id, {}).values()
+                if file_info.downloaded and file_info.local_path is not None
+            ]
 
     def get_user_files(self, user_id: str) -> List[UserFileInfo]:
         """获取用户的所有文件
@@ -197,7 +469,8 @@ class UserManager:
         Returns:
             文件信息列表
         """
-        return self.user_files.get(user_id, [])
+        with self._lock_for(user_id):
+            return list(self.user_files.get(user_id, {}).values())
 
     def _find_file(self, user_id: str, file_key: str) -> Optional[UserFileInfo]:
         """查找文件信息
@@ -209,14 +482,8 @@ class UserManager:
         Returns:
             文件信息，如果不存在返回 None
         """
-        if user_id not in self.user_files:
-            return None
-
-        for file_info in self.user_files[user_id]:
-            if file_info.file_key == file_key:
-                return file_info
-
-        return None
+        with self._lock_for(user_id):
+            return self.user_files.get(user_id, {}).get(file_key)
 
 
 @dataclass
@@ -229,79 +496,261 @@ class MessageTask:
     message_type: str  # text, file
     content: Any
     handler: Callable  # 处理函数
+    # 批量处理函数（可选）：同一批中同一用户的任务合并为一次调用，参数为任务列表
+    batch_handler: Optional[Callable[[List["MessageTask"]], Awaitable[None]]] = None
+    # 处理函数是否为协程函数（创建任务时确定，处理时无需再检查）
+    is_async: bool = field(init=False, default=False)
+    batch_is_async: bool = field(init=False, default=False)
+
+    def __post_init__(self):
+        self.is_async = _is_coroutine_handler(self.handler)
+        self.batch_is_async = self.batch_handler is not None and _is_coroutine_handler(self.batch_handler)
 
 
 class MessageQueue:
-    """消息队列（生产者消费者模式）"""
+    """消息队列（生产者消费者模式）
 
-    def __init__(self, num_workers: int = 3):
+    队列和消费者运行在一个独立线程的 asyncio 事件循环中：消费者协程从 asyncio.Queue
+    取出任务，交给线程池执行处理函数。处理函数中仍有同步的 API 调用和代码执行，
+    因此异步处理函数在线程池线程各自复用的事件循环中运行，任务之间不会互相阻塞。
+    """
+
+    def __init__(self, num_workers: int = 3, max_size: Optional[int] = None):
         """初始化消息队列
 
         Args:
-            num_workers: 消费者线程数量
+            num_workers: 消费者数量（同时处理的任务数）
+            max_size: 队列容量（默认每个消费者 32 个），队列满时入队等待超时后丢弃任务
         """
-        self.queue: Queue = Queue()
+        self.queue: Optional[asyncio.Queue] = None
         self.num_workers = num_workers
-        self.workers: list[Thread] = []
+        self.max_size = max_size if max_size is not None else num_workers * QUEUE_SIZE_PER_WORKER
+        # 入队统计（只在事件循环线程中修改）
+        self._enqueued = 0
+        self._dropped = 0
+        self.workers: list[asyncio.Task] = []
         self.running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 启动前加入的任务，启动后统一入队
+        self._pending: list[MessageTask] = []
+        self._lock = Lock()
+        # 线程池中每个线程复用的事件循环
+        self._thread_local = local()
+        self._handler_loops: list[asyncio.AbstractEventLoop] = []
 
     def start(self):
-        """启动消费者线程"""
-        if self.running:
-            return
+        """启动消费者"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="MessageWorker")
+        self._loop = asyncio.new_event_loop()
+        ready = Event()
+        self._loop_thread = Thread(target=self._run_loop, args=(ready,), daemon=True, name="MessageQueueLoop")
+        self._loop_thread.start()
+        ready.wait()
 
-        self.running = True
-        for i in range(self.num_workers):
-            worker = Thread(target=self._worker, daemon=True, name=f"MessageWorker-{i}")
-            worker.start()
-            self.workers.append(worker)
-        logger.info(f"消息队列已启动，工作线程数: {self.num_workers}")
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for task in pending:
+            self.put(task)
+        logger.info("消息队列已启动，消费者数量: %s", self.num_workers)
 
     def stop(self):
-        """停止消费者线程"""
-        self.running = False
+        """停止消费者（等待已入队的任务处理完成）"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+
         # 等待所有任务完成
-        self.queue.join()
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._executor.shutdown(wait=True)
+        for loop in self._handler_loops:
+            loop.close()
+        self._handler_loops.clear()
         logger.info("消息队列已停止")
 
-    def put(self, task: MessageTask):
-        """添加任务到队列（生产者）
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """队列统计：累计入队数、累计丢弃数和当前积压数"""
+        return {
+            "enqueued": self._enqueued,
+            "dropped": self._dropped,
+            "depth": self.queue.qsize() if self.queue is not None else len(self._pending),
+        }
+
+    def put(self, task: MessageTask, timeout: float = 1.0) -> bool:
+        """添加任务到队列（生产者，可在任意线程中调用）
+
+        队列已满时最多等待 timeout 秒，仍然没有空位则丢弃任务，调用方可据此提示用户稍后重试。
 
         Args:
             task: 消息任务
-        """
-        self.queue.put(task)
+            timeout: 队列满时的最长等待时间（秒）
 
-    def _worker(self):
-        """工作线程（消费者）"""
-        while self.running:
+        Returns:
+            任务是否已入队
+        """
+        with self._lock:
+            if not self.running:
+                self._pending.append(task)
+                return True
+            loop = self._loop
+
+        if current_thread() is self._loop_thread:
+            # 在事件循环线程中不能阻塞等待，队列满时直接丢弃
             try:
-                task = self.queue.get(timeout=1)
-                if task is None:
-                    continue
+                self.queue.put_nowait(task)
+            except asyncio.QueueFull:
+                self._record_dropped(task)
+                return False
+            self._enqueued += 1
+            return True
 
-                logger.info(f"开始处理任务: {task.message_id}")
-                try:
-                    # 执行处理函数
-                    if asyncio.iscoroutinefunction(task.handler):
-                        # 如果是异步函数，需要在新的事件循环中运行
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        loop.run_until_complete(task.handler(task))
-                        loop.close()
-                    else:
-                        task.handler(task)
-                    logger.info(f"任务处理完成: {task.message_id}")
-                except Exception as e:
-                    logger.error(f"处理任务失败 {task.message_id}: {e}", exc_info=True)
-                finally:
-                    self.queue.task_done()
-            except Empty:
-                # 队列为空是正常情况，继续等待
+        return asyncio.run_coroutine_threadsafe(self._put_with_timeout(task, timeout), loop).result()
+
+    put_threadsafe = put
+
+    async def aput(self, task: MessageTask):
+        """添加任务到队列（在队列所在的事件循环中调用，队列满时等待）
+
+        Args:
+            task: 消息任务
+        """
+        await self.queue.put(task)
+        self._enqueued += 1
+
+    async def _put_with_timeout(self, task: MessageTask, timeout: float) -> bool:
+        """在事件循环中入队，超时则丢弃"""
+        try:
+            await asyncio.wait_for(self.queue.put(task), timeout)
+        except asyncio.TimeoutError:
+            self._record_dropped(task)
+            return False
+        self._enqueued += 1
+        return True
+
+    def _record_dropped(self, task: MessageTask):
+        """记录因队列已满被丢弃的任务"""
+        self._dropped += 1
+        logger.warning(
+            "消息队列已满（容量 %s），丢弃任务: %s，累计丢弃 %s 个", self.max_size, task.message_id, self._dropped
+        )
+
+    def _run_loop(self, ready: Event):
+        """事件循环线程"""
+        asyncio.set_event_loop(self._loop)
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self.workers = [self._loop.create_task(self._aworker()) for _ in range(self.num_workers)]
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    async def _shutdown(self):
+        """等待队列处理完成并停止消费者"""
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def drain_batch(self, max_items: int = 32, timeout: float = 0.05) -> List[MessageTask]:
+        """取出一批任务（在队列所在的事件循环中调用）
+
+        等待第一个任务到达后，在 timeout 秒内继续收集已到达的任务，最多 max_items 个。
+        调用方需要对每个取出的任务调用 queue.task_done()。
+
+        Args:
+            max_items: 单批最大任务数
+            timeout: 收到第一个任务后等待更多任务的最长时间（秒）
+
+        Returns:
+            任务列表
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + timeout
+        while len(batch) < max_items:
+            try:
+                batch.append(self.queue.get_nowait())
                 continue
-            except Exception as e:
-                if self.running:
-                    logger.error(f"工作线程错误: {e}", exc_info=True)
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _aworker(self):
+        """消费者协程"""
+        while True:
+            batch = await self.drain_batch()
+            try:
+                await self._process_batch([task for task in batch if task is not None])
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _process_batch(self, batch: List[MessageTask]):
+        """处理一批任务
+
+        设置了 batch_handler 的任务按 (batch_handler, user_id) 分组后整组交给 batch_handler，
+        其余任务单独处理。各组/各任务并发提交到线程池，并发度由线程池大小限制。
+        """
+        groups: Dict[tuple, List[MessageTask]] = {}
+        singles: List[MessageTask] = []
+        for task in batch:
+            if task.batch_handler is not None:
+                groups.setdefault((task.batch_handler, task.user_id), []).append(task)
+            else:
+                singles.append(task)
+
+        jobs = [self._dispatch(task.handler, task.is_async, task, [task]) for task in singles]
+        jobs.extend(
+            self._dispatch(handler, tasks[0].batch_is_async, tasks, tasks) for (handler, _), tasks in groups.items()
+        )
+        await asyncio.gather(*jobs)
+
+    async def _dispatch(self, handler: Callable, is_async: bool, arg: Any, tasks: List[MessageTask]):
+        """在线程池中执行处理函数并记录日志"""
+        message_ids = ", ".join(task.message_id for task in tasks)
+        logger.info("开始处理任务: %s", message_ids)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._run_handler, handler, is_async, arg
+            )
+            logger.info("任务处理完成: %s", message_ids)
+        except Exception as e:
+            logger.error("处理任务失败 %s: %s", message_ids, e, exc_info=True)
+
+    def _run_handler(self, handler: Callable, is_async: bool, arg: Any):
+        """在线程池线程中执行处理函数"""
+        if is_async:
+            loop = getattr(self._thread_local, "loop", None)
+            if loop is None:
+                # 每个线程池线程只创建一次事件循环，之后的任务复用
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._thread_local.loop = loop
+                with self._lock:
+                    self._handler_loops.append(loop)
+            loop.run_until_complete(handler(arg))
+        else:
+            handler(arg)
 
 
 class TaskHandler:
@@ -318,6 +767,7 @@ class TaskHandler:
         report_reply: ReportReplyBase,
         base_output_dir: Path,
         channel_name: str = "channel",
+        enable_llm_cache: bool = False,
     ):
         """初始化任务处理器
 
@@ -328,13 +778,20 @@ class TaskHandler:
             report_reply: 报告回复工具
             base_output_dir: 基础输出目录
             channel_name: Channel 名称（用于 session_id）
+            enable_llm_cache: 是否对完全相同的 LLM 请求启用响应缓存（所有任务共享同一个缓存；
+                缓存键不包含记忆消息）
         """
+        if enable_llm_cache and not isinstance(llm_client, CachingLLMClient):
+            llm_client = CachingLLMClient(llm_client)
         self.llm_client = llm_client
         self.user_manager = user_manager
         self.api_client = api_client
         self.report_reply = report_reply
         self.base_output_dir = Path(base_output_dir)
         self.channel_name = channel_name
+        # 按 session_id 缓存空闲的 Agent：session_id -> (Agent, 最后使用时间)
+        self._agent_cache: "OrderedDict[str, tuple[Agent, float]]" = OrderedDict()
+        self._agent_cache_lock = Lock()
 
     async def handle_task(
         self,
@@ -345,6 +802,7 @@ class TaskHandler:
         chat_id: Optional[str] = None,
         message_id: Optional[str] = None,
         session_webhook: Optional[str] = None,
+        send_ack: bool = True,
     ):
         """处理任务
 
@@ -356,33 +814,37 @@ class TaskHandler:
             chat_id: 群聊 ID（如果是群聊）
             message_id: 消息 ID（用于回复）
             session_webhook: 会话 webhook（Stream 模式使用）
+            send_ack: 是否发送"正在处理"消息（批量处理时由 handle_batch 统一发送）
         """
-        from bi_agent.agent.agent import Agent
         
         try:
             # 判断是否为群聊
             is_group = chat_id is not None and chat_id != ""
             
             # 发送开始处理消息
-            self.api_client.send_text_message(
-                receive_id_type,
-                receive_id,
-                "正在处理您的数据分析任务，请稍候...",
-                message_id=message_id,
-                is_group=is_group,
-                session_webhook=session_webhook,
-            )
+            if send_ack:
+                self.api_client.send_text_message(
+                    receive_id_type,
+                    receive_id,
+                    "正在处理您的数据分析任务，请稍候...",
+                    message_id=message_id,
+                    is_group=is_group,
+                    session_webhook=session_webhook,
+                )
 
             # 获取用户目录
             data_dir = self.user_manager.get_user_data_dir(user_id)
             output_dir = self.user_manager.get_user_output_dir(user_id)
 
             # 下载用户的所有文件（延迟下载：现在才下载）
-            logger.info(f"开始下载用户 {user_id} 的文件...")
+            logger.info("开始下载用户 %s 的文件...", user_id)
             robot_code = getattr(self.api_client, '_robot_code', None)
-            self.user_manager.download_all_files(user_id, self.api_client, robot_code=robot_code)
+            await self.user_manager.download_all_files_async(user_id, self.api_client, robot_code=robot_code)
 
-            data_files = [f for f in data_dir.glob("*") if f.is_file()]
+            # 优先使用已记录的下载文件；没有记录时（如服务重启后）再扫描数据目录
+            data_files = self.user_manager.get_downloaded_paths(user_id)
+            if not data_files:
+                data_files = [f for f in data_dir.glob("*") if f.is_file()]
             if not data_files:
                 self.api_client.send_text_message(
                     receive_id_type,
@@ -394,28 +856,28 @@ class TaskHandler:
                 )
                 return
 
-            agent = Agent(
-                llm_client=self.llm_client,
-                data_dir=str(data_dir),
-                output_dir=str(output_dir),
-                max_steps=50,
-                verbose=False,
-                user_id=user_id,
-                session_id=f"{self.channel_name}_{user_id}_{chat_id or 'private'}",
-            )
+            session_id = f"{self.channel_name}_{user_id}_{chat_id or 'private'}"
+            agent = self._acquire_agent(session_id, user_id, data_dir, output_dir)
 
             # 执行任务
-            logger.info(f"开始执行任务: {task}")
-            execution = await agent.run(task)
+            logger.info("开始执行任务: %s", task)
+            try:
+                execution = await agent.run(task)
+            finally:
+                self._release_agent(session_id, agent)
 
             # 处理结果
             if execution.success:
-                # 查找生成的报告文件
-                report_files = list(output_dir.glob("*.md"))
-                if report_files:
-                    # 使用最新的报告文件
-                    report_file = max(report_files, key=lambda p: p.stat().st_mtime)
-
+                # 使用 Agent 最后生成的报告；没有记录时再扫描输出目录，取最新的报告文件
+                report_file = next(
+                    (path for path in map(Path, reversed(execution.report_paths)) if path.is_file()),
+                    None,
+                )
+                if report_file is None:
+                    report_files = list(output_dir.glob("*.md"))
+                    if report_files:
+                        report_file = max(report_files, key=lambda p: p.stat().st_mtime)
+                if report_file is not None:
                     # 发送报告（使用富文本格式）
                     await self.report_reply.send_report(
                         receive_id_type,
@@ -426,7 +888,7 @@ class TaskHandler:
                         session_webhook=session_webhook
                     )
 
-                    logger.info(f"任务完成，报告已发送: {report_file}")
+                    logger.info("任务完成，报告已发送: %s", report_file)
                 else:
                     # 如果没有报告文件，发送执行结果
                     result_text = execution.final_result or "任务已完成"
@@ -449,10 +911,10 @@ class TaskHandler:
                     is_group=is_group,
                     session_webhook=session_webhook,
                 )
-                logger.error(f"任务执行失败: {error_msg}")
+                logger.error("任务执行失败: %s", error_msg)
 
         except Exception as e:
-            logger.error(f"处理任务时出错: {e}", exc_info=True)
+            logger.error("处理任务时出错: %s", e, exc_info=True)
             is_group = chat_id is not None and chat_id != ""
             self.api_client.send_text_message(
                 receive_id_type,
@@ -462,3 +924,97 @@ class TaskHandler:
                 is_group=is_group,
                 session_webhook=session_webhook,
             )
+
+    def _acquire_agent(self, session_id: str, user_id: str, data_dir: Path, output_dir: Path) -> Agent:
+        """取出会话缓存的 Agent，没有空闲的 Agent 时新建
+
+        Agent 在执行期间从缓存中移出，同一会话的并发任务会各自使用独立的 Agent。
+
+        Args:
+            session_id: 会话 ID
+            user_id: 用户ID
+            data_dir: 用户数据目录
+            output_dir: 用户输出目录
+
+        Returns:
+            Agent 实例
+        """
+        now = time.monotonic()
+        with self._agent_cache_lock:
+            # 回收空闲超时的 Agent（按最后使用时间从旧到新排列）
+            while self._agent_cache:
+                oldest_id, (_, last_used) = next(iter(self._agent_cache.items()))
+                if now - last_used <= AGENT_IDLE_TTL:
+                    break
+                del self._agent_cache[oldest_id]
+            cached = self._agent_cache.pop(session_id, None)
+
+        if cached is not None:
+            agent = cached[0]
+            agent.reset()
+            return agent
+
+        return Agent(
+            llm_client=self.llm_client,
+            data_dir=str(data_dir),
+            output_dir=str(output_dir),
+            max_steps=50,
+            verbose=False,
+            user_id=user_id,
+            session_id=session_id,
+        )
+
+    def _release_agent(self, session_id: str, agent: Agent):
+        """任务结束后将 Agent 放回会话缓存"""
+        with self._agent_cache_lock:
+            self._agent_cache[session_id] = (agent, time.monotonic())
+            self._agent_cache.move_to_end(session_id)
+
+    async def handle_batch(self, requests: List[Dict[str, Any]]):
+        """批量处理同一用户的多个任务
+
+        先发送一条合并的"正在处理"消息，再依次执行各任务。同一用户的任务共用数据目录和
+        输出目录，不能并发执行。
+
+        Args:
+            requests: handle_task 的参数字典列表（属于同一用户）
+        """
+        if not requests:
+            return
+        if len(requests) == 1:
+            await self.handle_task(**requests[0])
+            return
+
+        # 同一用户的任务可能来自不同的会话（群聊/私聊/不同的 session webhook），
+        # 每个会话各发一条"正在处理"消息，数量只统计该会话中的任务
+        receivers: Dict[tuple, List[Dict[str, Any]]] = {}
+        for request in requests:
+            key = (
+                request["receive_id_type"],
+                request["receive_id"],
+                request.get("chat_id") or "",
+                request.get("session_webhook") or "",
+            )
+            receivers.setdefault(key, []).append(request)
+
+        for same_chat in receivers.values():
+            first = same_chat[0]
+            chat_id = first.get("chat_id")
+            if len(same_chat) == 1:
+                ack = "正在处理您的数据分析任务，请稍候..."
+            else:
+                ack = f"已收到您的 {len(same_chat)} 个数据分析任务，将依次处理，请稍候..."
+            try:
+                self.api_client.send_text_message(
+                    first["receive_id_type"],
+                    first["receive_id"],
+                    ack,
+                    message_id=first.get("message_id"),
+                    is_group=chat_id is not None and chat_id != "",
+                    session_webhook=first.get("session_webhook"),
+                )
+            except Exception as e:
+                logger.error("发送开始处理消息失败: %s", e)
+
+        for request in requests:
+            await self.handle_task(**request, send_ack=False)
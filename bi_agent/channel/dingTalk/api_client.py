@@ -1,13 +1,21 @@
 """钉钉 API 客户端"""
 
+import asyncio
+import hashlib
 import os
-import json
 import logging
+import random
 import re
+import shutil
+import threading
 import time
+import httpx
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any
+from urllib.parse import quote_plus
 
 from alibabacloud_dingtalk.oauth2_1_0.client import Client as dingtalkoauth2_1_0Client
 from alibabacloud_tea_openapi import models as open_api_models
@@ -16,14 +24,117 @@ from alibabacloud_dingtalk.robot_1_0.client import Client as dingtalkrobot_1_0Cl
 from alibabacloud_dingtalk.robot_1_0 import models as dingtalkrobot__1__0_models
 from alibabacloud_tea_util import models as util_models
 
-from bi_agent.channel.channel import ApiClientBase
+from bi_agent.channel.channel import ApiClientBase, MultipartFileBody
+from bi_agent.utils.json_utils import dumps, dumps_bytes
 
 logger = logging.getLogger(__name__)
 
+# 媒体文件上传接口
+MEDIA_UPLOAD_URL = 'https://oapi.dingtalk.com/media/upload'
+
+# 单个换行（钉钉 Markdown 要求换行前后各加 2 个空格），使用零宽断言以便一次替换处理相邻换行
+_NL_FIX_RE = re.compile(r'(?<=[^\n])\n(?=[^\n])')
+# 标题参数未传入的标记（None 表示调用方已提取过但内容中没有标题）
+_UNSET = object()
+# 上传文件的 MIME 类型（按小写扩展名）
+_MIME_TYPES = {
+    # 图片类型
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+    # 文档类型
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+    '.txt': 'text/plain',
+    '.json': 'application/json',
+    '.zip': 'application/zip',
+    '.rar': 'application/x-rar-compressed',
+}
+# 文件消息的 fileType（按小写扩展名）
+_FILE_TYPE_MAP = {
+    '.pdf': 'pdf',
+    '.doc': 'doc',
+    '.docx': 'docx',
+    '.xls': 'xls',
+    '.xlsx': 'xlsx',
+    '.csv': 'csv',
+    '.txt': 'txt',
+    '.json': 'json',
+    '.zip': 'zip',
+    '.rar': 'rar',
+}
+# 查找 Markdown 标题时最多扫描的行数
+_TITLE_SCAN_LINES = 50
+
+
+def _extract_title(content: str) -> Optional[str]:
+    """提取 Markdown 内容中的第一个标题（# 开头的行）
+
+    只扫描前 _TITLE_SCAN_LINES 行，未找到时返回 None。
+    """
+    lines = content.split('\n', _TITLE_SCAN_LINES)
+    for line in lines[:_TITLE_SCAN_LINES]:
+        line = line.lstrip(' ')
+        if not line.startswith('#'):
+            continue
+        text = line.lstrip('#')
+        # 井号后必须至少有一个空白字符才是标题
+        if text[:1].isspace():
+            text = text.strip()
+            if text:
+                return text
+    return None
+
+
+def _render_elem(elem: Dict[str, Any]) -> Optional[str]:
+    """将飞书富文本元素渲染为钉钉 Markdown，不支持的元素返回 None"""
+    tag = elem.get("tag", "")
+    if tag == "text":
+        text = elem.get("text", "")
+        # 处理文本格式
+        styles = elem.get("style") or ()
+        if "bold" in styles:
+            text = f"**{text}**"
+        if "italic" in styles:
+            text = f"*{text}*"
+        return text
+    if tag == "img":
+        image_key = elem.get("image_key", "")
+        return f"![]({image_key})" if image_key else "[图片]"
+    if tag == "a":
+        return f"[{elem.get('text', '')}]({elem.get('href', '')})"
+    return None
+
+
+def _content_preview(content: str, limit: int = 500) -> str:
+    """截取日志中的 Markdown 内容预览（只切片一次，调用方应先检查日志级别）"""
+    return content if len(content) <= limit else content[:limit] + "..."
+
 
 class DingTalkApiClient(ApiClientBase):
     """钉钉 API 客户端"""
 
+    # Webhook 发送的 (连接超时, 读取超时)
+    WEBHOOK_TIMEOUT = (3, 15)
+    # 同步下载：(连接超时, 读取超时) 和每次复制的块大小
+    DOWNLOAD_TIMEOUT = (5, 60)
+    DOWNLOAD_COPY_SIZE = 256 * 1024
+    # batchSendOTO 单次请求的接收人上限，以及分批发送时的最大并发数
+    OTO_BATCH_SIZE = 20
+    OTO_MAX_WORKERS = 8
+    # media_id 有效期为 3 天，提前 1 小时视为过期；缓存最多保留的条目数
+    MEDIA_ID_TTL = 3 * 86400 - 3600
+    MEDIA_CACHE_SIZE = 1024
+    # 计算文件内容摘要时每次读取的块大小
+    HASH_CHUNK_SIZE = 1024 * 1024
+
     def __init__(self, client_id: str, client_secret: str, robot_code: str):
         """初始化钉钉 API 客户端
 
@@ -32,11 +143,22 @@ class DingTalkApiClient(ApiClientBase):
             client_secret: 应用 Secret
             robot_code: 机器人 Code
         """
+        super().__init__()
         self._client_id = client_id
         self._client_secret = client_secret
         self._robot_code = robot_code
-        self._token_cache = {"token": None, "expire": 0}
+        self._token_cache = {"token": None, "expire": 0, "upload_url": None}
+        # 令牌刷新锁：并发请求发现令牌过期时只刷新一次
+        self._token_lock = threading.Lock()
+        # 已上传文件缓存 -> (media_id, 过期时间)，键为 ("path", 路径, 大小, 修改时间, 类型)
+        # 或 ("sha1", 大小, 内容摘要, 类型)
+        self._media_cache: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+        self._media_lock = threading.Lock()
         self._config = self._create_config()
+        # SDK 客户端和运行时选项只读、可复用，避免每次调用都重新构造
+        self._oauth_client = dingtalkoauth2_1_0Client(self._config)
+        self._robot_client = dingtalkrobot_1_0Client(self._config)
+        self._runtime_options = util_models.RuntimeOptions()
 
     def _create_config(self) -> open_api_models.Config:
         """创建 API 配置"""
@@ -48,16 +170,19 @@ class DingTalkApiClient(ApiClientBase):
     @property
     def access_token(self) -> str:
         """获取访问令牌（自动刷新）"""
-        now = time.time()
-        if self._token_cache["token"] and now < self._token_cache["expire"]:
+        token_cache = self._token_cache
+        if token_cache["token"] and time.time() < token_cache["expire"]:
+            return token_cache["token"]
+
+        with self._token_lock:
+            # 双重检查：等待锁期间其他线程可能已经刷新过令牌
+            if not (self._token_cache["token"] and time.time() < self._token_cache["expire"]):
+                self._authorize_access_token()
             return self._token_cache["token"]
-        
-        self._authorize_access_token()
-        return self._token_cache["token"]
 
     def _authorize_access_token(self):
         """获取访问令牌"""
-        client = dingtalkoauth2_1_0Client(self._config)
+        client = self._oauth_client
         get_access_token_request = dingtalkoauth_2__1__0_models.GetAccessTokenRequest(
             app_key=self._client_id,
             app_secret=self._client_secret
@@ -68,8 +193,13 @@ class DingTalkApiClient(ApiClientBase):
             expire_in = getattr(response.body, "expire_in", 7200)
             if token:
                 now = time.time()
-                self._token_cache["token"] = token
-                self._token_cache["expire"] = now + expire_in - 200  # 提前200秒刷新
+                # 整体替换缓存字典，读取方不会看到新旧令牌混杂的中间状态
+                self._token_cache = {
+                    "token": token,
+                    # 提前 180~240 秒随机刷新，避免多个实例在同一时刻集中刷新
+                    "expire": now + expire_in - random.uniform(180, 240),
+                    "upload_url": f"{MEDIA_UPLOAD_URL}?access_token={quote_plus(token)}",
+                }
                 logger.info(f"钉钉访问令牌已更新，有效期: {expire_in} 秒")
             else:
                 raise DingTalkApiException(code=-1, msg="访问令牌为空")
@@ -84,7 +214,8 @@ class DingTalkApiClient(ApiClientBase):
         content: str,
         message_id: Optional[str] = None,
         is_group: bool = False,
-        session_webhook: Optional[str] = None
+        session_webhook: Optional[str] = None,
+        title: Optional[str] = None
     ):
         """发送文本消息
 
@@ -95,12 +226,14 @@ class DingTalkApiClient(ApiClientBase):
             message_id: 要回复的消息 ID（群聊时可选）
             is_group: 是否为群聊
             session_webhook: 会话 webhook（Stream 模式推荐使用，优先级最高）
+            title: 消息标题（可选，未提供时从 content 中提取）
         """
+        # 调用方未提供标题时从 content 中提取一次，传给下游发送方法，避免重复扫描
+        if title is None:
+            title = _extract_title(content)
+
         # 如果提供了 session_webhook，优先使用（Stream 模式推荐方式）
         if session_webhook:
-            # 尝试从 content 中提取标题
-            title_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
-            title = title_match.group(1).strip() if title_match else None
             self._send_via_webhook(session_webhook, content, title=title)
             return
 
@@ -109,10 +242,6 @@ class DingTalkApiClient(ApiClientBase):
         if not access_token:
             raise DingTalkApiException(code=-1, msg="无法获取访问令牌")
 
-        # 尝试从 content 中提取标题
-        title_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
-        title = title_match.group(1).strip() if title_match else None
-
         if is_group:
             # 群聊消息
             self._send_group_message(access_token, receive_id, content, title=title)
@@ -120,7 +249,26 @@ class DingTalkApiClient(ApiClientBase):
             # 私聊消息
             self._send_private_message(access_token, [receive_id], content, title=title)
 
-    def _send_group_message(self, access_token: str, open_conversation_id: str, content: str, title: Optional[str] = None):
+    def send_text_broadcast(self, user_ids: list, content: str, title: Optional[str] = None):
+        """向多个用户私聊发送同一条 Markdown 消息
+
+        接收人按 OTO_BATCH_SIZE 分批，每批一次 batchSendOTO 请求，多批并发发送。
+
+        Args:
+            user_ids: 接收者 user_id 列表
+            content: Markdown 文本内容
+            title: 消息标题（可选，默认从 content 中提取）
+        """
+        if not user_ids:
+            return []
+        access_token = self.access_token
+        if not access_token:
+            raise DingTalkApiException(code=-1, msg="无法获取访问令牌")
+        return self._send_private_message(
+            access_token, list(user_ids), content, title=title if title else _UNSET
+        )
+
+    def _send_group_message(self, access_token: str, open_conversation_id: str, content: str, title: Any = _UNSET):
         """发送群聊消息（Markdown 格式）
         
         根据钉钉官方文档，msgParam 应包含 title 和 text 两个字段。
@@ -131,60 +279,57 @@ class DingTalkApiClient(ApiClientBase):
             access_token: 访问令牌
             open_conversation_id: 会话 ID
             content: Markdown 文本内容
-            title: 消息标题（如果未提供，从 content 中提取或使用默认值）
+            title: 消息标题（未传入时从 content 中提取，为空时使用默认值）
         """
-        # 如果没有提供标题，尝试从 Markdown 内容中提取第一个标题
+        robot_code = self._robot_code
+        models = dingtalkrobot__1__0_models
+
+        # 仅在调用方未传入标题时才从 Markdown 内容中提取第一个标题
+        if title is _UNSET:
+            title = _extract_title(content)
         if not title:
-            title_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
-            if title_match:
-                title = title_match.group(1).strip()
-            else:
-                title = "数据分析报告"
+            title = "数据分析报告"
         
         # 根据官方文档，msgParam 应包含 title 和 text 字段
-        msg_param = json.dumps({
+        msg_param = dumps({
             "title": title,
             "text": content
-        }, ensure_ascii=False)
+        })
         msg_key = 'sampleMarkdown'
         
-        # 输出完整的消息体到日志
-        request_body = {
-            "msgKey": msg_key,
-            "msgParam": msg_param,
-            "openConversationId": open_conversation_id,
-            "robotCode": self._robot_code
-        }
-        logger.info(f"[钉钉] 发送群聊 Markdown 消息 - 完整消息体:")
-        logger.info(f"  msgKey: {msg_key}")
-        logger.info(f"  msgParam: {msg_param}")
-        logger.info(f"  openConversationId: {open_conversation_id}")
-        logger.info(f"  robotCode: {self._robot_code}")
-        logger.info(f"  Markdown 内容长度: {len(content)} 字符")
-        logger.info(f"  Markdown 内容预览:\n{content[:500]}..." if len(content) > 500 else f"  Markdown 完整内容:\n{content}")
-        
-        client = dingtalkrobot_1_0Client(self._config)
-        org_group_send_headers = dingtalkrobot__1__0_models.OrgGroupSendHeaders()
+        # 输出完整的消息体到日志（合并为一条记录，INFO 关闭时不做任何格式化）
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[钉钉] 发送群聊 Markdown 消息 - 完整消息体:\n"
+                "  msgKey: %s\n  openConversationId: %s\n  robotCode: %s\n"
+                "  Markdown 内容长度: %d 字符\n  Markdown 内容预览:\n%s",
+                msg_key, open_conversation_id, robot_code,
+                len(content), _content_preview(content),
+            )
+        # msgParam 包含完整内容，仅在 DEBUG 级别下输出
+        logger.debug("  msgParam: %s", msg_param)
+        
+        org_group_send_headers = models.OrgGroupSendHeaders()
         org_group_send_headers.x_acs_dingtalk_access_token = access_token
-        org_group_send_request = dingtalkrobot__1__0_models.OrgGroupSendRequest(
+        org_group_send_request = models.OrgGroupSendRequest(
             msg_param=msg_param,
             msg_key=msg_key,
             open_conversation_id=open_conversation_id,
-            robot_code=self._robot_code
+            robot_code=robot_code
         )
         try:
-            response = client.org_group_send_with_options(
+            response = self._robot_client.org_group_send_with_options(
                 org_group_send_request,
                 org_group_send_headers,
-                util_models.RuntimeOptions()
+                self._runtime_options
             )
-            logger.info(f"群聊消息已发送: {open_conversation_id}")
+            logger.info("群聊消息已发送: %s", open_conversation_id)
             return response
         except Exception as err:
-            logger.error(f"发送群聊消息失败: {err}")
+            logger.error("发送群聊消息失败: %s", err)
             raise DingTalkApiException(code=-1, msg=f"发送群聊消息失败: {err}")
 
-    def _send_private_message(self, access_token: str, user_ids: list, content: str, title: Optional[str] = None):
+    def _send_private_message(self, access_token: str, user_ids: list, content: str, title: Any = _UNSET):
         """发送私聊消息（Markdown 格式）
         
         根据钉钉官方文档，msgParam 应包含 title 和 text 两个字段。
@@ -195,60 +340,71 @@ class DingTalkApiClient(ApiClientBase):
             access_token: 访问令牌
             user_ids: 用户 ID 列表
             content: Markdown 文本内容
-            title: 消息标题（如果未提供，从 content 中提取或使用默认值）
+            title: 消息标题（未传入时从 content 中提取，为空时使用默认值）
         """
-        # 如果没有提供标题，尝试从 Markdown 内容中提取第一个标题
+        # 仅在调用方未传入标题时才从 Markdown 内容中提取第一个标题
+        if title is _UNSET:
+            title = _extract_title(content)
         if not title:
-            title_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
-            if title_match:
-                title = title_match.group(1).strip()
-            else:
-                title = "数据分析报告"
+            title = "数据分析报告"
         
         # 根据官方文档，msgParam 应包含 title 和 text 字段
         msg_key = 'sampleMarkdown'
-        msg_param = json.dumps({
+        msg_param = dumps({
             "title": title,
             "text": content
-        }, ensure_ascii=False)
+        })
 
-        # 输出完整的消息体到日志
-        request_body = {
-            "msgKey": msg_key,
-            "msgParam": msg_param,
-            "userIds": user_ids,
-            "robotCode": self._robot_code
-        }
-        logger.info(f"[钉钉] 发送私聊 Markdown 消息 - 完整消息体:")
-        logger.info(f"  msgKey: {msg_key}")
-        logger.info(f"  msgParam: {msg_param}")
-        logger.info(f"  userIds: {user_ids}")
-        logger.info(f"  robotCode: {self._robot_code}")
-        logger.info(f"  Markdown 内容长度: {len(content)} 字符")
-        logger.info(f"  Markdown 内容预览:\n{content[:500]}..." if len(content) > 500 else f"  Markdown 完整内容:\n{content}")
-
-        client = dingtalkrobot_1_0Client(self._config)
-        batch_send_otoheaders = dingtalkrobot__1__0_models.BatchSendOTOHeaders()
+        # 输出完整的消息体到日志（合并为一条记录，INFO 关闭时不做任何格式化）
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[钉钉] 发送私聊 Markdown 消息 - 完整消息体:\n"
+                "  msgKey: %s\n  userIds: %s\n  robotCode: %s\n"
+                "  Markdown 内容长度: %d 字符\n  Markdown 内容预览:\n%s",
+                msg_key, user_ids, self._robot_code,
+                len(content), _content_preview(content),
+            )
+        # msgParam 包含完整内容，仅在 DEBUG 级别下输出
+        logger.debug("  msgParam: %s", msg_param)
+
+        if len(user_ids) <= self.OTO_BATCH_SIZE:
+            return self._batch_send_oto(access_token, user_ids, msg_key, msg_param)
+
+        # 超过单次接收人上限时分批并发发送，msgParam 只序列化一次供所有批次复用
+        batches = [
+            user_ids[i:i + self.OTO_BATCH_SIZE]
+            for i in range(0, len(user_ids), self.OTO_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=min(self.OTO_MAX_WORKERS, len(batches))) as executor:
+            return list(executor.map(
+                lambda batch: self._batch_send_oto(access_token, batch, msg_key, msg_param),
+                batches,
+            ))
+
+    def _batch_send_oto(self, access_token: str, user_ids: list, msg_key: str, msg_param: str):
+        """调用 batchSendOTO 接口向一批用户发送同一条消息"""
+        models = dingtalkrobot__1__0_models
+        batch_send_otoheaders = models.BatchSendOTOHeaders()
         batch_send_otoheaders.x_acs_dingtalk_access_token = access_token
-        batch_send_otorequest = dingtalkrobot__1__0_models.BatchSendOTORequest(
+        batch_send_otorequest = models.BatchSendOTORequest(
             robot_code=self._robot_code,
             user_ids=user_ids,
             msg_key=msg_key,
             msg_param=msg_param
         )
         try:
-            response = client.batch_send_otowith_options(
+            response = self._robot_client.batch_send_otowith_options(
                 batch_send_otorequest,
                 batch_send_otoheaders,
-                util_models.RuntimeOptions()
+                self._runtime_options
             )
-            logger.info(f"私聊消息已发送: {user_ids}")
+            logger.info("私聊消息已发送: %s", user_ids)
             return response
         except Exception as err:
-            logger.error(f"发送私聊消息失败: {err}")
+            logger.error("发送私聊消息失败: %s", err)
             raise DingTalkApiException(code=-1, msg=f"发送私聊消息失败: {err}")
 
-    def _send_via_webhook(self, session_webhook: str, content: str, title: Optional[str] = None):
+    def _send_via_webhook(self, session_webhook: str, content: str, title: Any = _UNSET):
         """通过 session_webhook 发送消息（Stream 模式推荐方式）
         
         根据钉钉官方文档，Webhook 方式发送 Markdown 消息的格式为：
@@ -263,17 +419,52 @@ class DingTalkApiClient(ApiClientBase):
         Args:
             session_webhook: 会话 webhook URL
             content: Markdown 文本内容
-            title: 消息标题（如果未提供，从 content 中提取或使用默认值）
+            title: 消息标题（未传入时从 content 中提取，为空时使用默认值）
         """
-        import requests
-        
-        # 如果没有提供标题，尝试从 Markdown 内容中提取第一个标题
+        request_headers, body = self._build_webhook_markdown(content, title)
+        try:
+            response = self._session.post(
+                session_webhook,
+                headers=request_headers,
+                data=body,
+                timeout=self.WEBHOOK_TIMEOUT,
+            )
+            response.raise_for_status()
+            logger.info(f"通过 webhook 发送 Markdown 消息成功")
+            return response.json()
+        except Exception as err:
+            logger.error(f"通过 webhook 发送消息失败: {err}")
+            raise DingTalkApiException(code=-1, msg=f"通过 webhook 发送消息失败: {err}")
+
+    async def _send_via_webhook_async(self, session_webhook: str, content: str, title: Any = _UNSET):
+        """通过 session_webhook 异步发送消息（参数同 _send_via_webhook），不阻塞事件循环"""
+        request_headers, body = self._build_webhook_markdown(content, title)
+        connect_timeout, read_timeout = self.WEBHOOK_TIMEOUT
+        try:
+            response = await self._get_async_client().post(
+                session_webhook,
+                headers=request_headers,
+                content=body,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+            response.raise_for_status()
+            logger.info("通过 webhook 发送 Markdown 消息成功")
+            return response.json()
+        except Exception as err:
+            logger.error("通过 webhook 发送消息失败: %s", err)
+            raise DingTalkApiException(code=-1, msg=f"通过 webhook 发送消息失败: {err}")
+
+    def _build_webhook_markdown(self, content: str, title: Any = _UNSET) -> tuple[Dict[str, str], bytes]:
+        """构建 Webhook Markdown 消息的请求头和请求体
+
+        Returns:
+            (请求头, JSON 请求体)
+        """
+        # 仅在调用方未传入标题时才从 Markdown 内容中提取第一个标题
+        if title is _UNSET:
+            title = _extract_title(content)
         if not title:
-            title_match = re.search(r'^#+\s+(.+)$', content, re.MULTILINE)
-            if title_match:
-                title = title_match.group(1).strip()
-            else:
-                title = "数据分析报告"
+            title = "数据分析报告"
         
         request_headers = {
             'Content-Type': 'application/json',
@@ -289,22 +480,17 @@ class DingTalkApiClient(ApiClientBase):
             }
         }
         
-        # 输出完整的消息体到日志
-        logger.info(f"[钉钉] 通过 Webhook 发送 Markdown 消息 - 完整消息体:")
-        logger.info(f"  msgtype: markdown")
-        logger.info(f"  title: {title}")
-        logger.info(f"  Markdown 内容长度: {len(content)} 字符")
-        logger.info(f"  Markdown 内容预览:\n{content[:500]}..." if len(content) > 500 else f"  Markdown 完整内容:\n{content}")
-        logger.info(f"  完整 payload: {json.dumps(payload, ensure_ascii=False, indent=2)}")
-        
-        try:
-            response = requests.post(session_webhook, headers=request_headers, json=payload)
-            response.raise_for_status()
-            logger.info(f"通过 webhook 发送 Markdown 消息成功")
-            return response.json()
-        except Exception as err:
-            logger.error(f"通过 webhook 发送消息失败: {err}")
-            raise DingTalkApiException(code=-1, msg=f"通过 webhook 发送消息失败: {err}")
+        # 输出完整的消息体到日志（合并为一条记录，INFO 关闭时不做任何格式化）
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[钉钉] 通过 Webhook 发送 Markdown 消息 - 完整消息体:\n"
+                "  msgtype: markdown\n  title: %s\n  Markdown 内容长度: %d 字符\n  Markdown 内容预览:\n%s",
+                title, len(content), _content_preview(content),
+            )
+        # payload 已包含上面的全部内容，仅在 DEBUG 级别下序列化输出
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  完整 payload: %s", dumps(payload))
+        return request_headers, dumps_bytes(payload)
 
     def send_rich_text_message(
         self,
@@ -313,7 +499,8 @@ class DingTalkApiClient(ApiClientBase):
         content: Dict[str, Any],
         message_id: Optional[str] = None,
         is_group: bool = False,
-        session_webhook: Optional[str] = None
+        session_webhook: Optional[str] = None,
+        title: Optional[str] = None
     ):
         """发送富文本消息（转换为 Markdown 格式）
 
@@ -326,6 +513,7 @@ class DingTalkApiClient(ApiClientBase):
             message_id: 消息 ID（群聊时用于回复）
             is_group: 是否为群聊
             session_webhook: 会话 webhook（Stream 模式推荐使用）
+            title: 消息标题（可选，未提供时从转换后的 Markdown 中提取）
         """
         # 如果 content 已经是字符串（Markdown 格式），直接使用
         if isinstance(content, str):
@@ -341,9 +529,43 @@ class DingTalkApiClient(ApiClientBase):
             markdown_content,
             message_id=message_id,
             is_group=is_group,
-            session_webhook=session_webhook
+            session_webhook=session_webhook,
+            title=title
         )
 
+    async def send_rich_text_message_async(
+        self,
+        receive_id_type: str,
+        receive_id: str,
+        content: Dict[str, Any],
+        message_id: Optional[str] = None,
+        is_group: bool = False,
+        session_webhook: Optional[str] = None,
+        title: Optional[str] = None
+    ):
+        """异步发送富文本消息（参数同 send_rich_text_message）
+
+        提供 session_webhook 时直接用异步 HTTP 客户端发送；OpenAPI 方式依赖同步 SDK，在线程中执行。
+        """
+        if not session_webhook:
+            return await asyncio.to_thread(
+                self.send_rich_text_message,
+                receive_id_type,
+                receive_id,
+                content,
+                message_id=message_id,
+                is_group=is_group,
+                title=title,
+            )
+
+        if isinstance(content, str):
+            markdown_content = content
+        else:
+            markdown_content = self._convert_rich_text_to_markdown(content)
+        if title is None:
+            title = _extract_title(markdown_content)
+        return await self._send_via_webhook_async(session_webhook, markdown_content, title=title)
+
     def _convert_rich_text_to_markdown(self, content: Dict[str, Any]) -> str:
         """将富文本内容转换为钉钉 Markdown 格式
         
@@ -364,79 +586,37 @@ class DingTalkApiClient(ApiClientBase):
             content_data = zh_cn.get("content", "")
             images = zh_cn.get("images", [])
             
-            lines = []
-            
-            # 添加标题
-            if title:
-                lines.append(f"# {title}")
-                lines.append("")  # 空行
-            
+            lines: list[str] = [f"# {title}", ""] if title else []
+
             # 处理内容
-            # 1. content 是字符串（Markdown 格式）
+            # 1. content 是字符串（Markdown 格式），换行格式在合并所有行后统一处理
             if isinstance(content_data, str):
-                # 处理换行：确保 \n 前后有2个空格（如果还没有）
-                # 将单个 \n 替换为 "  \n  "（前后各2个空格）
-                content_data = re.sub(r'([^\n])\n([^\n])', r'\1  \n  \2', content_data)
                 lines.append(content_data)
             # 2. content 是二维数组（飞书格式）
             elif isinstance(content_data, list):
                 for row in content_data:
                     if isinstance(row, list):
                         # 行是元素列表
-                        row_text = []
-                        for elem in row:
-                            if isinstance(elem, dict):
-                                tag = elem.get("tag", "")
-                                if tag == "text":
-                                    text = elem.get("text", "")
-                                    # 处理文本格式
-                                    if elem.get("style"):
-                                        styles = elem.get("style", [])
-                                        if "bold" in styles:
-                                            text = f"**{text}**"
-                                        if "italic" in styles:
-                                            text = f"*{text}*"
-                                    row_text.append(text)
-                                elif tag == "img":
-                                    image_key = elem.get("image_key", "")
-                                    if image_key:
-                                        row_text.append(f"![]({image_key})")
-                                    else:
-                                        row_text.append("[图片]")
-                                elif tag == "a":
-                                    href = elem.get("href", "")
-                                    link_text = elem.get("text", "")
-                                    row_text.append(f"[{link_text}]({href})")
-                        if row_text:
-                            lines.append("".join(row_text))
+                        parts = [_render_elem(elem) for elem in row if isinstance(elem, dict)]
+                        parts = [part for part in parts if part is not None]
+                        if parts:
+                            lines.append("".join(parts))
                     elif isinstance(row, dict):
                         # 行本身是元素
-                        tag = row.get("tag", "")
-                        if tag == "text":
-                            text = row.get("text", "")
+                        text = _render_elem(row)
+                        if text is not None:
                             lines.append(text)
-                        elif tag == "img":
-                            image_key = row.get("image_key", "")
-                            if image_key:
-                                lines.append(f"![]({image_key})")
-                            else:
-                                lines.append("[图片]")
                     elif isinstance(row, str):
                         # 行是字符串
                         lines.append(row)
-            
+
             # 添加图片（如果有）
             if images:
                 lines.append("")  # 空行
-                for image_url in images:
-                    lines.append(f"![]({image_url})")
-            
-            # 合并所有行，确保换行格式正确
-            result = "\n".join(lines)
-            # 确保换行前后有2个空格（钉钉要求）
-            result = re.sub(r'([^\n])\n([^\n])', r'\1  \n  \2', result)
-            
-            return result
+                lines.extend(f"![]({image_url})" for image_url in images)
+
+            # 合并所有行，一次替换确保换行前后有2个空格（钉钉要求）
+            return _NL_FIX_RE.sub('  \n  ', "\n".join(lines))
         
         # 如果不是预期的格式，尝试直接转换
         if isinstance(content, str):
@@ -467,6 +647,51 @@ class DingTalkApiClient(ApiClientBase):
         Returns:
             保存的文件路径
         """
+        access_token, actual_robot_code = self._download_credentials(robot_code)
+
+        try:
+            download_url = self._get_download_url(file_key, access_token, actual_robot_code)
+
+            # 第二步：使用 downloadUrl 下载文件
+            with self._session.get(download_url, stream=True, timeout=self.DOWNLOAD_TIMEOUT) as file_response:
+                file_response.raise_for_status()
+
+                # 确保保存目录存在
+                save_path.parent.mkdir(parents=True, exist_ok=True)
+
+                # 保存文件：直接从底层响应流按大块复制（循环在 C 中执行），由 urllib3 负责解压
+                file_response.raw.decode_content = True
+                with open(save_path, "wb") as f:
+                    shutil.copyfileobj(file_response.raw, f, length=self.DOWNLOAD_COPY_SIZE)
+            
+            logger.info(f"文件已下载: {save_path} (大小: {save_path.stat().st_size} bytes)")
+            return save_path
+
+        except Exception as err:
+            raise self._download_error(err)
+
+    async def download_file_async(
+        self,
+        file_key: str,
+        save_path: Path,
+        message_id: Optional[str] = None,
+        resource_type: str = "file",
+        robot_code: Optional[str] = None
+    ) -> Path:
+        """异步下载文件（参数同 download_file）
+
+        获取下载链接的 SDK 调用在线程中执行，文件内容流式写入磁盘。
+        """
+        access_token, actual_robot_code = await asyncio.to_thread(self._download_credentials, robot_code)
+
+        try:
+            download_url = await asyncio.to_thread(self._get_download_url, file_key, access_token, actual_robot_code)
+            return await self._stream_to_file(download_url, save_path)
+        except Exception as err:
+            raise self._download_error(err)
+
+    def _download_credentials(self, robot_code: Optional[str]) -> tuple[str, str]:
+        """获取下载文件所需的访问令牌和 robot_code"""
         access_token = self.access_token
         if not access_token:
             raise DingTalkApiException(code=-1, msg="无法获取访问令牌")
@@ -475,76 +700,71 @@ class DingTalkApiClient(ApiClientBase):
         actual_robot_code = robot_code or self._robot_code
         if not actual_robot_code:
             raise DingTalkApiException(code=-1, msg="robot_code 不能为空")
-        
+
+        return access_token, actual_robot_code
+
+    def _get_download_url(self, file_key: str, access_token: str, robot_code: str) -> str:
+        """调用钉钉 SDK 获取文件的下载链接
+
+        Args:
+            file_key: 文件 downloadCode
+            access_token: 访问令牌
+            robot_code: 机器人 Code
+
+        Returns:
+            下载链接
+        """
         # 使用钉钉 SDK 下载文件
-        client = dingtalkrobot_1_0Client(self._config)
+        client = self._robot_client
         robot_message_file_download_headers = dingtalkrobot__1__0_models.RobotMessageFileDownloadHeaders()
         robot_message_file_download_headers.x_acs_dingtalk_access_token = access_token
         
         robot_message_file_download_request = dingtalkrobot__1__0_models.RobotMessageFileDownloadRequest(
             download_code=file_key,
-            robot_code=actual_robot_code
+            robot_code=robot_code
         )
         
-        logger.info(f"开始下载文件 - downloadCode: {file_key[:20]}..., robotCode: {actual_robot_code}")
+        logger.info(f"开始下载文件 - downloadCode: {file_key[:20]}..., robotCode: {robot_code}")
         
-        try:
-            # 第一步：调用 API 获取下载链接
-            response = client.robot_message_file_download_with_options(
-                robot_message_file_download_request,
-                robot_message_file_download_headers,
-                util_models.RuntimeOptions()
-            )
-            
-            # 从响应体中获取 downloadUrl
-            if not hasattr(response, 'body'):
-                raise DingTalkApiException(code=-1, msg="响应中缺少 body 字段")
-            
-            response_body = response.body
-            # RobotMessageFileDownloadResponseBody 对象应该有 download_url 属性
-            download_url = None
-            if hasattr(response_body, 'download_url'):
-                download_url = response_body.download_url
-            elif hasattr(response_body, 'downloadUrl'):
-                download_url = response_body.downloadUrl
-            elif hasattr(response_body, 'downloadurl'):
-                download_url = response_body.downloadurl
-            else:
-                # 尝试查看所有属性
-                logger.warning(f"响应体属性: {dir(response_body)}")
-                # 尝试通过字典方式访问
-                if isinstance(response_body, dict):
-                    download_url = response_body.get('downloadUrl') or response_body.get('download_url')
-            
-            if not download_url:
-                logger.error(f"无法从响应体中获取 downloadUrl，响应体类型: {type(response_body)}, 属性: {dir(response_body)}")
-                raise DingTalkApiException(code=-1, msg="响应中缺少 downloadUrl 字段")
-            
-            logger.info(f"获取到下载链接: {download_url[:100]}...")
-            
-            # 第二步：使用 downloadUrl 下载文件
-            import requests
-            file_response = requests.get(download_url, stream=True, timeout=30)
-            file_response.raise_for_status()
-            
-            # 确保保存目录存在
-            save_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 保存文件
-            with open(save_path, "wb") as f:
-                for chunk in file_response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            logger.info(f"文件已下载: {save_path} (大小: {save_path.stat().st_size} bytes)")
-            return save_path
-            
-        except Exception as err:
-            error_code = getattr(err, 'code', -1)
-            error_msg = getattr(err, 'message', str(err))
-            logger.error(f"下载文件失败 - 错误码: {error_code}, 错误信息: {error_msg}")
-            logger.error(f"异常类型: {type(err)}, 异常详情: {err}")
-            raise DingTalkApiException(code=error_code, msg=f"下载文件失败: {error_msg}")
+        # 第一步：调用 API 获取下载链接
+        response = client.robot_message_file_download_with_options(
+            robot_message_file_download_request,
+            robot_message_file_download_headers,
+            self._runtime_options
+        )
+        
+        # 从响应体中获取 downloadUrl
+        response_body = getattr(response, 'body', None)
+        if response_body is None:
+            raise DingTalkApiException(code=-1, msg="响应中缺少 body 字段")
+
+        # RobotMessageFileDownloadResponseBody 对象应该有 download_url 属性，其余写法作为兜底
+        download_url = (
+            getattr(response_body, 'download_url', None)
+            or getattr(response_body, 'downloadUrl', None)
+            or getattr(response_body, 'downloadurl', None)
+        )
+        if not download_url and isinstance(response_body, dict):
+            download_url = response_body.get('downloadUrl') or response_body.get('download_url')
+
+        if not download_url:
+            logger.error("无法从响应体中获取 downloadUrl，响应体类型: %s", type(response_body))
+            # 属性列表开销较大，仅在 DEBUG 级别下输出
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("响应体属性: %s", dir(response_body))
+            raise DingTalkApiException(code=-1, msg="响应中缺少 downloadUrl 字段")
+        
+        logger.info(f"获取到下载链接: {download_url[:100]}...")
+        return download_url
+
+    @staticmethod
+    def _download_error(err: Exception) -> "DingTalkApiException":
+        """将下载过程中的异常转换为 DingTalkApiException"""
+        error_code = getattr(err, 'code', -1)
+        error_msg = getattr(err, 'message', str(err))
+        logger.error(f"下载文件失败 - 错误码: {error_code}, 错误信息: {error_msg}")
+        logger.error(f"异常类型: {type(err)}, 异常详情: {err}")
+        return DingTalkApiException(code=error_code, msg=f"下载文件失败: {error_msg}")
 
     def upload_image(self, image_path: Path) -> str:
         """上传图片并获取 media_id
@@ -584,48 +804,43 @@ class DingTalkApiClient(ApiClientBase):
         Returns:
             media_id
         """
-        from urllib.parse import quote_plus
-        
-        access_token = self.access_token
-        if not access_token:
+        # 同一文件（路径、大小、修改时间均未变）在 media_id 有效期内直接复用，不重复上传；
+        # 未命中时再按内容摘要查找，路径或修改时间不同但内容相同的文件（如每份报告重新生成的
+        # logo、模板图）也能复用。只有未命中路径缓存时才读取文件计算摘要
+        path_key = content_key = None
+        try:
+            stat = file_path.stat()
+            path_key = ("path", str(file_path.resolve()), stat.st_size, stat.st_mtime_ns, file_type)
+        except OSError:
+            pass
+        if path_key is not None:
+            cached = self._get_cached_media(path_key)
+            if cached is None:
+                content_key = self._content_key(file_path, stat.st_size, file_type)
+                if content_key is not None:
+                    cached = self._get_cached_media(content_key)
+                    if cached is not None:
+                        # 沿用原 media_id 的过期时间
+                        self._cache_media_id(path_key, *cached)
+            if cached is not None:
+                media_id = cached[0]
+                logger.info("复用已上传文件: %s, media_id: %.20s..., 类型: %s", file_path.name, media_id, file_type)
+                return media_id
+
+        if not self.access_token:
             raise DingTalkApiException(code=-1, msg="无法获取访问令牌")
+        # 上传地址随令牌一起缓存，令牌有效期内无需重复拼接
+        upload_url = self._token_cache["upload_url"]
         
         # 确定 MIME 类型
-        suffix = file_path.suffix.lower()
-        mime_types = {
-            # 图片类型
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.bmp': 'image/bmp',
-            '.webp': 'image/webp',
-            # 文档类型
-            '.pdf': 'application/pdf',
-            '.doc': 'application/msword',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.xls': 'application/vnd.ms-excel',
-            '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            '.csv': 'text/csv',
-            '.txt': 'text/plain',
-            '.json': 'application/json',
-            '.zip': 'application/zip',
-            '.rar': 'application/x-rar-compressed',
-        }
-        mimetype = mime_types.get(suffix, 'application/octet-stream')
-        
-        # 上传文件
-        upload_url = f'https://oapi.dingtalk.com/media/upload?access_token={quote_plus(access_token)}'
+        mimetype = _MIME_TYPES.get(file_path.suffix.lower(), 'application/octet-stream')
         
         try:
-            with open(file_path, 'rb') as f:
-                files = {
-                    'media': (file_path.name, f.read(), mimetype)
-                }
-                data = {
-                    'type': file_type
-                }
-                response = requests.post(upload_url, data=data, files=files, timeout=60)
+            # 流式上传，不把整个文件读入内存
+            with MultipartFileBody({'type': file_type}, 'media', file_path, mimetype) as body:
+                response = self._session.post(
+                    upload_url, data=body, headers={'Content-Type': body.content_type}, timeout=60
+                )
                 response.raise_for_status()
                 
                 result = response.json()
@@ -636,6 +851,10 @@ class DingTalkApiClient(ApiClientBase):
                 
                 media_id = result['media_id']
                 logger.info(f"文件已上传: {file_path.name}, media_id: {media_id[:20]}..., 类型: {file_type}")
+                if path_key is not None:
+                    self._cache_media_id(path_key, media_id)
+                if content_key is not None:
+                    self._cache_media_id(content_key, media_id)
                 return media_id
                 
         except requests.exceptions.RequestException as e:
@@ -645,6 +864,49 @@ class DingTalkApiClient(ApiClientBase):
             logger.error(f"上传文件失败: {e}")
             raise DingTalkApiException(code=-1, msg=f"上传文件失败: {e}")
 
+    def _content_key(self, file_path: Path, size: int, file_type: str) -> Optional[tuple]:
+        """按文件内容计算缓存键（分块读取），读取失败返回 None"""
+        digest = hashlib.sha1(usedforsecurity=False)
+        try:
+            with open(file_path, "rb") as f:
+                while chunk := f.read(self.HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return ("sha1", size, digest.hexdigest(), file_type)
+
+    def _get_cached_media(self, cache_key: tuple) -> Optional[tuple[str, float]]:
+        """查找未过期的已上传 media_id
+
+        Returns:
+            (media_id, 过期时间)，未命中返回 None
+        """
+        with self._media_lock:
+            entry = self._media_cache.get(cache_key)
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                del self._media_cache[cache_key]
+                return None
+            self._media_cache.move_to_end(cache_key)
+            return entry
+
+    def _cache_media_id(self, cache_key: tuple, media_id: str, expire: Optional[float] = None):
+        """记录上传结果，超出容量时淘汰最久未使用的条目
+
+        Args:
+            cache_key: 缓存键
+            media_id: 上传得到的 media_id
+            expire: 过期时间（默认从现在起 MEDIA_ID_TTL 秒后）
+        """
+        if expire is None:
+            expire = time.time() + self.MEDIA_ID_TTL
+        with self._media_lock:
+            self._media_cache[cache_key] = (media_id, expire)
+            self._media_cache.move_to_end(cache_key)
+            while len(self._media_cache) > self.MEDIA_CACHE_SIZE:
+                self._media_cache.popitem(last=False)
+
     def send_file_message(
         self,
         receive_id_type: str,
@@ -670,20 +932,7 @@ class DingTalkApiClient(ApiClientBase):
         media_id = self.upload_file(file_path)
         
         # 确定文件类型
-        suffix = file_path.suffix.lower()
-        file_type_map = {
-            '.pdf': 'pdf',
-            '.doc': 'doc',
-            '.docx': 'docx',
-            '.xls': 'xls',
-            '.xlsx': 'xlsx',
-            '.csv': 'csv',
-            '.txt': 'txt',
-            '.json': 'json',
-            '.zip': 'zip',
-            '.rar': 'rar',
-        }
-        file_type = file_type_map.get(suffix, 'file')
+        file_type = _FILE_TYPE_MAP.get(file_path.suffix.lower(), 'file')
         
         # 如果提供了 session_webhook，使用 webhook 方式发送
         if session_webhook:
@@ -709,22 +958,22 @@ class DingTalkApiClient(ApiClientBase):
         file_type: str
     ):
         """发送群聊文件消息"""
-        msg_param = json.dumps({
+        msg_param = dumps({
             "mediaId": media_id,
             "fileName": file_name,
             "fileType": file_type
-        }, ensure_ascii=False)
+        })
         msg_key = 'sampleFile'
         
         # 输出完整的消息体到日志
-        logger.info(f"[钉钉] 发送群聊文件消息 - 完整消息体:")
-        logger.info(f"  msgKey: {msg_key}")
-        logger.info(f"  msgParam: {msg_param}")
-        logger.info(f"  openConversationId: {open_conversation_id}")
-        logger.info(f"  robotCode: {self._robot_code}")
-        logger.info(f"  文件信息: {file_name} (类型: {file_type}, mediaId: {media_id[:20]}...)")
-        
-        client = dingtalkrobot_1_0Client(self._config)
+        logger.info(
+            "[钉钉] 发送群聊文件消息 - 完整消息体:\n"
+            "  msgKey: %s\n  msgParam: %s\n  openConversationId: %s\n  robotCode: %s\n"
+            "  文件信息: %s (类型: %s, mediaId: %.20s...)",
+            msg_key, msg_param, open_conversation_id, self._robot_code, file_name, file_type, media_id,
+        )
+        
+        client = self._robot_client
         org_group_send_headers = dingtalkrobot__1__0_models.OrgGroupSendHeaders()
         org_group_send_headers.x_acs_dingtalk_access_token = access_token
         org_group_send_request = dingtalkrobot__1__0_models.OrgGroupSendRequest(
@@ -737,7 +986,7 @@ class DingTalkApiClient(ApiClientBase):
             response = client.org_group_send_with_options(
                 org_group_send_request,
                 org_group_send_headers,
-                util_models.RuntimeOptions()
+                self._runtime_options
             )
             logger.info(f"群聊文件消息已发送: {file_name}")
             return response
@@ -755,21 +1004,21 @@ class DingTalkApiClient(ApiClientBase):
     ):
         """发送私聊文件消息"""
         msg_key = 'sampleFile'
-        msg_param = json.dumps({
+        msg_param = dumps({
             "mediaId": media_id,
             "fileName": file_name,
             "fileType": file_type
-        }, ensure_ascii=False)
+        })
 
         # 输出完整的消息体到日志
-        logger.info(f"[钉钉] 发送私聊文件消息 - 完整消息体:")
-        logger.info(f"  msgKey: {msg_key}")
-        logger.info(f"  msgParam: {msg_param}")
-        logger.info(f"  userIds: {user_ids}")
-        logger.info(f"  robotCode: {self._robot_code}")
-        logger.info(f"  文件信息: {file_name} (类型: {file_type}, mediaId: {media_id[:20]}...)")
-
-        client = dingtalkrobot_1_0Client(self._config)
+        logger.info(
+            "[钉钉] 发送私聊文件消息 - 完整消息体:\n"
+            "  msgKey: %s\n  msgParam: %s\n  userIds: %s\n  robotCode: %s\n"
+            "  文件信息: %s (类型: %s, mediaId: %.20s...)",
+            msg_key, msg_param, user_ids, self._robot_code, file_name, file_type, media_id,
+        )
+
+        client = self._robot_client
         batch_send_otoheaders = dingtalkrobot__1__0_models.BatchSendOTOHeaders()
         batch_send_otoheaders.x_acs_dingtalk_access_token = access_token
         batch_send_otorequest = dingtalkrobot__1__0_models.BatchSendOTORequest(
@@ -782,7 +1031,7 @@ class DingTalkApiClient(ApiClientBase):
             response = client.batch_send_otowith_options(
                 batch_send_otorequest,
                 batch_send_otoheaders,
-                util_models.RuntimeOptions()
+                self._runtime_options
             )
             logger.info(f"私聊文件消息已发送: {file_name}")
             return response
@@ -801,8 +1050,6 @@ class DingTalkApiClient(ApiClientBase):
         
         注意：Webhook 方式可能不支持文件消息，这里尝试发送，如果失败会记录日志
         """
-        import requests
-        
         # Webhook 方式可能不支持文件消息，尝试发送文本消息提示
         # 或者可以尝试使用 file 类型的消息格式
         payload = {
@@ -814,10 +1061,14 @@ class DingTalkApiClient(ApiClientBase):
         }
         
         # 输出完整的消息体到日志
-        logger.info(f"[钉钉] 通过 Webhook 发送文件消息 - 完整消息体:")
-        logger.info(f"  msgtype: file")
-        logger.info(f"  文件信息: {file_name} (类型: {file_type}, mediaId: {media_id[:20]}...)")
-        logger.info(f"  完整 payload: {json.dumps(payload, ensure_ascii=False, indent=2)}")
+        logger.info(
+            "[钉钉] 通过 Webhook 发送文件消息 - 完整消息体:\n"
+            "  msgtype: file\n  文件信息: %s (类型: %s, mediaId: %.20s...)",
+            file_name, file_type, media_id,
+        )
+        # payload 仅在 DEBUG 级别下序列化输出
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  完整 payload: %s", dumps(payload))
         
         request_headers = {
             'Content-Type': 'application/json',
@@ -825,7 +1076,12 @@ class DingTalkApiClient(ApiClientBase):
         }
         
         try:
-            response = requests.post(session_webhook, headers=request_headers, json=payload)
+            response = self._session.post(
+                session_webhook,
+                headers=request_headers,
+                data=dumps_bytes(payload),
+                timeout=self.WEBHOOK_TIMEOUT,
+            )
             response.raise_for_status()
             logger.info(f"通过 webhook 发送文件消息成功: {file_name}")
             return response.json()
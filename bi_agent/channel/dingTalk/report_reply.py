@@ -2,6 +2,8 @@
 
 import re
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Any, Optional
 
@@ -9,6 +11,19 @@ from bi_agent.channel.channel import ReportReplyBase, ApiClientBase
 
 logger = logging.getLogger(__name__)
 
+_TITLE_RE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+# 图片和文件链接合并为一个模式，一次扫描即可完成识别和替换
+_TOKEN_RE = re.compile(
+    r"(?P<img>!\[(?P<alt>[^\]]*)\]\((?P<src>[^)]+)\))"
+    r"|(?P<file>\[(?P<text>[^\]]+)\]\((?P<path>[^)]+\.(?:csv|xlsx|xls|txt|json|pdf))\))",
+    re.IGNORECASE,
+)
+# 分隔线行（连同前后的空行）与 3 个以上的连续换行合并为一个模式，一次扫描完成清理
+_CLEANUP_RE = re.compile(r"\n*(?:^---[^\S\n]*$\n*)+|\n{3,}", re.MULTILINE)
+_PLACEHOLDER_RE = re.compile(r"__IMAGE_PLACEHOLDER_\d+__")
+# 单个换行（钉钉要求前后各加 2 个空格），零宽断言使相邻换行一次替换即可全部处理
+_LINE_JOIN_RE = re.compile(r"(?<=[^\n])\n(?=[^\n])")
+
 
 class DingTalkReportReply(ReportReplyBase):
     """钉钉报告回复工具
@@ -16,6 +31,21 @@ class DingTalkReportReply(ReportReplyBase):
     将 BI-Agent 生成的 Markdown 报告转换为钉钉友好的格式。
     """
 
+    # 解析结果缓存的最大条目数（同一报告重试或发送给多个接收者时无需重新解析）
+    PARSE_CACHE_SIZE = 64
+
+    def __init__(self, api_client: ApiClientBase, output_dir: Path):
+        """初始化钉钉报告回复工具
+
+        Args:
+            api_client: API 客户端
+            output_dir: 输出目录（用于查找图片文件）
+        """
+        super().__init__(api_client, output_dir)
+        # (路径, 修改时间, 文件大小) -> 解析结果
+        self._parse_cache: "OrderedDict[tuple[str, int, int], Dict[str, Any]]" = OrderedDict()
+        self._parse_lock = threading.Lock()
+
     def parse_markdown(self, md_path: Path) -> Dict[str, Any]:
         """解析 Markdown 文件
 
@@ -23,52 +53,58 @@ class DingTalkReportReply(ReportReplyBase):
             md_path: Markdown 文件路径
 
         Returns:
-            解析后的内容字典
+            解析后的内容字典（每次返回新的字典，调用方可以写入新字段）
         """
-        with open(md_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        stat = md_path.stat()
+        cache_key = (str(md_path), stat.st_mtime_ns, stat.st_size)
+        with self._parse_lock:
+            parsed = self._parse_cache.get(cache_key)
+            if parsed is not None:
+                self._parse_cache.move_to_end(cache_key)
+                return dict(parsed)
 
-        title_match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
-        title = title_match.group(1) if title_match else "数据分析报告"
+        parsed = self._parse_content(md_path.read_text(encoding="utf-8"))
 
-        image_pattern = r"!\[.*?\]\((.*?)\)"
-        images = re.findall(image_pattern, content)
-        
-        image_info_pattern = r"!\[([^\]]*)\]\(([^)]+)\)"
-        image_matches = re.findall(image_info_pattern, content)
+        with self._parse_lock:
+            self._parse_cache[cache_key] = parsed
+            while len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+        return dict(parsed)
 
-        file_link_pattern = r"\[([^\]]+)\]\(([^)]+\.(?:csv|xlsx|xls|txt|json|pdf))\)"
-        file_links = re.findall(file_link_pattern, content, re.IGNORECASE)
+    def _parse_content(self, content: str) -> Dict[str, Any]:
+        """解析 Markdown 文本，返回标题、正文、图片和文件链接信息"""
+        title_match = _TITLE_RE.search(content)
+        title = title_match.group(1) if title_match else "数据分析报告"
 
-        text_content = content
+        images = []
         image_placeholders = []
-        
-        for idx, (alt_text, img_path) in enumerate(image_matches):
-            placeholder = f"__IMAGE_PLACEHOLDER_{idx}__"
-            image_placeholders.append((placeholder, alt_text, img_path))
-            pattern = re.escape(f"![{alt_text}]({img_path})")
-            if pattern in text_content or f"![{alt_text}]({img_path})" in text_content:
-                text_content = text_content.replace(f"![{alt_text}]({img_path})", placeholder, 1)
+        file_links = []
+        parts = []
+        pos = 0
+        for match in _TOKEN_RE.finditer(content):
+            parts.append(content[pos:match.start()])
+            pos = match.end()
+            if match.group("img") is not None:
+                # 图片替换为占位符，上传后再替换为 media_id
+                img_path = match.group("src")
+                placeholder = f"__IMAGE_PLACEHOLDER_{len(image_placeholders)}__"
+                images.append(img_path)
+                image_placeholders.append((placeholder, match.group("alt"), img_path))
+                parts.append(placeholder)
             else:
-                text_content = re.sub(pattern, placeholder, text_content, count=1)
-        
-        def replace_file_link(match):
-            link_text = match.group(1)
-            file_path = match.group(2)
-            if not file_path.startswith(('http://', 'https://')):
-                file_name = Path(file_path).name
-                if link_text == file_path or link_text == file_name:
-                    return file_name
-                return f"{link_text}: {file_name}"
-            return match.group(0)
-        
-        text_content = re.sub(file_link_pattern, replace_file_link, text_content, flags=re.IGNORECASE)
-        text_content = re.sub(r"\n{3,}", "\n\n", text_content).strip()
+                link_text, file_path = match.group("text"), match.group("path")
+                file_links.append((link_text, file_path))
+                parts.append(self._render_file_link(link_text, file_path, match.group(0)))
+        parts.append(content[pos:])
+        text_content = "".join(parts).lstrip()
         
+        # 去掉正文中与标题重复的一级标题行（标题是已知字面量，无需正则）
         if text_content.startswith(f"# {title}"):
-            text_content = re.sub(rf"^#\s+{re.escape(title)}\s*\n+", "", text_content, flags=re.MULTILINE)
-        text_content = re.sub(r"^---\s*$", "", text_content, flags=re.MULTILINE)
-        text_content = re.sub(r"\n{3,}", "\n\n", text_content).strip()
+            text_content = self._strip_title_lines(text_content, title)
+        # 分隔线行清空后与相邻空行一起折叠，最多保留一个空行；先做子串检查，无需清理的报告直接跳过
+        if "---" in text_content or "\n\n\n" in text_content:
+            text_content = _CLEANUP_RE.sub(self._collapse_blank_run, text_content)
+        text_content = text_content.strip()
         
         return {
             "title": title,
@@ -78,6 +114,50 @@ class DingTalkReportReply(ReportReplyBase):
             "file_links": file_links,  # 保存文件链接信息（可选，用于后续处理）
         }
 
+    @staticmethod
+    def _strip_title_lines(text: str, title: str) -> str:
+        """删除所有与标题重复的一级标题行及其后的空行
+
+        标题行之后没有其他内容时保留该行，避免只有标题的报告正文为空。
+        """
+        lines = text.split("\n")
+        # 最后一个非空行之后的标题行需要保留
+        last_content = max((i for i, line in enumerate(lines) if line.strip()), default=-1)
+        kept = []
+        skip_blank = False
+        for i, line in enumerate(lines):
+            if skip_blank and not line.strip():
+                continue
+            skip_blank = False
+            rest = line[1:].lstrip()
+            if (
+                i < last_content
+                and line[1:2].isspace()
+                and line.startswith("#")
+                and rest.startswith(title)
+                and not rest[len(title):].strip()
+            ):
+                skip_blank = True
+                continue
+            kept.append(line)
+        return "\n".join(kept)
+
+    @staticmethod
+    def _collapse_blank_run(match: re.Match) -> str:
+        """分隔线行去掉后只剩换行，超过 2 个时折叠为 2 个"""
+        return "\n" * min(match.group(0).count("\n"), 2)
+
+    @staticmethod
+    def _render_file_link(link_text: str, file_path: str, original: str) -> str:
+        """本地文件链接转换为纯文本文件名，网络链接保持原样"""
+        if file_path.startswith(('http://', 'https://')):
+            return original
+        # 只需要文件名，直接切分字符串，不构造 Path 对象
+        file_name = file_path.rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
+        if link_text == file_path or link_text == file_name:
+            return file_name
+        return f"{link_text}: {file_name}"
+
     async def send_report(
         self,
         receive_id_type: str,
@@ -97,37 +177,37 @@ class DingTalkReportReply(ReportReplyBase):
             is_group: 是否为群聊
             session_webhook: 会话 webhook（Stream 模式推荐使用）
         """
-        # 使用报告文件所在的目录作为 output_dir，确保图片路径解析正确
-        # 这样相对路径的图片（如 "销售增长率对比图.png"）可以正确找到
-        original_output_dir = self.output_dir
-        self.output_dir = md_path.parent
-        logger.info(f"使用报告文件所在目录作为 output_dir: {self.output_dir}")
+        # 使用报告文件所在的目录解析图片路径，确保相对路径的图片（如 "销售增长率对比图.png"）可以正确找到
+        # 目录作为参数传递，不修改共享的 self.output_dir（多个工作线程会同时发送报告）
+        base_dir = md_path.parent
+        logger.info(f"使用报告文件所在目录解析图片路径: {base_dir}")
         
-        try:
-            parsed = self.parse_markdown(md_path)
+        parsed = self.parse_markdown(md_path)
+        # 并发上传报告中的图片
+        await self._upload_report_images(parsed, base_dir)
 
-            # 构建钉钉 Markdown 消息内容
-            markdown_content = self._build_rich_text_content(parsed)
-            
-            # 发送 Markdown 消息
-            self.api_client.send_rich_text_message(
-                receive_id_type,
-                receive_id,
-                markdown_content,  # 直接传递 Markdown 字符串
-                message_id=message_id,
-                is_group=is_group,
-                session_webhook=session_webhook
-            )
-            
-            # 不发送非图片文件附件（根据用户要求，只支持图片格式）
-            # 文件链接已在文本中转换为纯文本显示，不再作为附件发送
-            file_links = parsed.get('file_links', [])
-            if file_links:
-                logger.info(f"检测到 {len(file_links)} 个文件链接，已转换为文本显示，不发送文件附件（仅支持图片格式）")
-        finally:
-            self.output_dir = original_output_dir
-
-    def _build_rich_text_content(self, parsed: Dict[str, Any]) -> str:
+        # 构建钉钉 Markdown 消息内容
+        markdown_content = self._build_rich_text_content(parsed, base_dir)
+        
+        # 发送 Markdown 消息（异步发送，不阻塞事件循环）
+        await self.api_client.send_rich_text_message_async(
+            receive_id_type,
+            receive_id,
+            markdown_content,  # 直接传递 Markdown 字符串
+            message_id=message_id,
+            is_group=is_group,
+            session_webhook=session_webhook,
+            # 报告标题已在解析时得到，发送时无需再从内容中提取
+            title=parsed['title'] or "数据分析报告"
+        )
+        
+        # 不发送非图片文件附件（根据用户要求，只支持图片格式）
+        # 文件链接已在文本中转换为纯文本显示，不再作为附件发送
+        file_links = parsed.get('file_links', [])
+        if file_links:
+            logger.info(f"检测到 {len(file_links)} 个文件链接，已转换为文本显示，不发送文件附件（仅支持图片格式）")
+
+    def _build_rich_text_content(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None) -> str:
         """构建钉钉 Markdown 消息内容
 
         钉钉使用 Markdown 格式发送消息，msgKey 为 sampleMarkdown。
@@ -148,26 +228,20 @@ class DingTalkReportReply(ReportReplyBase):
         
         # 用于去重的字典：key 是标准化路径，value 是 media_id
         uploaded_images = {}  # {标准化路径: media_id}
+        # 占位符 -> 替换后的文本，所有图片处理完后一次性替换
+        replacements = {}
         
-        # 处理图片占位符，上传图片并替换为 media_id
+        # 处理图片占位符，上传图片并确定替换内容
         for placeholder, alt_text, image_url in image_placeholders:
-            image_path = Path(image_url)
-            if not image_path.is_absolute():
-                image_path = self.output_dir / image_path
-            
-            # 标准化路径用于去重
-            try:
-                image_path_resolved = image_path.resolve()
-            except:
-                image_path_resolved = image_path
-            image_path_str_key = str(image_path_resolved)
+            # 相对路径基于 output_dir，标准化路径用于去重
+            image_path, image_path_str_key = self._resolve_image_path(image_url, base_dir)
             
             if image_path_str_key in uploaded_images:
                 media_id = uploaded_images[image_path_str_key]
                 logger.info(f"使用已上传的图片 media_id: {image_path.name}, media_id: {media_id[:20]}...")
             elif image_path.exists():
                 try:
-                    media_id = self.api_client.upload_image(image_path)
+                    media_id = self._upload_image_once(parsed, image_path_str_key, image_path)
                     uploaded_images[image_path_str_key] = media_id
                     logger.info(f"图片已上传: {image_path.name}, media_id: {media_id[:20]}...")
                 except Exception as e:
@@ -176,24 +250,34 @@ class DingTalkReportReply(ReportReplyBase):
                     if image_url.startswith(('http://', 'https://')):
                         media_id = image_url
                     else:
-                        content_text = content_text.replace(placeholder, "")
+                        replacements[placeholder] = ""
                         continue
             else:
                 logger.warning(f"图片文件不存在: {image_path}")
                 if image_url.startswith(('http://', 'https://')):
                     media_id = image_url
                 else:
-                    content_text = content_text.replace(placeholder, "")
+                    replacements[placeholder] = ""
                     continue
             
             alt_text_display = alt_text if alt_text else "图片"
-            if placeholder in content_text:
-                content_text = content_text.replace(placeholder, f"![{alt_text_display}]({media_id})", 1)
-            else:
-                logger.warning(f"占位符 {placeholder} 在内容中未找到，可能已被处理")
+            replacements[placeholder] = f"![{alt_text_display}]({media_id})"
+        
+        # 一次扫描替换所有占位符
+        replaced = set()
+
+        def replace_placeholder(match):
+            placeholder = match.group(0)
+            if placeholder not in replacements:
+                return placeholder
+            replaced.add(placeholder)
+            return replacements[placeholder]
+
+        content_text = _PLACEHOLDER_RE.sub(replace_placeholder, content_text)
+        for placeholder in replacements.keys() - replaced:
+            logger.warning(f"占位符 {placeholder} 在内容中未找到，可能已被处理")
         
-        content_text = re.sub(r'([^\n])\n([^\n])', r'\1  \n  \2', content_text)
-        result = re.sub(r'([^\n])\n([^\n])', r'\1  \n  \2', content_text)
+        result = _LINE_JOIN_RE.sub("  \n  ", content_text)
         
         logger.info(f"构建钉钉 Markdown 消息 - 标题: {title_text}, 文本长度: {len(result)}, 已上传图片数量: {len(uploaded_images)}")
         
@@ -3,9 +3,9 @@
 import os
 import json
 import logging
+import sys
 from pathlib import Path
 from typing import Optional
-from dotenv import load_dotenv
 
 try:
     import dingtalk_stream
@@ -15,16 +15,11 @@ except ImportError:
     AckMessage = None
 
 from bi_agent.channel.dingTalk.api_client import DingTalkApiClient, DingTalkApiException
-from bi_agent.channel.common import MessageQueue, MessageTask, UserManager, TaskHandler
+from bi_agent.channel.common import MessageQueue, MessageTask, UserManager, TaskHandler, file_kind
 from bi_agent.channel.feishu.message_deduplicator import MessageDeduplicator
 from bi_agent.channel.dingTalk.report_reply import DingTalkReportReply
+from bi_agent.channel.channel import ChannelServerBase
 from bi_agent.utils.llm_clients.llm_client import LLMClient
-from bi_agent.utils.llm_clients.openai_client import OpenAIClient
-from bi_agent.utils.llm_clients.doubao_client import DoubaoClient
-from bi_agent.utils.llm_clients.qwen_client import QwenClient
-
-# 加载环境变量
-load_dotenv()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -33,7 +28,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class DingTalkServer:
+class DingTalkServer(ChannelServerBase):
     """钉钉服务器（基于 Stream 模式）"""
 
     def __init__(
@@ -56,6 +51,10 @@ class DingTalkServer:
         if dingtalk_stream is None:
             raise ImportError("dingtalk_stream 未安装，请运行: pip install dingtalk-stream")
 
+        # 加载环境变量（创建服务器时才加载，导入模块本身不读取 .env）
+        from dotenv import load_dotenv
+        load_dotenv()
+
         # 从环境变量读取配置
         self.client_id = client_id or os.getenv("DINGTALK_CLIENT_ID")
         self.client_secret = client_secret or os.getenv("DINGTALK_CLIENT_SECRET")
@@ -68,7 +67,10 @@ class DingTalkServer:
 
         self.api_client = DingTalkApiClient(self.client_id, self.client_secret, self.client_id)
         self.message_queue = MessageQueue(num_workers=3)
-        self.deduplicator = MessageDeduplicator(expire_hours=7.5)
+        # 去重记录持久化到数据目录，重启后仍能识别平台重复投递的消息
+        self.deduplicator = MessageDeduplicator(
+            expire_hours=7.5, persist_path=self.base_dir / "processed_messages.db"
+        )
         self.user_manager = UserManager(self.base_dir / "users")
 
         self.llm_client = self._create_llm_client(llm_provider, llm_model)
@@ -84,6 +86,8 @@ class DingTalkServer:
             report_reply=report_reply,
             base_output_dir=self.base_dir / "output",
             channel_name="dingtalk",
+            # 设置 LLM_CACHE_ENABLED=true 时启用 LLM 响应缓存
+            enable_llm_cache=os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes"),
         )
 
         # 创建钉钉流客户端
@@ -106,10 +110,12 @@ class DingTalkServer:
         logger.info("钉钉服务器已初始化（Stream 模式）")
 
     def _create_llm_client(self, provider: str, model: Optional[str]) -> LLMClient:
-        """创建 LLM 客户端"""
+        """创建 LLM 客户端（只导入实际使用的提供商客户端）"""
         provider_lower = provider.lower()
 
         if provider_lower == "openai":
+            from bi_agent.utils.llm_clients.openai_client import OpenAIClient
+
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("需要设置 OPENAI_API_KEY 环境变量")
@@ -117,6 +123,8 @@ class DingTalkServer:
             return OpenAIClient(api_key=api_key, model=model or "gpt-4", base_url=base_url)
 
         elif provider_lower == "doubao":
+            from bi_agent.utils.llm_clients.doubao_client import DoubaoClient
+
             api_key = os.getenv("ARK_API_KEY")
             if not api_key:
                 raise ValueError("需要设置 ARK_API_KEY 环境变量")
@@ -128,6 +136,8 @@ class DingTalkServer:
             )
 
         elif provider_lower == "qwen":
+            from bi_agent.utils.llm_clients.qwen_client import QwenClient
+
             api_key = os.getenv("QWEN_API_KEY")
             if not api_key:
                 raise ValueError("需要设置 QWEN_API_KEY 环境变量")
@@ -153,7 +163,11 @@ class DingTalkServer:
         self.stream_client.start_forever()
 
 
-class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
+# 未安装 dingtalk_stream 时模块仍可导入，DingTalkServer 初始化时再报错
+_ChatbotHandler = dingtalk_stream.ChatbotHandler if dingtalk_stream is not None else object
+
+
+class DingTalkMessageHandler(_ChatbotHandler):
     """钉钉消息处理器（基于 Stream 模式）"""
 
     def __init__(
@@ -201,22 +215,24 @@ class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
                 self.logger.warning("消息缺少 message_id，跳过处理")
                 return AckMessage.STATUS_OK, 'OK'
 
-            if self.deduplicator.is_processed(message_id):
+            if self.deduplicator.try_mark(message_id):
                 self.logger.info(f"消息已处理，跳过: {message_id}")
                 return AckMessage.STATUS_OK, 'OK'
 
-            self.deduplicator.mark_processed(message_id)
-
             user_id = incoming_message.sender_staff_id or incoming_message.sender_id
             if not user_id:
                 self.logger.warning("消息缺少用户ID，跳过处理")
                 return AckMessage.STATUS_OK, 'OK'
+            # 用户 ID、会话 ID 和消息类型取值有限且会反复作为字典键使用，驻留后查找只需比较指针
+            user_id = sys.intern(user_id)
 
             conversation_id = incoming_message.conversation_id
+            if conversation_id:
+                conversation_id = sys.intern(conversation_id)
             conversation_type = incoming_message.conversation_type
             is_group = conversation_type == '2'
 
-            message_type = incoming_message.message_type
+            message_type = sys.intern(incoming_message.message_type or "")
             self.logger.info(f"收到消息 - 类型: {message_type}, 用户: {user_id}, 会话: {conversation_id}, 群聊: {is_group}")
 
             if message_type == 'text' and incoming_message.text:
@@ -231,9 +247,11 @@ class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
                         message_type="text",
                         content=text_content,
                         handler=self._handle_text_message,
+                        batch_handler=self._handle_text_messages,
                     )
                     task.session_webhook = incoming_message.session_webhook
-                    self.message_queue.put(task)
+                    if not self.message_queue.put(task):
+                        self.reply_text("当前任务较多，请稍后再试。", incoming_message)
                 else:
                     self.logger.warning("文本消息内容为空")
             
@@ -250,21 +268,16 @@ class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
                         file_info = content_data
                     elif isinstance(content_data, str):
                         try:
-                            import json
                             file_info = json.loads(content_data)
-                        except:
+                        except (ValueError, TypeError):
                             pass
                 
                 if not file_info:
-                    try:
-                        import json
-                        raw_data = callback.data if hasattr(callback, 'data') else {}
-                        if isinstance(raw_data, dict):
-                            content_data = raw_data.get('content', {})
-                            if isinstance(content_data, dict):
-                                file_info = content_data
-                    except:
-                        pass
+                    raw_data = getattr(callback, 'data', None)
+                    if isinstance(raw_data, dict):
+                        content_data = raw_data.get('content', {})
+                        if isinstance(content_data, dict):
+                            file_info = content_data
                 
                 if file_info:
                     download_code = file_info.get('downloadCode') or file_info.get('download_code')
@@ -273,8 +286,7 @@ class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
                     if download_code:
                         self.logger.info(f"收到文件消息 - 文件名: {file_name}, download_code: {download_code}")
                         
-                        file_ext = Path(file_name).suffix.lower()
-                        file_type = "excel" if file_ext in [".xlsx", ".xls"] else "csv" if file_ext == ".csv" else "other"
+                        file_type = file_kind(file_name)
                         robot_code = incoming_message.robot_code
                         self.user_manager.add_file(
                             user_id=user_id,
@@ -307,27 +319,33 @@ class DingTalkMessageHandler(dingtalk_stream.ChatbotHandler):
 
     async def _handle_text_message(self, task: MessageTask):
         """处理文本消息（异步）"""
-        task_content = task.content
+        # 调用任务处理器
+        await self.task_handler.handle_task(**self._task_request(task))
+
+    async def _handle_text_messages(self, tasks: list[MessageTask]):
+        """批量处理同一用户的文本消息（异步）"""
+        await self.task_handler.handle_batch([self._task_request(task) for task in tasks])
+
+    @staticmethod
+    def _task_request(task: MessageTask) -> dict:
+        """将文本消息任务转换为 handle_task 的参数"""
         user_id = task.user_id
         chat_id = task.chat_id
-        message_id = task.message_id
-        session_webhook = getattr(task, 'session_webhook', None)
 
         # 判断是群聊还是私聊
         is_group = chat_id is not None and chat_id != ""
         receive_id_type = "conversation_id" if is_group else "user_id"
         receive_id = chat_id if is_group else user_id
 
-        # 调用任务处理器
-        await self.task_handler.handle_task(
-            user_id=user_id,
-            task=task_content,
-            receive_id_type=receive_id_type,
-            receive_id=receive_id,
-            chat_id=chat_id,
-            message_id=message_id,
-            session_webhook=session_webhook,
-        )
+        return {
+            "user_id": user_id,
+            "task": task.content,
+            "receive_id_type": receive_id_type,
+            "receive_id": receive_id,
+            "chat_id": chat_id,
+            "message_id": task.message_id,
+            "session_webhook": getattr(task, 'session_webhook', None),
+        }
 
 
 def main():
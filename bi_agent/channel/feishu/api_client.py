@@ -1,16 +1,48 @@
 """飞书 API 客户端"""
 
+import asyncio
 import os
-import json
 import logging
+import mimetypes
+import shutil
+import threading
+import time
 import requests
 from typing import Optional, Dict, Any
 from pathlib import Path
 
+from bi_agent.channel.channel import ApiClientBase, MultipartFileBody
+from bi_agent.utils.json_utils import dumps, dumps_bytes, loads
+
 logger = logging.getLogger(__name__)
 
+# 上传图片的 Content-Type（表中没有的扩展名再由 mimetypes 推断）
+_IMAGE_CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+}
+
+
+def _image_content_type(image_path: Path) -> str:
+    """按扩展名确定图片的 Content-Type，无法识别时按 PNG 处理"""
+    content_type = _IMAGE_CONTENT_TYPES.get(image_path.suffix.lower())
+    if content_type is None:
+        guessed = mimetypes.guess_type(image_path.name)[0]
+        content_type = guessed if guessed and guessed.startswith('image/') else 'image/png'
+    return content_type
+
 
-class FeishuApiClient:
+def _content_preview(content: Any, limit: int) -> str:
+    """日志用的消息内容预览：字典格式化为缩进 JSON，超过 limit 个字符时截断"""
+    text = dumps(content, indent=True) if isinstance(content, dict) else str(content)
+    return f"{text[:limit]}..." if len(text) > limit else text
+
+
+class FeishuApiClient(ApiClientBase):
     """飞书 API 客户端"""
 
     # API 端点
@@ -20,6 +52,15 @@ class FeishuApiClient:
     MESSAGE_RESOURCE_URI = "/open-apis/im/v1/messages/{message_id}/resources/{file_key}"  # 获取消息资源
     FILE_DOWNLOAD_URI = "/open-apis/im/v1/files/{file_key}"  # 直接使用 file_key，不需要 /download
     FILE_INFO_URI = "/open-apis/im/v1/files/{file_key}"
+    # 发送消息接口支持的接收者 ID 类型
+    RECEIVE_ID_TYPES = ("open_id", "user_id", "union_id", "email", "chat_id")
+
+    # 消息接口的请求头（Authorization 在刷新令牌时设置到 Session 上）
+    JSON_HEADERS = {"Content-Type": "application/json"}
+    # DEBUG 日志中各消息类型的内容预览长度（字符）
+    PREVIEW_LIMITS = {"post": 1000, "interactive": 2000}
+    # 同步下载时每次从响应流复制的块大小
+    DOWNLOAD_COPY_SIZE = 1024 * 1024
 
     def __init__(self, app_id: str, app_secret: str, lark_host: str = "https://open.feishu.cn"):
         """初始化飞书 API 客户端
@@ -29,20 +70,50 @@ class FeishuApiClient:
             app_secret: 应用密钥
             lark_host: 飞书 API 主机地址
         """
+        super().__init__()
         self._app_id = app_id
         self._app_secret = app_secret
         self._lark_host = lark_host
+        # 消息接口 URL 只与接收者 ID 类型 / message_id 有关，预先拼好主机部分
+        self._message_urls = {
+            id_type: f"{lark_host}{self.MESSAGE_URI}?receive_id_type={id_type}"
+            for id_type in self.RECEIVE_ID_TYPES
+        }
+        reply_prefix, _, reply_suffix = self.MESSAGE_REPLY_URI.partition("{message_id}")
+        self._reply_url_parts = (f"{lark_host}{reply_prefix}", reply_suffix)
         self._tenant_access_token = ""
         self._token_expire_time = 0
+        # 多个工作线程共享客户端，刷新令牌时加锁，避免并发重复请求授权接口
+        self._token_lock = threading.Lock()
+
+    def _token_valid(self) -> bool:
+        """令牌是否可用（提前 5 分钟视为过期）"""
+        return bool(self._tenant_access_token) and time.time() < self._token_expire_time - 300
 
     @property
     def tenant_access_token(self) -> str:
         """获取租户访问令牌（自动刷新）"""
-        import time
-        # 如果令牌为空或即将过期（提前5分钟刷新），则重新获取
-        if not self._tenant_access_token or time.time() >= self._token_expire_time - 300:
-            self._authorize_tenant_access_token()
-        return self._tenant_access_token
+        if self._token_valid():
+            return self._tenant_access_token
+
+        with self._token_lock:
+            # 双重检查：等待锁期间其他线程可能已经刷新过令牌
+            if not self._token_valid():
+                self._authorize_tenant_access_token()
+            return self._tenant_access_token
+
+    def _reply_url(self, message_id: str) -> str:
+        """回复消息接口的 URL"""
+        prefix, suffix = self._reply_url_parts
+        return f"{prefix}{message_id}{suffix}"
+
+    def _ensure_token(self) -> str:
+        """确保访问令牌有效（必要时刷新，同时更新 Session 上的 Authorization 请求头）"""
+        token = self.tenant_access_token
+        if not token:
+            logger.error("无法获取访问令牌")
+            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
+        return token
 
     def _authorize_tenant_access_token(self):
         """获取租户访问令牌"""
@@ -52,7 +123,7 @@ class FeishuApiClient:
             "app_secret": self._app_secret
         }
         logger.info(f"获取访问令牌 - URL: {url}, App ID: {self._app_id[:10]}...")
-        response = requests.post(url, json=req_body)
+        response = self._session.post(url, headers=self.JSON_HEADERS, data=dumps_bytes(req_body))
         
         # 先检查 HTTP 状态码
         if response.status_code != 200:
@@ -61,7 +132,7 @@ class FeishuApiClient:
         
         # 检查响应格式
         try:
-            response_dict = response.json()
+            response_dict = loads(response.content)
         except Exception as e:
             logger.error(f"解析访问令牌响应失败: {e}, 响应内容: {response.text}")
             raise
@@ -76,14 +147,17 @@ class FeishuApiClient:
             raise FeishuApiException(code=code, msg=msg)
         
         # 直接从响应中获取令牌
-        self._tenant_access_token = response_dict.get("tenant_access_token", "")
-        if not self._tenant_access_token:
+        token = response_dict.get("tenant_access_token", "")
+        if not token:
             logger.error(f"访问令牌为空，响应: {response_dict}")
             raise FeishuApiException(code=-1, msg="访问令牌为空")
         
         # 令牌有效期通常是 2 小时（7200 秒）
         expire = response_dict.get("expire", 7200)
-        import time
+        # 令牌放到 Session 的公共请求头中，各请求无需再单独构建
+        self._session.headers["Authorization"] = f"Bearer {token}"
+        # 先写令牌再写过期时间：无锁读取的线程看到新的过期时间时，令牌一定已经更新
+        self._tenant_access_token = token
         self._token_expire_time = time.time() + expire
         logger.info(f"飞书访问令牌已更新，有效期: {expire} 秒")
 
@@ -106,9 +180,8 @@ class FeishuApiClient:
             is_group: 是否为群聊
             session_webhook: 会话 webhook（飞书中不使用，保留以兼容接口）
         """
-        import json
         # 文本消息需要包装成 {"text": content} 格式
-        text_content = json.dumps({"text": content})
+        text_content = dumps({"text": content})
         
         # 群聊使用回复接口，私聊使用创建接口
         if is_group and message_id:
@@ -135,12 +208,11 @@ class FeishuApiClient:
             is_group: 是否为群聊
             session_webhook: 会话 webhook（飞书中不使用，保留以兼容接口）
         """
-        import json
         # 群聊使用回复接口，私聊使用创建接口
         if is_group and message_id:
             self._reply_post_message(message_id, content)
         else:
-            self._send_message(receive_id_type, receive_id, "post", json.dumps(content))
+            self._send_message(receive_id_type, receive_id, "post", content)
 
     def send_card_message(
         self,
@@ -161,9 +233,8 @@ class FeishuApiClient:
             is_group: 是否为群聊
             session_webhook: 会话 webhook（飞书中不使用，保留以兼容接口）
         """
-        import json
         # 群聊使用回复接口，私聊使用创建接口
-        # 注意：card_content 是字典，_send_message 会自动序列化，所以这里不需要 json.dumps
+        # 注意：card_content 是字典，_send_message 会自动序列化，所以这里不需要序列化
         if is_group and message_id:
             self._reply_card_message(message_id, card_content)
         else:
@@ -202,24 +273,19 @@ class FeishuApiClient:
             msg_type: 消息类型（text, post, image 等）
             content: 消息内容
         """
-        # 确保访问令牌已获取
-        token = self.tenant_access_token
-        if not token:
-            logger.error("无法获取访问令牌")
-            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
-        
-        url = f"{self._lark_host}{self.MESSAGE_URI}?receive_id_type={receive_id_type}"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
-        }
+        # 确保访问令牌已获取（Authorization 请求头设置在 Session 上）
+        self._ensure_token()
 
-        import json
+        url = self._message_urls.get(receive_id_type)
+        if url is None:
+            url = f"{self._lark_host}{self.MESSAGE_URI}?receive_id_type={receive_id_type}"
 
         # 如果是文本消息，content 应该已经是 JSON 字符串格式 {"text": "..."}
         # 其他类型的消息需要转换为 JSON 字符串（但如果已经是字符串，则不需要再次序列化）
+        # 保留序列化前的字典，DEBUG 预览时直接格式化，无需再解析 JSON 字符串
+        raw_content = content
         if msg_type != "text" and not isinstance(content, str):
-            content = json.dumps(content, ensure_ascii=False)
+            content = dumps(content)
 
         req_body = {
             "receive_id": receive_id,
@@ -227,36 +293,18 @@ class FeishuApiClient:
             "msg_type": msg_type,
         }
         
-        # 输出完整的消息体到日志
-        logger.info(f"[飞书] 发送消息 - 完整消息体:")
-        logger.info(f"  receive_id_type: {receive_id_type}")
-        logger.info(f"  receive_id: {receive_id}")
-        logger.info(f"  msg_type: {msg_type}")
-        logger.info(f"  消息内容长度: {len(str(content))} 字符")
-        if msg_type == "post":
-            # 对于 post 类型，content 是 JSON 字符串，解析后输出
-            try:
-                content_dict = json.loads(content) if isinstance(content, str) else content
-                logger.info(f"  富文本内容预览:\n{json.dumps(content_dict, ensure_ascii=False, indent=2)[:1000]}...")
-            except:
-                content_str = str(content)
-                logger.info(f"  消息内容预览: {content_str[:500]}..." if len(content_str) > 500 else f"  完整消息内容:\n{content}")
-        elif msg_type == "interactive":
-            # 对于 interactive 类型（卡片），content 是 JSON 字符串，解析后输出
-            try:
-                content_dict = json.loads(content) if isinstance(content, str) else content
-                logger.info(f"  卡片内容预览:\n{json.dumps(content_dict, ensure_ascii=False, indent=2)[:2000]}...")
-            except:
-                content_str = str(content)
-                logger.info(f"  消息内容预览: {content_str[:500]}..." if len(content_str) > 500 else f"  完整消息内容:\n{content}")
-        else:
-            content_str = str(content)
-            logger.info(f"  消息内容预览: {content_str[:500]}..." if len(content_str) > 500 else f"  完整消息内容:\n{content}")
-        logger.info(f"  完整请求体: {json.dumps(req_body, ensure_ascii=False, indent=2)}")
+        # 每条消息只在发送成功后输出一条 INFO 记录，内容预览和完整请求体仅在 DEBUG 级别格式化
+        if logger.isEnabledFor(logging.DEBUG):
+            preview_limit = self.PREVIEW_LIMITS.get(msg_type, 500)
+            logger.debug("  消息内容预览:\n%s", _content_preview(raw_content, preview_limit))
+            logger.debug("  完整请求体: %s", dumps(req_body, indent=True))
         
-        resp = requests.post(url=url, headers=headers, json=req_body)
+        resp = self._session.post(url=url, headers=self.JSON_HEADERS, data=dumps_bytes(req_body))
         self._check_error_response(resp)
-        logger.info(f"消息已发送到 {receive_id_type}:{receive_id}")
+        logger.info(
+            "[飞书] 消息已发送 - receive_id_type: %s, receive_id: %s, msg_type: %s, 消息内容长度: %d 字符",
+            receive_id_type, receive_id, msg_type, len(content),
+        )
 
     def _reply_message(
         self,
@@ -271,50 +319,33 @@ class FeishuApiClient:
             msg_type: 消息类型（text, post, image 等）
             content: 消息内容
         """
-        # 确保访问令牌已获取
-        token = self.tenant_access_token
-        if not token:
-            logger.error("无法获取访问令牌")
-            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
-        
-        url = f"{self._lark_host}{self.MESSAGE_REPLY_URI.format(message_id=message_id)}"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
-        }
-        logger.info(f"使用访问令牌: {token[:20]}...")
+        # 确保访问令牌已获取（Authorization 请求头设置在 Session 上）
+        self._ensure_token()
 
-        import json
+        url = self._reply_url(message_id)
 
         # 如果是文本消息，content 应该已经是 JSON 字符串格式 {"text": "..."}
         # 其他类型的消息需要转换为 JSON 字符串
+        raw_content = content
         if msg_type != "text":
-            content = json.dumps(content)
+            content = dumps(content)
 
         req_body = {
             "content": content,
             "msg_type": msg_type,
         }
         
-        # 输出完整的消息体到日志
-        logger.info(f"[飞书] 回复消息 - 完整消息体:")
-        logger.info(f"  message_id: {message_id}")
-        logger.info(f"  msg_type: {msg_type}")
-        logger.info(f"  消息内容长度: {len(content)} 字符")
-        if msg_type == "post":
-            # 对于 post 类型，content 是 JSON 字符串，解析后输出
-            try:
-                content_dict = json.loads(content) if isinstance(content, str) else content
-                logger.info(f"  富文本内容预览:\n{json.dumps(content_dict, ensure_ascii=False, indent=2)[:1000]}...")
-            except:
-                logger.info(f"  消息内容预览: {content[:500]}..." if len(content) > 500 else f"  完整消息内容:\n{content}")
-        else:
-            logger.info(f"  消息内容预览: {content[:500]}..." if len(content) > 500 else f"  完整消息内容:\n{content}")
-        logger.info(f"  完整请求体: {json.dumps(req_body, ensure_ascii=False, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            preview_limit = self.PREVIEW_LIMITS.get(msg_type, 500)
+            logger.debug("  消息内容预览:\n%s", _content_preview(raw_content, preview_limit))
+            logger.debug("  完整请求体: %s", dumps(req_body, indent=True))
         
-        resp = requests.post(url=url, headers=headers, json=req_body)
+        resp = self._session.post(url=url, headers=self.JSON_HEADERS, data=dumps_bytes(req_body))
         self._check_error_response(resp)
-        logger.info(f"消息已回复到消息: {message_id}")
+        logger.info(
+            "[飞书] 消息已回复 - message_id: %s, msg_type: %s, 消息内容长度: %d 字符",
+            message_id, msg_type, len(content),
+        )
 
     def _reply_post_message(
         self,
@@ -327,44 +358,29 @@ class FeishuApiClient:
             message_id: 要回复的消息 ID
             content: 富文本内容（字典格式，包含 post.zh_cn 结构）
         """
-        import json
-        import uuid
-        # 确保访问令牌已获取
-        token = self.tenant_access_token
-        if not token:
-            logger.error("无法获取访问令牌")
-            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
-        
-        url = f"{self._lark_host}{self.MESSAGE_REPLY_URI.format(message_id=message_id)}"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
-        }
+        # 确保访问令牌已获取（Authorization 请求头设置在 Session 上）
+        self._ensure_token()
+
+        url = self._reply_url(message_id)
 
         # 将 content 转换为 JSON 字符串
-        content_str = json.dumps(content, ensure_ascii=False)
+        content_str = dumps(content)
         
         req_body = {
             "content": content_str,
             "msg_type": "post",
         }
         
-        # 输出完整的消息体到日志
-        logger.info(f"[飞书] 回复富文本消息 - 完整消息体:")
-        logger.info(f"  message_id: {message_id}")
-        logger.info(f"  msg_type: post")
-        logger.info(f"  消息内容长度: {len(content_str)} 字符")
-        try:
-            # 解析并格式化输出富文本内容
-            content_dict = json.loads(content_str) if isinstance(content_str, str) else content_str
-            logger.info(f"  富文本内容预览:\n{json.dumps(content_dict, ensure_ascii=False, indent=2)[:2000]}...")
-        except:
-            logger.info(f"  消息内容预览: {content_str[:1000]}...")
-        logger.info(f"  完整请求体: {json.dumps(req_body, ensure_ascii=False, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  富文本内容预览:\n%s", _content_preview(content, 2000))
+            logger.debug("  完整请求体: %s", dumps(req_body, indent=True))
         
-        resp = requests.post(url=url, headers=headers, json=req_body)
+        resp = self._session.post(url=url, headers=self.JSON_HEADERS, data=dumps_bytes(req_body))
         self._check_error_response(resp)
-        logger.info(f"富文本消息已回复到消息: {message_id}")
+        logger.info(
+            "[飞书] 富文本消息已回复 - message_id: %s, 消息内容长度: %d 字符",
+            message_id, len(content_str),
+        )
 
     def _reply_card_message(
         self,
@@ -377,35 +393,23 @@ class FeishuApiClient:
             message_id: 要回复的消息 ID
             card_content: 卡片内容（字典格式）
         """
-        import json
-        # 确保访问令牌已获取
-        token = self.tenant_access_token
-        if not token:
-            logger.error("无法获取访问令牌")
-            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
-        
-        url = f"{self._lark_host}{self.MESSAGE_REPLY_URI.format(message_id=message_id)}"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
-        }
-        logger.info(f"使用访问令牌: {token[:20]}...")
+        # 确保访问令牌已获取（Authorization 请求头设置在 Session 上）
+        self._ensure_token()
+
+        url = self._reply_url(message_id)
 
         req_body = {
-            "content": json.dumps(card_content, ensure_ascii=False),
+            "content": dumps(card_content),
             "msg_type": "interactive",
         }
         
-        # 输出完整的消息体到日志
-        logger.info(f"[飞书] 回复卡片消息 - 完整消息体:")
-        logger.info(f"  message_id: {message_id}")
-        logger.info(f"  msg_type: interactive")
-        logger.info(f"  卡片内容预览:\n{json.dumps(card_content, ensure_ascii=False, indent=2)[:2000]}...")
-        logger.info(f"  完整请求体: {json.dumps(req_body, ensure_ascii=False, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  卡片内容预览:\n%s", _content_preview(card_content, 2000))
+            logger.debug("  完整请求体: %s", dumps(req_body, indent=True))
         
-        resp = requests.post(url=url, headers=headers, json=req_body)
+        resp = self._session.post(url=url, headers=self.JSON_HEADERS, data=dumps_bytes(req_body))
         self._check_error_response(resp)
-        logger.info(f"卡片消息已回复到消息: {message_id}")
+        logger.info("[飞书] 卡片消息已回复 - message_id: %s", message_id)
 
     def get_file_info(self, file_key: str) -> Dict[str, Any]:
         """获取文件信息
@@ -417,12 +421,9 @@ class FeishuApiClient:
             文件信息字典
         """
         url = f"{self._lark_host}{self.FILE_INFO_URI.format(file_key=file_key)}"
-        headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
-        }
-        resp = requests.get(url=url, headers=headers)
-        self._check_error_response(resp)
-        return resp.json().get("data", {})
+        self._ensure_token()
+        resp = self._session.get(url=url)
+        return self._check_error_response(resp).get("data", {})
 
     def download_file(self, file_key: str, save_path: Path, message_id: Optional[str] = None, resource_type: str = "file") -> Path:
         """下载文件
@@ -436,12 +437,54 @@ class FeishuApiClient:
         Returns:
             保存的文件路径
         """
-        # 确保访问令牌已获取
-        token = self.tenant_access_token
-        if not token:
-            logger.error("无法获取访问令牌")
-            raise FeishuApiException(code=-1, msg="无法获取访问令牌")
+        url, headers = self._download_request(file_key, message_id, resource_type)
+
+        # 下载文件（使用 stream=True 以支持大文件）
+        resp = self._session.get(url, headers=headers, stream=True, timeout=30)
+        
+        # 检查响应
+        if resp.status_code != 200:
+            self._raise_download_error(resp.status_code, resp.content)
+            resp.raise_for_status()
         
+        # 确保保存目录存在
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 保存文件：直接从底层响应流按大块复制（循环在 C 中执行），由 urllib3 负责解压
+        resp.raw.decode_content = True
+        with open(save_path, "wb") as f:
+            shutil.copyfileobj(resp.raw, f, length=self.DOWNLOAD_COPY_SIZE)
+
+        logger.info(f"文件已下载: {save_path} (大小: {save_path.stat().st_size} bytes)")
+        return save_path
+
+    async def download_file_async(
+        self,
+        file_key: str,
+        save_path: Path,
+        message_id: Optional[str] = None,
+        resource_type: str = "file",
+        **kwargs,
+    ) -> Path:
+        """异步流式下载文件（参数同 download_file）"""
+        # 刷新访问令牌可能发起同步请求，放到线程中执行
+        url, headers = await asyncio.to_thread(self._download_request, file_key, message_id, resource_type)
+        return await self._stream_to_file(url, save_path, headers=headers, on_error=self._raise_download_error)
+
+    def _download_request(self, file_key: str, message_id: Optional[str], resource_type: str) -> tuple[str, Dict[str, str]]:
+        """构建下载文件的 URL 和请求头
+
+        Args:
+            file_key: 文件 key
+            message_id: 消息 ID（如果提供，使用消息资源 API）
+            resource_type: 资源类型
+
+        Returns:
+            (URL, 请求头)
+        """
+        # 确保访问令牌已获取（异步下载走 httpx，需要单独携带 Authorization 请求头）
+        token = self._ensure_token()
+
         # 如果提供了 message_id，使用消息资源 API（推荐方式）
         if message_id:
             url = f"{self._lark_host}{self.MESSAGE_RESOURCE_URI.format(message_id=message_id, file_key=file_key)}"
@@ -456,47 +499,37 @@ class FeishuApiClient:
         headers = {
             "Authorization": f"Bearer {token}",
         }
-        
-        # 下载文件（使用 stream=True 以支持大文件）
-        resp = requests.get(url, headers=headers, stream=True, timeout=30)
-        
-        # 检查响应
-        if resp.status_code != 200:
-            logger.error(f"下载文件失败 - HTTP {resp.status_code}: {resp.text}")
-            # 尝试解析错误响应
-            try:
-                error_data = resp.json()
-                code = error_data.get("code", -1)
-                msg = error_data.get("msg", "未知错误")
-                logger.error(f"飞书 API 错误: {code} - {msg}")
-                if code == 234008:
-                    raise FeishuApiException(
-                        code=code,
-                        msg=f"{msg} - 应用可能没有权限下载此文件，请检查应用权限配置。如果提供了 message_id，请确保消息中包含该文件。"
-                    )
-                elif code == 99991672:
-                    # 权限不足错误
-                    raise FeishuApiException(
-                        code=code,
-                        msg=f"{msg} - 请确保在飞书开发者后台开通以下权限之一：im:message.history:readonly, im:message:readonly, im:message"
-                    )
-                raise FeishuApiException(code=code, msg=msg)
-            except FeishuApiException:
-                raise
-            except:
-                resp.raise_for_status()
-        
-        # 确保保存目录存在
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        return url, headers
 
-        # 保存文件
-        with open(save_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+    @staticmethod
+    def _raise_download_error(status_code: int, body: bytes):
+        """解析下载失败的响应，能识别飞书错误码时抛出 FeishuApiException
 
-        logger.info(f"文件已下载: {save_path} (大小: {save_path.stat().st_size} bytes)")
-        return save_path
+        无法解析时直接返回，由调用方按 HTTP 状态码抛出异常。
+        """
+        logger.error(f"下载文件失败 - HTTP {status_code}: {body.decode('utf-8', errors='replace')}")
+        # 尝试解析错误响应
+        try:
+            error_data = loads(body)
+        except ValueError:
+            return
+        if not isinstance(error_data, dict):
+            return
+        code = error_data.get("code", -1)
+        msg = error_data.get("msg", "未知错误")
+        logger.error(f"飞书 API 错误: {code} - {msg}")
+        if code == 234008:
+            raise FeishuApiException(
+                code=code,
+                msg=f"{msg} - 应用可能没有权限下载此文件，请检查应用权限配置。如果提供了 message_id，请确保消息中包含该文件。"
+            )
+        elif code == 99991672:
+            # 权限不足错误
+            raise FeishuApiException(
+                code=code,
+                msg=f"{msg} - 请确保在飞书开发者后台开通以下权限之一：im:message.history:readonly, im:message:readonly, im:message"
+            )
+        raise FeishuApiException(code=code, msg=msg)
 
     def upload_image(self, image_path: Path) -> str:
         """上传图片并获取 image_key
@@ -511,48 +544,35 @@ class FeishuApiClient:
         # 参考文档: https://open.feishu.cn/document/uAjLw4CM/ukTMukTMukTM/reference/im-v1/image/create
         upload_uri = "/open-apis/im/v1/images"
         url = f"{self._lark_host}{upload_uri}"
-        headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
-        }
+        self._ensure_token()
 
-        # 确定文件类型
-        file_ext = image_path.suffix.lower()
-        content_type_map = {
-            '.png': 'image/png',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.gif': 'image/gif',
-            '.bmp': 'image/bmp',
-            '.webp': 'image/webp',
-        }
-        content_type = content_type_map.get(file_ext, 'image/png')
-
-        with open(image_path, "rb") as f:
-            files = {
-                "image": (image_path.name, f, content_type)
-            }
-            data = {
-                "image_type": "message"
-            }
-            resp = requests.post(url, headers=headers, files=files, data=data)
-            self._check_error_response(resp)
-            result = resp.json().get("data", {})
+        content_type = _image_content_type(image_path)
+
+        # 流式上传，不把整个图片读入内存
+        with MultipartFileBody({"image_type": "message"}, "image", image_path, content_type) as body:
+            resp = self._session.post(url, headers={"Content-Type": body.content_type}, data=body)
+            result = self._check_error_response(resp).get("data", {})
             return result.get("image_key", "")
 
     @staticmethod
-    def _check_error_response(resp: requests.Response):
-        """检查响应是否包含错误信息"""
+    def _check_error_response(resp: requests.Response) -> Dict[str, Any]:
+        """检查响应是否包含错误信息
+
+        Returns:
+            解析后的响应字典（调用方直接使用，无需再次解析）
+        """
         if resp.status_code != 200:
             logger.error(f"HTTP 错误: {resp.status_code}")
             logger.error(f"响应内容: {resp.text}")
             resp.raise_for_status()
-        response_dict = resp.json()
+        response_dict = loads(resp.content)
         code = response_dict.get("code", -1)
         if code != 0:
             msg = response_dict.get("msg", "未知错误")
             logger.error(f"飞书 API 错误: {code} - {msg}")
-            logger.error(f"完整响应: {json.dumps(response_dict, ensure_ascii=False, indent=2)}")
+            logger.error("完整响应: %s", response_dict)
             raise FeishuApiException(code=code, msg=msg)
+        return response_dict
 
 
 class FeishuApiException(Exception):
@@ -2,7 +2,11 @@
 
 import time
 import logging
-from typing import Dict, Optional
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -15,16 +19,35 @@ class MessageDeduplicator:
     消息过期时间：7.5小时
     """
 
-    def __init__(self, expire_hours: float = 7.5):
+    # 容量淘汰告警的最小间隔（秒）
+    EVICT_WARNING_INTERVAL = 60
+
+    def __init__(
+        self,
+        expire_hours: float = 7.5,
+        max_entries: int = 100_000,
+        persist_path: Optional[Union[str, Path]] = None,
+    ):
         """初始化消息去重器
 
         Args:
             expire_hours: 消息过期时间（小时），默认 7.5 小时
+            max_entries: 最多保留的消息记录数，超出时淘汰最早的记录
+            persist_path: SQLite 持久化文件路径（可选）。设置后已处理的消息同时写入磁盘，
+                进程重启后仍能识别平台重复投递的消息；查询仍只走内存
         """
         self.expire_hours = expire_hours
-        self.processed_messages: Dict[str, float] = {}  # message_id -> timestamp
-        self._last_cleanup = time.time()
-        self._cleanup_interval = 3600  # 每小时清理一次过期消息
+        self.max_entries = max_entries
+        # message_id -> timestamp，按插入顺序排列，便于淘汰最早的记录
+        self.processed_messages: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 容量淘汰次数，以及上次输出淘汰告警的时间（告警按间隔限频）
+        self.evicted_count = 0
+        self._last_evict_warning = float("-inf")
+
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path is not None:
+            self._open_store(Path(persist_path))
 
     def is_processed(self, message_id: str) -> bool:
         """检查消息是否已处理
@@ -35,19 +58,14 @@ class MessageDeduplicator:
         Returns:
             如果已处理返回 True，否则返回 False
         """
-        # 定期清理过期消息
-        self._cleanup_expired()
-
-        if message_id in self.processed_messages:
-            timestamp = self.processed_messages[message_id]
-            # 检查是否过期
-            if time.time() - timestamp < self.expire_hours * 3600:
-                return True
-            else:
-                # 已过期，删除记录
-                del self.processed_messages[message_id]
-
-        return False
+        # 绝大多数消息都未处理过：不加锁先查一次字典（单次查找在 GIL 下是原子的），
+        # 不存在时直接返回，无需取时间和清理
+        if message_id not in self.processed_messages:
+            return False
+        with self._lock:
+            # 过期记录已在清理时删除，剩下的记录都在有效期内
+            self._cleanup_expired_locked(time.monotonic())
+            return message_id in self.processed_messages
 
     def mark_processed(self, message_id: str):
         """标记消息为已处理
@@ -55,27 +73,137 @@ class MessageDeduplicator:
         Args:
             message_id: 消息ID
         """
-        self.processed_messages[message_id] = time.time()
+        with self._lock:
+            self._mark(message_id, time.monotonic())
+
+    def try_mark(self, message_id: str) -> bool:
+        """检查并标记消息（原子操作）
+
+        Args:
+            message_id: 消息ID
+
+        Returns:
+            消息已处理过返回 True；否则标记为已处理并返回 False
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._cleanup_expired_locked(now)
+            if message_id in self.processed_messages:
+                return True
+            self._mark(message_id, now)
+            return False
+
+    def _mark(self, message_id: str, timestamp: float):
+        """记录消息（调用方需持有锁），超出容量时淘汰最早的记录"""
+        self.processed_messages[message_id] = timestamp
+        if self._db is not None:
+            self._persist(message_id)
+        self.processed_messages.move_to_end(message_id)
+        evicted = 0
+        while len(self.processed_messages) > self.max_entries:
+            self.processed_messages.popitem(last=False)
+            evicted += 1
+        if evicted:
+            self.evicted_count += evicted
+            if timestamp - self._last_evict_warning >= self.EVICT_WARNING_INTERVAL:
+                self._last_evict_warning = timestamp
+                logger.warning(
+                    f"消息去重记录已达上限 {self.max_entries}，累计淘汰 {self.evicted_count} 条未过期记录，"
+                    f"被淘汰的消息重复投递时将无法识别，可以调大 max_entries"
+                )
 
     def _cleanup_expired(self):
         """清理过期的消息记录"""
-        current_time = time.time()
-        # 每小时清理一次
-        if current_time - self._last_cleanup < self._cleanup_interval:
-            return
+        with self._lock:
+            self._cleanup_expired_locked(time.monotonic())
 
-        self._last_cleanup = current_time
-        expire_seconds = self.expire_hours * 3600
-        expired_ids = [
-            msg_id for msg_id, timestamp in self.processed_messages.items()
-            if current_time - timestamp >= expire_seconds
-        ]
+    def _cleanup_expired_locked(self, now: float) -> int:
+        """从最早的记录开始清理过期消息（调用方需持有锁）
 
-        for msg_id in expired_ids:
-            del self.processed_messages[msg_id]
+        记录按时间先后排列，遇到第一条未过期的记录即可停止，开销只与过期条数有关。
+        时间使用 time.monotonic()，不受系统时钟调整影响。
+
+        Returns:
+            清理的记录数
+        """
+        expire_seconds = self.expire_hours * 3600
+        messages = self.processed_messages
+        removed = 0
+        while messages:
+            timestamp = messages[next(iter(messages))]
+            if now - timestamp < expire_seconds:
+                break
+            messages.popitem(last=False)
+            removed += 1
+        if removed:
+            logger.debug(f"清理了 {removed} 条过期消息记录")
+            if self._db is not None:
+                self._purge_store()
+        return removed
+
+    def _open_store(self, persist_path: Path):
+        """打开 SQLite 持久化存储，并把未过期的记录加载到内存"""
+        try:
+            persist_path.parent.mkdir(parents=True, exist_ok=True)
+            # 所有访问都在 self._lock 内进行，可以跨线程共用一个连接；autocommit 模式下每次写入立即提交
+            db = sqlite3.connect(str(persist_path), check_same_thread=False, isolation_level=None)
+            # WAL + NORMAL：每次写入不必等待 fsync，进程崩溃也不会丢失已提交的记录
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS processed_messages "
+                "(message_id TEXT PRIMARY KEY, processed_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_processed_at ON processed_messages (processed_at)"
+            )
+            self._db = db
+            self._purge_store()
+            rows = db.execute(
+                "SELECT message_id, processed_at FROM processed_messages "
+                "ORDER BY processed_at DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"打开消息去重持久化存储失败，仅在内存中去重: {e}")
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            return
 
-        if expired_ids:
-            logger.info(f"清理了 {len(expired_ids)} 条过期消息记录")
+        # 磁盘上记录的是系统时间，换算成 monotonic 时间后按先后顺序放入内存
+        wall_now, mono_now = time.time(), time.monotonic()
+        for message_id, processed_at in reversed(rows):
+            self.processed_messages[message_id] = mono_now - (wall_now - processed_at)
+        if rows:
+            logger.info(f"从 {persist_path} 加载了 {len(rows)} 条消息去重记录")
+
+    def _persist(self, message_id: str):
+        """写入一条记录到磁盘（调用方需持有锁），失败时只记录日志"""
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed_messages (message_id, processed_at) VALUES (?, ?)",
+                (message_id, time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"写入消息去重记录失败: {e}")
+
+    def _purge_store(self):
+        """删除磁盘上的过期记录（调用方需持有锁，或在初始化阶段调用）"""
+        try:
+            self._db.execute(
+                "DELETE FROM processed_messages WHERE processed_at < ?",
+                (time.time() - self.expire_hours * 3600,),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"清理消息去重记录失败: {e}")
+
+    def close(self):
+        """关闭持久化存储"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
 
     def get_stats(self) -> Dict[str, int]:
         """获取统计信息
@@ -86,5 +214,6 @@ class MessageDeduplicator:
         self._cleanup_expired()
         return {
             "total_processed": len(self.processed_messages),
+            "evicted": self.evicted_count,
             "expire_hours": self.expire_hours,
         }
@@ -85,44 +85,42 @@ class ReportReply(ReportReplyBase):
             is_group: 是否为群聊
             session_webhook: 会话 webhook（飞书中不使用，保留以兼容接口）
         """
-        # 使用报告文件所在的目录作为 output_dir，确保图片路径解析正确
-        # 这样相对路径的图片（如 "销售增长率对比图.png"）可以正确找到
-        original_output_dir = self.output_dir
-        self.output_dir = md_path.parent
-        logger.info(f"使用报告文件所在目录作为 output_dir: {self.output_dir}")
-        
-        try:
-            parsed = self.parse_markdown(md_path)
-
-            # 构建卡片消息内容
-            card_content = self._build_card_content(parsed)
-            
-            # 验证内容格式
-            if not card_content:
-                logger.error(f"卡片内容格式错误: {card_content}")
-                # 如果格式错误，回退到文本消息
-                title_text = f"# {parsed['title']}\n\n{parsed['text']}"
-                self.api_client.send_text_message(
-                    receive_id_type,
-                    receive_id,
-                    title_text,
-                    message_id=message_id,
-                    is_group=is_group
-                )
-                return
-
-            # 发送卡片消息
-            self.api_client.send_card_message(
+        # 使用报告文件所在的目录解析图片路径，确保相对路径的图片（如 "销售增长率对比图.png"）可以正确找到
+        # 目录作为参数传递，不修改共享的 self.output_dir（多个工作线程会同时发送报告）
+        base_dir = md_path.parent
+        logger.info(f"使用报告文件所在目录解析图片路径: {base_dir}")
+        
+        parsed = self.parse_markdown(md_path)
+        # 并发上传报告中的图片
+        await self._upload_report_images(parsed, base_dir)
+
+        # 构建卡片消息内容
+        card_content = self._build_card_content(parsed, base_dir)
+        
+        # 验证内容格式
+        if not card_content:
+            logger.error(f"卡片内容格式错误: {card_content}")
+            # 如果格式错误，回退到文本消息
+            title_text = f"# {parsed['title']}\n\n{parsed['text']}"
+            self.api_client.send_text_message(
                 receive_id_type,
                 receive_id,
-                card_content,
+                title_text,
                 message_id=message_id,
                 is_group=is_group
             )
-        finally:
-            self.output_dir = original_output_dir
-
-    def _build_rich_text_content(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+            return
+
+        # 发送卡片消息
+        self.api_client.send_card_message(
+            receive_id_type,
+            receive_id,
+            card_content,
+            message_id=message_id,
+            is_group=is_group
+        )
+
+    def _build_rich_text_content(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None) -> Dict[str, Any]:
         """构建富文本消息内容（post 格式）
 
         根据飞书文档：https://open.feishu.cn/document/server-docs/im-v1/message-content-description/create_json#45e0953e
@@ -148,17 +146,8 @@ class ReportReply(ReportReplyBase):
         
         # 处理图片占位符，上传图片并替换为 image_key
         for placeholder, alt_text, image_url in image_placeholders:
-            # 如果是相对路径，转换为绝对路径
-            image_path = Path(image_url)
-            if not image_path.is_absolute():
-                image_path = self.output_dir / image_path
-            
-            # 标准化路径用于去重
-            try:
-                image_path_resolved = image_path.resolve()
-            except:
-                image_path_resolved = image_path
-            image_path_str_key = str(image_path_resolved)
+            # 相对路径基于 output_dir，标准化路径用于去重
+            image_path, image_path_str_key = self._resolve_image_path(image_url, base_dir)
             
             # 如果已经上传过相同的图片，使用已上传的 image_key
             if image_path_str_key in uploaded_images:
@@ -167,7 +156,7 @@ class ReportReply(ReportReplyBase):
             elif image_path.exists():
                 try:
                     # 上传图片获取 image_key
-                    image_key = self.api_client.upload_image(image_path)
+                    image_key = self._upload_image_once(parsed, image_path_str_key, image_path)
                     uploaded_images[image_path_str_key] = image_key
                     logger.info(f"图片已上传: {image_path.name}, image_key: {image_key[:20]}...")
                 except Exception as e:
@@ -350,7 +339,7 @@ class ReportReply(ReportReplyBase):
         
         return post_content
 
-    def _build_card_content(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_card_content(self, parsed: Dict[str, Any], base_dir: Optional[Path] = None) -> Dict[str, Any]:
         """构建卡片消息内容
 
         根据飞书卡片文档：https://open.feishu.cn/document/feishu-cards/card-json-v2-components/content-components/rich-text
@@ -371,17 +360,8 @@ class ReportReply(ReportReplyBase):
         
         # 处理图片占位符，上传图片并替换为 image_key
         for placeholder, alt_text, image_url in image_placeholders:
-            # 如果是相对路径，转换为绝对路径
-            image_path = Path(image_url)
-            if not image_path.is_absolute():
-                image_path = self.output_dir / image_path
-            
-            # 标准化路径用于去重
-            try:
-                image_path_resolved = image_path.resolve()
-            except:
-                image_path_resolved = image_path
-            image_path_str_key = str(image_path_resolved)
+            # 相对路径基于 output_dir，标准化路径用于去重
+            image_path, image_path_str_key = self._resolve_image_path(image_url, base_dir)
             
             # 如果已经上传过相同的图片，使用已上传的 image_key
             if image_path_str_key in uploaded_images:
@@ -390,7 +370,7 @@ class ReportReply(ReportReplyBase):
             elif image_path.exists():
                 try:
                     # 上传图片获取 image_key
-                    image_key = self.api_client.upload_image(image_path)
+                    image_key = self._upload_image_once(parsed, image_path_str_key, image_path)
                     uploaded_images[image_path_str_key] = image_key
                     logger.info(f"图片已上传: {image_path.name}, image_key: {image_key[:20]}...")
                 except Exception as e:
@@ -11,7 +11,9 @@ import lark_oapi as lark
 from lark_oapi.api.im.v1 import P2ImMessageReceiveV1
 
 from bi_agent.channel.feishu.api_client import FeishuApiClient, FeishuApiException
-from bi_agent.channel.common import MessageQueue, MessageTask, UserManager, TaskHandler
+from bi_agent.channel.common import (
+    MessageQueue, MessageTask, UserManager, TaskHandler, file_extension, file_kind
+)
 from bi_agent.channel.feishu.message_deduplicator import MessageDeduplicator
 from bi_agent.channel.feishu.report_reply import ReportReply
 from bi_agent.channel.channel import ChannelServerBase
@@ -66,7 +68,10 @@ class FeishuServer(ChannelServerBase):
         # 初始化组件
         self.api_client = FeishuApiClient(self.app_id, self.app_secret, self.lark_host)
         self.message_queue = MessageQueue(num_workers=3)
-        self.deduplicator = MessageDeduplicator(expire_hours=7.5)
+        # 去重记录持久化到数据目录，重启后仍能识别平台重复投递的消息
+        self.deduplicator = MessageDeduplicator(
+            expire_hours=7.5, persist_path=self.base_dir / "processed_messages.db"
+        )
         self.user_manager = UserManager(self.base_dir / "users")
 
         self.llm_client = self._create_llm_client(llm_provider, llm_model)
@@ -78,6 +83,8 @@ class FeishuServer(ChannelServerBase):
             report_reply=report_reply,
             base_output_dir=self.base_dir / "output",
             channel_name="feishu",
+            # 设置 LLM_CACHE_ENABLED=true 时启用 LLM 响应缓存
+            enable_llm_cache=os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes"),
         )
 
         self.client = lark.Client.builder().app_id(self.app_id).app_secret(self.app_secret).build()
@@ -146,11 +153,10 @@ class FeishuServer(ChannelServerBase):
             logger.info(f"消息类型: {message_type}")
             logger.info(f"聊天类型: {chat_type}")
 
-            if self.deduplicator.is_processed(message_id):
+            if self.deduplicator.try_mark(message_id):
                 logger.info(f"消息已处理，跳过: {message_id}")
                 return
 
-            self.deduplicator.mark_processed(message_id)
             logger.info(f"消息已标记为已处理: {message_id}")
 
             sender = data.event.sender
@@ -180,9 +186,18 @@ class FeishuServer(ChannelServerBase):
                         message_type="text",
                         content=text,
                         handler=self._handle_text_message,
+                        batch_handler=self._handle_text_messages,
                     )
-                    self.message_queue.put(task)
-                    logger.info(f"任务已添加到队列: {message_id}")
+                    if self.message_queue.put(task):
+                        logger.info(f"任务已添加到队列: {message_id}")
+                    else:
+                        self.api_client.send_text_message(
+                            receive_id_type,
+                            receive_id,
+                            "当前任务较多，请稍后再试。",
+                            message_id=message_id,
+                            is_group=is_group,
+                        )
                 else:
                     logger.warning("文本内容为空，跳过处理")
 
@@ -196,8 +211,8 @@ class FeishuServer(ChannelServerBase):
                 logger.info(f"文件信息 - Key: {file_key}, 文件名: {file_name}")
 
                 if file_key:
-                    file_ext = Path(file_name).suffix.lower()
-                    file_type = "excel" if file_ext in [".xlsx", ".xls"] else "csv" if file_ext == ".csv" else "other"
+                    file_ext = file_extension(file_name)
+                    file_type = file_kind(file_name)
                     logger.info(f"文件类型: {file_type}, 扩展名: {file_ext}")
                     self.user_manager.add_file(user_id, file_key, file_name, file_type, message_id=message_id)
                     logger.info(f"发送文件确认消息到 {receive_id_type}:{receive_id}")
@@ -221,26 +236,31 @@ class FeishuServer(ChannelServerBase):
 
     async def _handle_text_message(self, task: MessageTask):
         """处理文本消息（异步）"""
-        task_content = task.content
-        user_id = task.user_id
-        open_id = task.open_id
+        # 调用任务处理器
+        await self.task_handler.handle_task(**self._task_request(task))
+
+    async def _handle_text_messages(self, tasks: list[MessageTask]):
+        """批量处理同一用户的文本消息（异步）"""
+        await self.task_handler.handle_batch([self._task_request(task) for task in tasks])
+
+    @staticmethod
+    def _task_request(task: MessageTask) -> dict:
+        """将文本消息任务转换为 handle_task 的参数"""
         chat_id = task.chat_id
-        message_id = task.message_id  # 用于回复消息
 
         # 判断是群聊还是私聊
         is_group = chat_id is not None and chat_id != ""
         receive_id_type = "chat_id" if is_group else "open_id"
-        receive_id = chat_id if is_group else open_id
-
-        # 调用任务处理器
-        await self.task_handler.handle_task(
-            user_id=user_id,
-            task=task_content,
-            receive_id_type=receive_id_type,
-            receive_id=receive_id,
-            chat_id=chat_id,
-            message_id=message_id,  # 传递 message_id 用于回复
-        )
+        receive_id = chat_id if is_group else task.open_id
+
+        return {
+            "user_id": task.user_id,
+            "task": task.content,
+            "receive_id_type": receive_id_type,
+            "receive_id": receive_id,
+            "chat_id": chat_id,
+            "message_id": task.message_id,  # 传递 message_id 用于回复
+        }
 
     def run(self):
         """运行服务器（启动长连接）"""
@@ -239,8 +239,8 @@ def run(
             if execution.final_result:
                 console.print(f"[red]错误: {execution.final_result}[/red]")
             # 检查是否有步骤错误
-            if execution.steps:
-                last_step = execution.steps[-1]
+            last_step = execution.last_step
+            if last_step:
                 if last_step.error:
                     console.print(f"\n[red]详细错误信息:[/red]")
                     console.print(f"[red]{last_step.error}[/red]")
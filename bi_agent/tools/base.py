@@ -1,11 +1,16 @@
 """工具基类"""
 
 import asyncio
+import json
+import os
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from functools import cached_property
 from typing import TypeAlias
 
+# 单批次内并发执行的工具调用上限
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4"))
+
 ParamSchemaValue: TypeAlias = str | list[str] | bool | dict[str, object]
 Property: TypeAlias = dict[str, ParamSchemaValue]
 
@@ -70,6 +75,9 @@ class ToolParameter:
 class Tool(ABC):
     """工具基类"""
 
+    # 是否允许与同批次的其他工具调用并发执行
+    parallel_safe: bool = True
+
     def __init__(self, model_provider: str | None = None):
         self._model_provider = model_provider
 
@@ -180,8 +188,12 @@ class ToolExecutor:
 
     async def close_tools(self):
         """确保所有工具资源正确释放"""
-        tasks = [tool.close() for tool in self._tools if hasattr(tool, "close")]
-        res = await asyncio.gather(*tasks)
+        # 并发关闭，总耗时取决于最慢的工具；单个工具关闭失败不影响其他工具
+        closable = [tool for tool in self._tools if hasattr(tool, "close")]
+        res = await asyncio.gather(*(tool.close() for tool in closable), return_exceptions=True)
+        for tool, result in zip(closable, res):
+            if isinstance(result, Exception):
+                print(f"警告：关闭工具 {tool.name} 失败: {result}")
         return res
 
     def _normalize_name(self, name: str) -> str:
@@ -228,10 +240,109 @@ class ToolExecutor:
             )
 
     async def parallel_tool_call(self, tool_calls: list[ToolCall]) -> list[ToolResult]:
-        """并行执行工具调用"""
-        return await asyncio.gather(*[self.execute_tool_call(call) for call in tool_calls])
+        """并行执行工具调用
+
+        结果顺序与 tool_calls 保持一致；批次中存在非并发安全的工具时退化为顺序执行。
+        task_done 及其之后的调用在前面的调用全部完成后再顺序执行，保证完成语义不变。
+        同一批次中重复的调用只执行一次。
+        """
+        unique_calls, positions = self._dedupe_tool_calls(tool_calls)
+        results = await self._parallel_tool_call(unique_calls)
+        return self._expand_results(tool_calls, positions, results)
 
     async def sequential_tool_call(self, tool_calls: list[ToolCall]) -> list[ToolResult]:
-        """顺序执行工具调用"""
+        """顺序执行工具调用（同一批次中重复的调用只执行一次）"""
+        unique_calls, positions = self._dedupe_tool_calls(tool_calls)
+        results = await self._sequential_tool_call(unique_calls)
+        return self._expand_results(tool_calls, positions, results)
+
+    async def _parallel_tool_call(self, tool_calls: list[ToolCall]) -> list[ToolResult]:
+        """并行执行工具调用（不做去重）"""
+        if not all(self._is_parallel_safe(call) for call in tool_calls):
+            return await self._sequential_tool_call(tool_calls)
+
+        done_idx = next(
+            (i for i, call in enumerate(tool_calls) if self._normalize_name(call.name) == "taskdone"),
+            len(tool_calls),
+        )
+        concurrent_calls, trailing_calls = tool_calls[:done_idx], tool_calls[done_idx:]
+
+        semaphore = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+
+        async def _invoke(call: ToolCall) -> ToolResult:
+            async with semaphore:
+                return await self.execute_tool_call(call)
+
+        results = await asyncio.gather(
+            *(_invoke(call) for call in concurrent_calls), return_exceptions=True
+        )
+        tool_results = [
+            ToolResult(
+                name=call.name,
+                success=False,
+                error=f"执行工具 '{call.name}' 时出错: {str(result)}",
+                call_id=call.call_id,
+                id=call.id,
+            )
+            if isinstance(result, BaseException)
+            else result
+            for call, result in zip(concurrent_calls, results)
+        ]
+        tool_results.extend(await self._sequential_tool_call(trailing_calls))
+        return tool_results
+
+    async def _sequential_tool_call(self, tool_calls: list[ToolCall]) -> list[ToolResult]:
+        """顺序执行工具调用（不做去重）"""
         return [await self.execute_tool_call(call) for call in tool_calls]
 
+    def _dedupe_tool_calls(self, tool_calls: list[ToolCall]) -> tuple[list[ToolCall], list[int]]:
+        """合并名称和参数完全相同的调用
+
+        只合并并发安全的工具：bash、Python 执行器等有状态的工具，重复调用的结果可能不同。
+
+        Returns:
+            (去重后的调用列表, 每个原始调用对应的去重后下标)
+        """
+        unique_calls: list[ToolCall] = []
+        positions: list[int] = []
+        seen: dict[tuple[str, str], int] = {}
+        for call in tool_calls:
+            key = None
+            if self._normalize_name(call.name) in self.tools and self._is_parallel_safe(call):
+                try:
+                    key = (
+                        self._normalize_name(call.name),
+                        json.dumps(call.arguments, sort_keys=True, ensure_ascii=False, default=str),
+                    )
+                except (TypeError, ValueError):
+                    key = None
+            if key is not None and key in seen:
+                positions.append(seen[key])
+                continue
+            if key is not None:
+                seen[key] = len(unique_calls)
+            positions.append(len(unique_calls))
+            unique_calls.append(call)
+        return unique_calls, positions
+
+    @staticmethod
+    def _expand_results(
+        tool_calls: list[ToolCall], positions: list[int], results: list[ToolResult]
+    ) -> list[ToolResult]:
+        """将去重后的结果按原始调用展开，重复调用复用结果并换成自己的调用 ID"""
+        if len(results) == len(tool_calls):
+            return results
+        expanded = []
+        used: set[int] = set()
+        for call, pos in zip(tool_calls, positions):
+            result = results[pos]
+            if pos in used:
+                result = replace(result, call_id=call.call_id, id=call.id)
+            used.add(pos)
+            expanded.append(result)
+        return expanded
+
+    def _is_parallel_safe(self, tool_call: ToolCall) -> bool:
+        """判断工具调用是否可以并发执行（未知工具不会真正执行，视为安全）"""
+        tool = self.tools.get(self._normalize_name(tool_call.name))
+        return tool is None or tool.parallel_safe
@@ -136,6 +136,9 @@ class _BashSession:
 class BashTool(Tool):
     """允许 Agent 运行 bash 命令的工具"""
 
+    # 所有调用共享同一个 bash 会话，不能并发写入
+    parallel_safe = False
+
     def __init__(self, model_provider: str | None = None, data_dir: str | None = None):
         super().__init__(model_provider)
         self._session: _BashSession | None = None
@@ -23,6 +23,9 @@ class PythonExecutorTool(Tool):
     - 文件操作（限制在指定目录内）
     """
 
+    # 执行时会重定向全局 stdout/stderr 并修改 matplotlib 全局状态
+    parallel_safe = False
+
     def __init__(
         self,
         model_provider: str | None = None,
@@ -163,7 +163,7 @@ class ConsoleOutput:
         self.console.print("[bold cyan]执行摘要[/bold cyan]")
         self.console.print(f"[bold cyan]{'='*60}[/bold cyan]\n")
         
-        self.console.print(f"总步数: {len(execution.steps)}")
+        self.console.print(f"总步数: {execution.step_count}")
         self.console.print(f"执行时间: {execution.execution_time:.2f} 秒")
         self.console.print(f"状态: {'✅ 成功' if execution.success else '❌ 失败'}")
         
@@ -0,0 +1,74 @@
+"""JSON 序列化辅助函数
+
+安装了 orjson 时使用 orjson（更快，直接输出 UTF-8 字节），否则退回标准库 json。
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_bytes(
+    obj: Any,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> bytes:
+    """序列化为 UTF-8 编码的 JSON 字节串
+
+    Args:
+        obj: 待序列化对象（支持 dataclass）
+        indent: 是否使用 2 空格缩进
+        sort_keys: 是否按键排序
+        default: 无法直接序列化的对象的转换函数
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        sort_keys=sort_keys,
+        default=default,
+    ).encode("utf-8")
+
+
+def dumps(
+    obj: Any,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> str:
+    """序列化为 JSON 字符串（参数同 dumps_bytes）"""
+    return dumps_bytes(obj, indent=indent, sort_keys=sort_keys, default=default).decode("utf-8")
+
+
+def dump_to_file(obj: Any, path: str | Path, *, indent: bool = False) -> None:
+    """序列化并写入文件"""
+    with open(path, "wb") as f:
+        f.write(dumps_bytes(obj, indent=indent, default=str))
+
+
+def loads(data: bytes | str) -> Any:
+    """解析 JSON（字节串或字符串），格式错误时抛出 ValueError"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_from_file(path: str | Path) -> Any:
+    """从文件读取并解析 JSON"""
+    with open(path, "rb") as f:
+        return loads(f.read())
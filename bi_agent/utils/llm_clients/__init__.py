@@ -1,18 +1,21 @@
 """LLM 客户端模块"""
 
-from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse, LLMUsage
+from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse, LLMResponseSummary, LLMUsage
 from bi_agent.utils.llm_clients.llm_client import LLMClient
 from bi_agent.utils.llm_clients.openai_client import OpenAIClient
 from bi_agent.utils.llm_clients.doubao_client import DoubaoClient
 from bi_agent.utils.llm_clients.qwen_client import QwenClient
+from bi_agent.utils.llm_clients.caching_client import CachingLLMClient
 
 __all__ = [
     "LLMMessage",
     "LLMResponse",
+    "LLMResponseSummary",
     "LLMUsage",
     "LLMClient",
     "OpenAIClient",
     "DoubaoClient",
     "QwenClient",
+    "CachingLLMClient",
 ]
 
@@ -0,0 +1,180 @@
+"""带精确匹配缓存的 LLM 客户端装饰器"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import asdict
+
+from bi_agent.utils.typing_compat import override
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from bi_agent.utils.json_utils import dumps_bytes, loads
+from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse, LLMUsage
+from bi_agent.utils.llm_clients.llm_client import LLMClient
+from bi_agent.tools.base import Tool, ToolCall
+
+# Redis 缓存键前缀（v2：响应以 JSON 存储，不再使用 pickle）
+REDIS_KEY_PREFIX = "bi_agent:llm_cache:v2:"
+
+
+class CachingLLMClient(LLMClient):
+    """对 (messages, tools, 模型参数) 做精确匹配缓存的 LLM 客户端
+
+    缓存键为规范化消息、工具定义和模型参数的 SHA-256。进程内使用 LRU 缓存，
+    配置 LLM_CACHE_REDIS_URL 环境变量时额外写入 Redis，便于跨进程复用。
+    响应以 JSON 存储并在读取时重建，不使用 pickle，能写 Redis 的一方也无法借缓存执行代码。
+
+    注意：记忆消息（is_memory）每一步都会重新生成，不参与缓存键计算，因此检索到的记忆
+    不同而其余消息相同时，仍会返回之前的响应。
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        max_entries: int = 1024,
+        redis_url: str | None = None,
+        ttl: int | None = None,
+    ):
+        """初始化缓存客户端
+
+        Args:
+            llm_client: 被包装的 LLM 客户端
+            max_entries: 进程内缓存的最大条目数
+            redis_url: Redis 连接地址（可选，默认读取 LLM_CACHE_REDIS_URL 环境变量）
+            ttl: Redis 缓存过期时间（秒，默认读取 LLM_CACHE_TTL 环境变量，缺省 1 天）
+        """
+        self._llm_client = llm_client
+        self._max_entries = max_entries
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._ttl = ttl if ttl is not None else int(os.getenv("LLM_CACHE_TTL", "86400"))
+
+        redis_url = redis_url or os.getenv("LLM_CACHE_REDIS_URL")
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url)
+            except Exception as e:
+                print(f"警告：Redis 缓存初始化失败，仅使用进程内缓存。错误：{e}")
+
+    @property
+    def llm_client(self) -> LLMClient:
+        """被包装的 LLM 客户端"""
+        return self._llm_client
+
+    def __getattr__(self, name: str):
+        # 透传 model 等属性到被包装的客户端
+        if name == "_llm_client":
+            raise AttributeError(name)
+        return getattr(self._llm_client, name)
+
+    @override
+    async def chat(self, messages: list[LLMMessage], tools: list[Tool] | None = None) -> LLMResponse:
+        """发送聊天消息，命中缓存时直接返回缓存的响应"""
+        key = self._make_key(messages, tools)
+
+        cached = self._get(key)
+        if cached is not None:
+            try:
+                return self._mark_cache_hit(self._decode_response(cached))
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                print(f"警告：缓存的 LLM 响应无法解析，将重新请求: {e}")
+
+        response = await self._llm_client.chat(messages, tools=tools)
+        self._set(key, self._encode_response(response))
+        return response
+
+    def clear(self) -> None:
+        """清空进程内缓存"""
+        self._cache.clear()
+
+    def _make_key(self, messages: list[LLMMessage], tools: list[Tool] | None) -> str:
+        """计算缓存键"""
+        normalized_messages = [
+            {
+                "role": msg.role,
+                "content": msg.content,
+                "tool_calls": [asdict(tc) for tc in msg.tool_calls] if msg.tool_calls else None,
+                "tool_call": asdict(msg.tool_call) if msg.tool_call else None,
+                "tool_result": asdict(msg.tool_result) if msg.tool_result else None,
+            }
+            # 记忆消息每一步都会重新生成，不参与缓存键计算
+            for msg in messages
+            if not msg.is_memory
+        ]
+        payload = {
+            "messages": normalized_messages,
+            "tools": [tool.json_definition() for tool in tools] if tools else None,
+            "model": getattr(self._llm_client, "model", None),
+            "temperature": getattr(self._llm_client, "temperature", None),
+        }
+        return hashlib.sha256(dumps_bytes(payload, sort_keys=True, default=str)).hexdigest()
+
+    def _get(self, key: str) -> bytes | None:
+        """读取缓存（先查进程内，再查 Redis）"""
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+            return value
+
+        if self._redis is not None:
+            try:
+                value = self._redis.get(f"{REDIS_KEY_PREFIX}{key}")
+            except Exception as e:
+                print(f"警告：读取 Redis 缓存失败: {e}")
+                value = None
+            if value is not None:
+                self._remember(key, value)
+        return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        """写入缓存"""
+        self._remember(key, value)
+        if self._redis is not None:
+            try:
+                self._redis.set(f"{REDIS_KEY_PREFIX}{key}", value, ex=self._ttl)
+            except Exception as e:
+                print(f"警告：写入 Redis 缓存失败: {e}")
+
+    def _remember(self, key: str, value: bytes) -> None:
+        """写入进程内 LRU 缓存"""
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _encode_response(response: LLMResponse) -> bytes:
+        """将响应序列化为 JSON 字节串"""
+        return dumps_bytes(asdict(response), default=str)
+
+    @staticmethod
+    def _decode_response(data: bytes) -> LLMResponse:
+        """从 JSON 字节串重建响应（只构造已知的数据类，不执行任何代码）"""
+        payload = loads(data)
+        usage = payload.get("usage")
+        tool_calls = payload.get("tool_calls")
+        return LLMResponse(
+            content=payload["content"],
+            usage=LLMUsage(**usage) if usage else None,
+            model=payload.get("model"),
+            finish_reason=payload.get("finish_reason"),
+            tool_calls=[ToolCall(**tool_call) for tool_call in tool_calls] if tool_calls else None,
+        )
+
+    @staticmethod
+    def _mark_cache_hit(response: LLMResponse) -> LLMResponse:
+        """将缓存命中的响应用量标记为零消耗（原输入 token 记入 cache_read_input_tokens）
+
+        响应每次都从缓存的字节串重新构建，本身就是独立副本，可以直接修改。
+        """
+        if response.usage:
+            response.usage = LLMUsage(
+                input_tokens=0,
+                output_tokens=0,
+                cache_read_input_tokens=response.usage.input_tokens,
+            )
+        return response
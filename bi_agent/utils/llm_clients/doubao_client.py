@@ -177,9 +177,12 @@ class DoubaoClient(LLMClient):
         # 解析使用量
         usage = None
         if response.usage:
+            # 命中服务端前缀缓存的输入 token 数（OpenAI 兼容接口的 prompt_tokens_details）
+            prompt_details = getattr(response.usage, "prompt_tokens_details", None)
             usage = LLMUsage(
                 input_tokens=response.usage.prompt_tokens or 0,
                 output_tokens=response.usage.completion_tokens or 0,
+                cache_read_input_tokens=getattr(prompt_details, "cached_tokens", None) or 0,
             )
 
         return LLMResponse(
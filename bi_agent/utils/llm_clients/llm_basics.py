@@ -1,9 +1,14 @@
 """LLM 基础数据类型"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from bi_agent.tools.base import ToolCall, ToolResult
 
+# 单条记忆的内容前缀
+MEMORY_MESSAGE_PREFIX = "[记忆 -"
+# Agent 每一步追加在消息末尾的记忆汇总消息前缀（不属于真实对话历史）
+MEMORY_CONTEXT_PREFIX = "[相关记忆]"
+
 
 @dataclass
 class LLMMessage:
@@ -14,6 +19,13 @@ class LLMMessage:
     tool_call: ToolCall | None = None  # 单个工具调用（用于向后兼容）
     tool_calls: list[ToolCall] | None = None  # 多个工具调用（用于 assistant 消息）
     tool_result: ToolResult | None = None
+    # 是否为记忆消息，构造时计算一次，避免每一步重复做前缀匹配
+    is_memory: bool = field(default=False, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.is_memory = bool(self.content) and self.content.startswith(
+            (MEMORY_MESSAGE_PREFIX, MEMORY_CONTEXT_PREFIX)
+        )
 
 
 @dataclass
@@ -49,3 +61,28 @@ class LLMResponse:
     finish_reason: str | None = None
     tool_calls: list[ToolCall] | None = None
 
+
+
+@dataclass(slots=True)
+class LLMResponseSummary:
+    """LLM 响应的精简摘要
+
+    步骤记录到轨迹后用它替换完整的 LLMResponse，释放响应内容和工具调用占用的内存。
+    """
+
+    usage: LLMUsage | None
+    content_len: int
+    tool_call_count: int
+    finish_reason: str | None = None
+
+    @classmethod
+    def from_response(cls, response: "LLMResponse | LLMResponseSummary") -> "LLMResponseSummary":
+        """从完整响应生成摘要"""
+        if isinstance(response, LLMResponseSummary):
+            return response
+        return cls(
+            usage=response.usage,
+            content_len=len(response.content) if response.content else 0,
+            tool_call_count=len(response.tool_calls) if response.tool_calls else 0,
+            finish_reason=response.finish_reason,
+        )
@@ -1,11 +1,12 @@
 """基于 mem0 的记忆管理模块"""
 
-import json
+import asyncio
 import os
 from typing import Optional, Any
 from dataclasses import dataclass, asdict
 
-from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse
+from bi_agent.utils.json_utils import dump_to_file, dumps, load_from_file
+from bi_agent.utils.llm_clients.llm_basics import MEMORY_MESSAGE_PREFIX, LLMMessage, LLMResponse
 
 
 @dataclass
@@ -84,6 +85,14 @@ class MemoryManager:
         # 消息历史（用于压缩）
         self._message_history: list[LLMMessage] = []
         self._compressed_messages: list[LLMMessage] = []
+
+    @property
+    def enabled(self) -> bool:
+        """是否配置了可用的记忆后端（mem0）
+
+        为 False 时记忆功能退化为空操作，Agent 会跳过记忆相关的处理。
+        """
+        return self._mem0_available
     
     def _fallback_search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
         """降级搜索：当 mem0 不可用时使用简化实现
@@ -393,7 +402,7 @@ class MemoryManager:
                 # 记录工具调用
                 for tool_call in msg.tool_calls:
                     tool_calls_summary.append(
-                        f"- 调用工具 {tool_call.name}，参数: {json.dumps(tool_call.arguments, ensure_ascii=False)}"
+                        f"- 调用工具 {tool_call.name}，参数: {dumps(tool_call.arguments, default=str)}"
                     )
             elif msg.role == "user" and msg.tool_result:
                 # 记录工具结果
@@ -463,7 +472,7 @@ class MemoryManager:
             
             memory_message = LLMMessage(
                 role="system",
-                content=f"[记忆 - {memory_type}]: {content}",
+                content="".join((MEMORY_MESSAGE_PREFIX, " ", str(memory_type), "]: ", content)),
             )
             memory_messages.append(memory_message)
         
@@ -527,8 +536,7 @@ class MemoryManager:
                 ],
             }
             
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(memory_data, f, ensure_ascii=False, indent=2)
+            dump_to_file(memory_data, file_path, indent=True)
         except Exception as e:
             print(f"保存记忆失败: {e}")
     
@@ -539,8 +547,7 @@ class MemoryManager:
             file_path: 文件路径
         """
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                memory_data = json.load(f)
+            memory_data = load_from_file(file_path)
             
             # 加载压缩的消息
             self._compressed_messages = [
@@ -556,3 +563,124 @@ class MemoryManager:
         except Exception as e:
             print(f"加载记忆失败: {e}")
 
+
+@dataclass
+class MemoryOp:
+    """待写入的记忆操作"""
+
+    # message：add_message；memory：add_memory
+    kind: str
+    message: Optional[LLMMessage] = None
+    content: str = ""
+    memory_type: str = "session"
+    metadata: Optional[dict[str, Any]] = None
+
+
+class BackgroundMemoryWriter:
+    """在后台批量执行记忆写入
+
+    mem0 的写入是同步的网络调用（向量化 + 向量库写入），消息压缩时也会触发写入。
+    写入操作先进入队列，由后台任务按批在线程池中依次执行，不阻塞 Agent 的 LLM 调用。
+    写入顺序与入队顺序一致。
+    """
+
+    def __init__(self, memory_manager: MemoryManager, max_batch: int = 32, max_wait_ms: float = 50.0):
+        """初始化后台写入器
+
+        Args:
+            memory_manager: 记忆管理器
+            max_batch: 单批最大操作数
+            max_wait_ms: 收到第一个操作后等待更多操作的最长时间（毫秒）
+        """
+        self._memory_manager = memory_manager
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue[MemoryOp] | None = None
+        self._worker: asyncio.Task | None = None
+
+    def add_message(self, message: LLMMessage) -> None:
+        """将消息加入写入队列"""
+        self.enqueue(MemoryOp(kind="message", message=message))
+
+    def add_memory(
+        self,
+        content: str,
+        memory_type: str = "session",
+        metadata: Optional[dict[str, Any]] = None,
+    ) -> None:
+        """将记忆加入写入队列"""
+        self.enqueue(MemoryOp(kind="memory", content=content, memory_type=memory_type, metadata=metadata))
+
+    def enqueue(self, op: MemoryOp) -> None:
+        """将操作加入写入队列（不阻塞）
+
+        没有运行中的事件循环时直接同步执行；记忆后端不可用时直接丢弃。
+        """
+        if not self._memory_manager.enabled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply(op)
+            return
+
+        if self._queue is None or self._worker is None or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._flush_loop(self._queue))
+        self._queue.put_nowait(op)
+
+    async def drain(self) -> None:
+        """等待队列中的操作全部写入"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """写入剩余操作并停止后台任务"""
+        await self.drain()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._queue = None
+        self._worker = None
+
+    async def _flush_loop(self, queue: asyncio.Queue[MemoryOp]) -> None:
+        """后台任务：按批取出操作并写入"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self._apply_batch, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _apply_batch(self, batch: list[MemoryOp]) -> None:
+        """依次执行一批操作"""
+        for op in batch:
+            self._apply(op)
+
+    def _apply(self, op: MemoryOp) -> None:
+        """执行单个操作"""
+        try:
+            if op.kind == "message":
+                self._memory_manager.add_message(op.message)
+            else:
+                self._memory_manager.add_memory(
+                    content=op.content,
+                    memory_type=op.memory_type,
+                    metadata=op.metadata,
+                )
+        except Exception as e:
+            print(f"写入记忆失败: {e}")
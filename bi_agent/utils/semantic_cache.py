@@ -0,0 +1,285 @@
+"""基于语义相似度的任务结果缓存模块"""
+
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from bi_agent.utils.json_utils import dump_to_file, load_from_file
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+
+@dataclass
+class CachedTask:
+    """缓存的任务执行结果"""
+
+    task: str
+    final_result: str
+    data_dir: str
+    output_dir: str
+    created_at: float
+    # 输出文件清单：路径 -> [文件大小, 修改时间(ns)]，用于校验缓存产物是否仍然有效
+    artifacts: dict[str, list[int]] = field(default_factory=dict)
+    # 数据文件清单（格式同 artifacts），数据目录中的文件有新增、删除或改动时缓存失效。
+    # 旧版本缓存没有记录数据文件，为 None 时视为无效
+    inputs: Optional[dict[str, list[int]]] = None
+    # 执行时生成的报告路径（按生成顺序），命中时原样返回；报告文件同时记录在 artifacts 中
+    report_paths: list[str] = field(default_factory=list)
+
+
+class SemanticTaskCache:
+    """语义任务缓存
+
+    对任务描述做向量化，按余弦相似度查找之前执行过的相似任务。相似度不低于阈值、
+    数据目录/输出目录一致、未过期、数据文件和输出文件都未被改动时命中，直接复用之前的执行结果。
+    """
+
+    DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        threshold: float = 0.92,
+        ttl: Optional[int] = 24 * 3600,
+        embedding_fn: Optional[Callable[[str], np.ndarray]] = None,
+        model_name: str = DEFAULT_MODEL,
+    ):
+        """初始化语义任务缓存
+
+        Args:
+            cache_dir: 持久化目录（可选，None 表示仅在内存中缓存）
+            threshold: 命中所需的最小余弦相似度
+            ttl: 缓存存活时间（秒），None 表示永不过期
+            embedding_fn: 自定义向量化函数（可选，默认使用 sentence-transformers）
+            model_name: sentence-transformers 模型名称
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self._embedding_fn = embedding_fn
+        if self._embedding_fn is None:
+            if SentenceTransformer is None:
+                print("警告：sentence-transformers 未安装，语义任务缓存将不可用。")
+                print("安装命令：pip install sentence-transformers")
+            else:
+                try:
+                    model = SentenceTransformer(model_name)
+                    self._embedding_fn = lambda text: model.encode(text)
+                except Exception as e:
+                    print(f"警告：向量模型加载失败，语义任务缓存将不可用。错误：{e}")
+
+        self._entries: list[CachedTask] = []
+        self._embeddings: np.ndarray | None = None
+        self._norms: np.ndarray | None = None
+
+        if self.cache_dir:
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否可用"""
+        return self._embedding_fn is not None
+
+    def lookup(self, task: str, data_dir: str, output_dir: str) -> Optional[CachedTask]:
+        """查找语义相似的已缓存任务
+
+        Args:
+            task: 任务描述
+            data_dir: 数据目录
+            output_dir: 输出目录
+
+        Returns:
+            命中的缓存条目，未命中返回 None
+        """
+        if not self.enabled or self._embeddings is None or not self._entries:
+            return None
+
+        query = self._embed(task)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0.0:
+            return None
+
+        scores = self._embeddings @ query / (self._norms * query_norm)
+        # 按相似度从高到低检查，跳过过期或目录不一致的条目
+        for idx in np.argsort(scores)[::-1]:
+            if scores[idx] < self.threshold:
+                break
+            entry = self._entries[idx]
+            if entry.data_dir != str(data_dir) or entry.output_dir != str(output_dir):
+                continue
+            # 数据文件校验需要遍历数据目录，放在最后
+            if self._is_expired(entry) or not self._artifacts_valid(entry) or not self._inputs_valid(entry):
+                continue
+            return entry
+        return None
+
+    def insert(
+        self,
+        task: str,
+        final_result: str,
+        data_dir: str,
+        output_dir: str,
+        report_paths: Optional[list[str]] = None,
+    ) -> None:
+        """缓存一次成功执行的结果
+
+        Args:
+            task: 任务描述
+            final_result: 最终结果
+            data_dir: 数据目录
+            output_dir: 输出目录
+            report_paths: 执行时生成的报告路径（可选）
+        """
+        if not self.enabled:
+            return
+
+        report_paths = [str(path) for path in report_paths or []]
+        artifacts = self._snapshot_artifacts(Path(output_dir))
+        for path in report_paths:
+            if path in artifacts:
+                continue
+            # 报告不在输出目录下时单独记录；报告已不存在则不缓存
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                return
+            artifacts[path] = [stat.st_size, stat.st_mtime_ns]
+
+        entry = CachedTask(
+            task=task,
+            final_result=final_result,
+            data_dir=str(data_dir),
+            output_dir=str(output_dir),
+            created_at=time.time(),
+            artifacts=artifacts,
+            inputs=self._snapshot_artifacts(Path(data_dir), exclude=Path(output_dir)),
+            report_paths=report_paths,
+        )
+        vector = self._embed(task)[np.newaxis, :]
+
+        self._entries.append(entry)
+        if self._embeddings is None:
+            self._embeddings = vector
+        else:
+            self._embeddings = np.vstack([self._embeddings, vector])
+        self._norms = np.linalg.norm(self._embeddings, axis=1)
+        self._norms[self._norms == 0] = 1.0
+
+        self._evict_expired()
+        if self.cache_dir:
+            self._save()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries = []
+        self._embeddings = None
+        self._norms = None
+        if self.cache_dir:
+            self._save()
+
+    def _embed(self, text: str) -> np.ndarray:
+        """向量化文本"""
+        return np.asarray(self._embedding_fn(text), dtype=np.float32).reshape(-1)
+
+    def _is_expired(self, entry: CachedTask) -> bool:
+        """检查条目是否过期"""
+        return self.ttl is not None and time.time() - entry.created_at > self.ttl
+
+    def _evict_expired(self) -> None:
+        """移除过期条目"""
+        if self.ttl is None or self._embeddings is None:
+            return
+        keep = [i for i, entry in enumerate(self._entries) if not self._is_expired(entry)]
+        if len(keep) == len(self._entries):
+            return
+        self._entries = [self._entries[i] for i in keep]
+        if keep:
+            self._embeddings = self._embeddings[keep]
+            self._norms = self._norms[keep]
+        else:
+            self._embeddings = None
+            self._norms = None
+
+    @staticmethod
+    def _snapshot_artifacts(directory: Path, exclude: Optional[Path] = None) -> dict[str, list[int]]:
+        """记录目录下的文件清单
+
+        Args:
+            directory: 要记录的目录
+            exclude: 跳过该目录下的文件（数据目录包含输出目录时，避免把输出文件算作数据）
+        """
+        artifacts = {}
+        if directory.is_dir():
+            for file_path in directory.rglob("*"):
+                if exclude is not None and file_path.is_relative_to(exclude):
+                    continue
+                if file_path.is_file():
+                    stat = file_path.stat()
+                    artifacts[str(file_path)] = [stat.st_size, stat.st_mtime_ns]
+        return artifacts
+
+    @staticmethod
+    def _files_unchanged(manifest: dict[str, list[int]]) -> bool:
+        """检查清单中的文件是否仍然存在且未被修改"""
+        for path, (size, mtime_ns) in manifest.items():
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+    @classmethod
+    def _artifacts_valid(cls, entry: CachedTask) -> bool:
+        """检查缓存记录的输出文件（包括报告）是否仍然存在且未被修改"""
+        if any(path not in entry.artifacts for path in entry.report_paths):
+            return False
+        return cls._files_unchanged(entry.artifacts)
+
+    @classmethod
+    def _inputs_valid(cls, entry: CachedTask) -> bool:
+        """检查数据目录与缓存时完全一致（没有新增、删除或修改的文件）"""
+        if entry.inputs is None:
+            return False
+        current = cls._snapshot_artifacts(Path(entry.data_dir), exclude=Path(entry.output_dir))
+        return current == entry.inputs
+
+    def _load(self) -> None:
+        """从磁盘加载缓存"""
+        entries_path = self.cache_dir / "entries.json"
+        embeddings_path = self.cache_dir / "embeddings.npy"
+        if not entries_path.exists() or not embeddings_path.exists():
+            return
+        try:
+            self._entries = [CachedTask(**item) for item in load_from_file(entries_path)]
+            self._embeddings = np.load(embeddings_path)
+            if len(self._entries) != len(self._embeddings):
+                raise ValueError("缓存条目与向量数量不一致")
+            self._norms = np.linalg.norm(self._embeddings, axis=1)
+            self._norms[self._norms == 0] = 1.0
+            self._evict_expired()
+        except Exception as e:
+            print(f"加载语义任务缓存失败: {e}")
+            self._entries = []
+            self._embeddings = None
+            self._norms = None
+
+    def _save(self) -> None:
+        """保存缓存到磁盘"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            dump_to_file([asdict(entry) for entry in self._entries], self.cache_dir / "entries.json")
+            if self._embeddings is not None:
+                np.save(self.cache_dir / "embeddings.npy", self._embeddings)
+            else:
+                (self.cache_dir / "embeddings.npy").unlink(missing_ok=True)
+        except Exception as e:
+            print(f"保存语义任务缓存失败: {e}")
@@ -1,11 +1,11 @@
 """执行轨迹记录模块"""
 
-import json
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
 from bi_agent.tools.base import ToolCall, ToolResult
+from bi_agent.utils.json_utils import dump_to_file
 from bi_agent.utils.llm_clients.llm_basics import LLMMessage, LLMResponse
 
 
@@ -71,6 +71,11 @@ class TrajectoryRecorder:
         self.trajectory_data["max_steps"] = max_steps
         self.trajectory_data["data_dir"] = data_dir
         self.trajectory_data["output_dir"] = output_dir
+        # 同一记录器可能被复用，清空上一次任务的记录
+        self.trajectory_data["llm_interactions"] = []
+        self.trajectory_data["agent_steps"] = []
+        self.trajectory_data["success"] = False
+        self.trajectory_data["final_result"] = None
         self.save_trajectory()
 
     def end_recording(self, success: bool, final_result: Optional[str] = None, summary: Optional[str] = None) -> None:
@@ -147,6 +152,7 @@ class TrajectoryRecorder:
         tool_results: Optional[list[ToolResult]] = None,
         reflection: Optional[str] = None,
         error: Optional[str] = None,
+        is_delta: bool = False,
     ) -> None:
         """记录 Agent 执行步骤
 
@@ -159,12 +165,15 @@ class TrajectoryRecorder:
             tool_results: 工具执行结果列表
             reflection: 反思内容
             error: 错误信息
+            is_delta: llm_messages 是否只包含上一步之后新增的消息。
+                为 True 时，按步骤顺序拼接各步的 llm_messages 即可还原完整消息历史
         """
         step_data = {
             "step_number": step_number,
             "timestamp": datetime.now().isoformat(),
             "state": state,
             "llm_messages": [self._serialize_message(msg) for msg in llm_messages] if llm_messages else None,
+            "is_delta": is_delta,
             "llm_response": {
                 "content": llm_response.content,
                 "model": llm_response.model,
@@ -222,8 +231,7 @@ class TrajectoryRecorder:
     def save_trajectory(self) -> None:
         """保存轨迹到文件"""
         try:
-            with open(self.trajectory_path, "w", encoding="utf-8") as f:
-                json.dump(self.trajectory_data, f, ensure_ascii=False, indent=2)
+            dump_to_file(self.trajectory_data, self.trajectory_path, indent=True)
         except Exception as e:
             print(f"错误：无法保存轨迹文件: {e}")
 
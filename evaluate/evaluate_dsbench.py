@@ -383,7 +383,7 @@ class DSBenchEvaluator:
                 "cost": cost,
                 "time": elapsed_time,
                 "success": execution.success,
-                "steps": len(execution.steps),
+                "steps": execution.step_count,
             }
         except Exception as e:
             end_time = time.time()
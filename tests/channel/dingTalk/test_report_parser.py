@@ -0,0 +1,136 @@
+"""测试钉钉报告的 Markdown 解析和消息构建"""
+
+import os
+
+import pytest
+
+from bi_agent.channel.dingTalk.report_reply import DingTalkReportReply
+
+REPORT = """# 销售分析
+
+# 销售分析
+
+## 概览
+销售额增长 **20%**。
+---
+
+![趋势图](images/trend.png)
+
+详见 [明细](data/detail.csv) 和 [data/sum.xlsx](data/sum.xlsx)，外部 [报告](https://example.com/a.pdf)。
+
+
+
+## 结论
+![趋势图](images/trend.png)
+"""
+
+
+class FakeApiClient:
+    """记录上传次数的假 API 客户端"""
+
+    def __init__(self):
+        self.uploads = []
+
+    def upload_image(self, image_path):
+        self.uploads.append(image_path)
+        return f"@media{len(self.uploads)}"
+
+
+@pytest.fixture
+def reply(tmp_path):
+    return DingTalkReportReply(FakeApiClient(), tmp_path)
+
+
+def test_parse_report(reply):
+    parsed = reply._parse_content(REPORT)
+
+    assert parsed["title"] == "销售分析"
+    assert parsed["text"] == (
+        "## 概览\n"
+        "销售额增长 **20%**。\n"
+        "\n"
+        "__IMAGE_PLACEHOLDER_0__\n"
+        "\n"
+        "详见 明细: detail.csv 和 sum.xlsx，外部 [报告](https://example.com/a.pdf)。\n"
+        "\n"
+        "## 结论\n"
+        "__IMAGE_PLACEHOLDER_1__"
+    )
+    assert parsed["images"] == ["images/trend.png", "images/trend.png"]
+    assert parsed["image_placeholders"] == [
+        ("__IMAGE_PLACEHOLDER_0__", "趋势图", "images/trend.png"),
+        ("__IMAGE_PLACEHOLDER_1__", "趋势图", "images/trend.png"),
+    ]
+    assert parsed["file_links"] == [
+        ("明细", "data/detail.csv"),
+        ("data/sum.xlsx", "data/sum.xlsx"),
+        ("报告", "https://example.com/a.pdf"),
+    ]
+
+
+def test_missing_title_uses_default(reply):
+    parsed = reply._parse_content("## 小节\n内容\n")
+
+    assert parsed["title"] == "数据分析报告"
+    assert parsed["text"] == "## 小节\n内容"
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        # 只有标题的报告保留标题行
+        ("# T\n", "# T"),
+        ("# T", "# T"),
+        ("# T\n\n\n", "# T"),
+        # 所有重复的标题行连同其后的空行一起去掉
+        ("# T\n\nbody\n\n# T\n\nmore\n", "body\n\nmore"),
+        ("# T\nbody\n# T  \n\n  x\n", "body\n  x"),
+        # 标题后还有其他文字的行不是重复标题
+        ("# T\nbody\n# T extra\n", "body\n# T extra"),
+        # 结尾的重复标题行保留
+        ("# T\n---\nA\n\n---\n\n# T\n", "A\n\n# T"),
+        # 正文不以标题开头时不做处理
+        ("intro\n# T\nx", "intro\n# T\nx"),
+    ],
+)
+def test_title_lines(reply, content, expected):
+    assert reply._parse_content(content)["text"] == expected
+
+
+def test_rules_and_blank_runs_collapse(reply):
+    content = "# T\n\nA\n---\nB\n\n---   \n\n\n\nC\n\n\n\nD\n"
+
+    assert reply._parse_content(content)["text"] == "A\n\nB\n\nC\n\nD"
+
+
+def test_parse_markdown_cache_returns_copies_and_tracks_changes(reply, tmp_path):
+    md_path = tmp_path / "report.md"
+    md_path.write_text("# 报告\n\n第一版\n", encoding="utf-8")
+
+    first = reply.parse_markdown(md_path)
+    first["uploaded_images"] = {"x": "y"}
+    second = reply.parse_markdown(md_path)
+
+    assert second["text"] == "第一版"
+    assert "uploaded_images" not in second
+
+    md_path.write_text("# 报告\n\n第二版内容\n", encoding="utf-8")
+    stat = md_path.stat()
+    os.utime(md_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert reply.parse_markdown(md_path)["text"] == "第二版内容"
+
+
+def test_build_content_uploads_each_image_once(reply, tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "trend.png").write_bytes(b"png")
+    parsed = reply._parse_content(REPORT + "\n![缺失](images/missing.png)\n")
+
+    content = reply._build_rich_text_content(parsed)
+
+    assert len(reply.api_client.uploads) == 1
+    assert content.count("![趋势图](@media1)") == 2
+    assert "missing.png" not in content
+    assert "__IMAGE_PLACEHOLDER_" not in content
+    # 单个换行前后各加两个空格
+    assert "## 概览  \n  销售额增长 **20%**。" in content
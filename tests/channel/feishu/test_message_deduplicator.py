@@ -0,0 +1,63 @@
+"""测试消息去重器的容量淘汰和 SQLite 持久化"""
+
+from bi_agent.channel.feishu.message_deduplicator import MessageDeduplicator
+
+
+def test_try_mark_detects_duplicates():
+    dedup = MessageDeduplicator()
+
+    assert dedup.try_mark("m1") is False
+    assert dedup.try_mark("m1") is True
+
+
+def test_try_mark_evicts_oldest_when_full():
+    dedup = MessageDeduplicator(max_entries=2)
+
+    assert dedup.try_mark("m1") is False
+    assert dedup.try_mark("m2") is False
+    assert dedup.try_mark("m3") is False
+
+    assert list(dedup.processed_messages) == ["m2", "m3"]
+    assert dedup.evicted_count == 1
+    assert dedup.is_processed("m1") is False
+    assert dedup.is_processed("m3") is True
+    # 被淘汰的消息再次投递时会被当作新消息
+    assert dedup.try_mark("m1") is False
+    assert list(dedup.processed_messages) == ["m3", "m1"]
+    assert dedup.get_stats()["evicted"] == 2
+
+
+def test_persisted_records_reload_across_instances(tmp_path):
+    persist_path = tmp_path / "dedup" / "messages.db"
+    first = MessageDeduplicator(persist_path=persist_path)
+    assert first.try_mark("m1") is False
+    assert first.try_mark("m2") is False
+    first.close()
+
+    second = MessageDeduplicator(persist_path=persist_path)
+    try:
+        assert list(second.processed_messages) == ["m1", "m2"]
+        assert second.try_mark("m1") is True
+        assert second.try_mark("m3") is False
+    finally:
+        second.close()
+
+    third = MessageDeduplicator(persist_path=persist_path, max_entries=2)
+    try:
+        # 重新加载时只保留最新的 max_entries 条记录
+        assert list(third.processed_messages) == ["m2", "m3"]
+    finally:
+        third.close()
+
+
+def test_expired_records_are_not_reloaded(tmp_path):
+    persist_path = tmp_path / "messages.db"
+    first = MessageDeduplicator(persist_path=persist_path)
+    first.try_mark("m1")
+    first.close()
+
+    second = MessageDeduplicator(persist_path=persist_path, expire_hours=0)
+    try:
+        assert second.is_processed("m1") is False
+    finally:
+        second.close()
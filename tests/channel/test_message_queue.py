@@ -0,0 +1,70 @@
+"""测试 MessageQueue 的批量处理和队列满时的背压"""
+
+import threading
+
+from bi_agent.channel.common import MessageQueue, MessageTask
+
+
+def _task(message_id: str, user_id: str, handler, batch_handler=None) -> MessageTask:
+    return MessageTask(
+        message_id=message_id,
+        user_id=user_id,
+        open_id=user_id,
+        chat_id=None,
+        message_type="text",
+        content=message_id,
+        handler=handler,
+        batch_handler=batch_handler,
+    )
+
+
+def test_batch_handler_groups_tasks_by_user():
+    handled = []
+    batches = []
+    lock = threading.Lock()
+
+    def handler(task):
+        with lock:
+            handled.append(task.message_id)
+
+    async def batch_handler(tasks):
+        with lock:
+            batches.append((tasks[0].user_id, [task.message_id for task in tasks]))
+
+    queue = MessageQueue(num_workers=2)
+    # 启动前加入的任务在启动后一起入队，落在同一批中
+    for message_id, user_id in (("m1", "u1"), ("m2", "u2"), ("m3", "u1")):
+        assert queue.put(_task(message_id, user_id, handler, batch_handler))
+    assert queue.put(_task("m4", "u1", handler))
+    queue.start()
+    queue.stop()
+
+    assert sorted(batches) == [("u1", ["m1", "m3"]), ("u2", ["m2"])]
+    assert handled == ["m4"]
+    assert queue.metrics["enqueued"] == 4
+
+
+def test_put_drops_task_when_queue_stays_full():
+    started = threading.Event()
+    release = threading.Event()
+    handled = []
+
+    def handler(task):
+        handled.append(task.message_id)
+        started.set()
+        release.wait(5)
+
+    queue = MessageQueue(num_workers=1, max_size=1)
+    queue.start()
+    try:
+        assert queue.put(_task("m1", "u1", handler))
+        assert started.wait(5)
+        # 唯一的消费者被占用：m2 占满队列，m3 等待超时后被丢弃
+        assert queue.put(_task("m2", "u1", handler))
+        assert not queue.put(_task("m3", "u1", handler), timeout=0.1)
+        assert queue.metrics == {"enqueued": 2, "dropped": 1, "depth": 1}
+    finally:
+        release.set()
+        queue.stop()
+
+    assert handled == ["m1", "m2"]
@@ -0,0 +1,70 @@
+"""测试 ApiClientBase 的异步流式下载"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from bi_agent.channel import channel as channel_module
+from bi_agent.channel.channel import ApiClientBase
+
+
+class DummyApiClient(ApiClientBase):
+    """只用于测试下载的 API 客户端"""
+
+    def send_text_message(self, *args, **kwargs):
+        pass
+
+    def send_rich_text_message(self, *args, **kwargs):
+        pass
+
+    def download_file(self, *args, **kwargs):
+        pass
+
+    def upload_image(self, image_path):
+        return ""
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/signed":
+        return httpx.Response(302, headers={"Location": "https://cdn.example.com/file.csv"})
+    if request.url.path == "/file.csv":
+        return httpx.Response(200, content=b"a,b\n1,2\n")
+    return httpx.Response(404, content=b"not found")
+
+
+@pytest.fixture
+def api_client(monkeypatch):
+    real_async_client = httpx.AsyncClient
+    transport = httpx.MockTransport(_handler)
+    monkeypatch.setattr(
+        channel_module.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_async_client(transport=transport, **kwargs),
+    )
+    client = DummyApiClient()
+    yield client
+    client.close()
+
+
+def test_stream_to_file_follows_redirects(api_client, tmp_path):
+    save_path = tmp_path / "data" / "file.csv"
+
+    asyncio.run(api_client._stream_to_file("https://open.example.com/signed", save_path))
+
+    assert save_path.read_bytes() == b"a,b\n1,2\n"
+
+
+def test_stream_to_file_reports_http_errors(api_client, tmp_path):
+    errors = []
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(
+            api_client._stream_to_file(
+                "https://open.example.com/missing",
+                tmp_path / "missing.csv",
+                on_error=lambda status, body: errors.append((status, body)),
+            )
+        )
+
+    assert errors == [(404, b"not found")]
@@ -0,0 +1,71 @@
+"""测试 UserManager 按最近使用淘汰内存状态"""
+
+import threading
+
+from bi_agent.channel.common import UserManager
+
+
+def _user_state(manager: UserManager, user_id: str) -> dict:
+    return {
+        "recent": user_id in manager._recent_users,
+        "files": user_id in manager.user_files,
+        "lock": user_id in manager._user_locks,
+        "dirs": user_id in manager._dir_cache,
+        "index": user_id in manager._file_index,
+    }
+
+
+def test_text_only_users_are_evicted(tmp_path):
+    manager = UserManager(tmp_path, max_users=2)
+
+    for user_id in ("u1", "u2", "u3"):
+        manager.get_user_output_dir(user_id)
+        manager.get_downloaded_paths(user_id)
+
+    assert list(manager._recent_users) == ["u2", "u3"]
+    assert not any(_user_state(manager, "u1").values())
+    assert set(manager._user_locks) == {"u2", "u3"}
+    assert set(manager._dir_cache) == {"u2", "u3"}
+    # 磁盘上的用户目录保留
+    assert (tmp_path / "user_u1" / "output").is_dir()
+
+
+def test_all_per_user_maps_are_evicted_together(tmp_path):
+    manager = UserManager(tmp_path, max_users=1)
+    manager.get_user_data_dir("u1")
+    manager.add_file("u1", "k1", "a.csv", "csv")
+    assert all(_user_state(manager, "u1").values())
+
+    manager.add_file("u2", "k2", "b.csv", "csv")
+
+    assert not any(_user_state(manager, "u1").values())
+    assert list(manager.user_files) == ["u2"]
+
+
+def test_user_with_held_lock_is_not_evicted(tmp_path):
+    manager = UserManager(tmp_path, max_users=1)
+    manager.add_file("u1", "k1", "a.csv", "csv")
+    lock = manager._lock_for("u1")
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        with lock:
+            acquired.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    acquired.wait()
+    try:
+        manager.add_file("u2", "k2", "b.csv", "csv")
+        assert manager._user_locks["u1"] is lock
+        assert list(manager.user_files["u1"]) == ["k1"]
+    finally:
+        release.set()
+        holder.join()
+
+    # 锁释放后，下一次访问其他用户时再淘汰
+    manager.get_downloaded_paths("u3")
+    assert "u1" not in manager._user_locks
+    assert "u1" not in manager.user_files
@@ -0,0 +1,135 @@
+"""测试 ToolExecutor 的批次去重、结果展开和并发执行"""
+
+import asyncio
+
+from bi_agent.tools.base import Tool, ToolCall, ToolExecResult, ToolExecutor, ToolParameter
+
+
+class RecordingTool(Tool):
+    """记录调用次数和最大并发数的测试工具"""
+
+    def __init__(self, name: str, parallel_safe: bool = True, delay: float = 0.01):
+        super().__init__()
+        self._name = name
+        self.parallel_safe = parallel_safe
+        self._delay = delay
+        self.calls: list[dict] = []
+        self.active = 0
+        self.max_active = 0
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_description(self) -> str:
+        return f"测试工具 {self._name}"
+
+    def get_parameters(self) -> list[ToolParameter]:
+        return [ToolParameter(name="value", type="string", description="参数")]
+
+    async def execute(self, arguments) -> ToolExecResult:
+        self.calls.append(dict(arguments))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self._delay)
+        finally:
+            self.active -= 1
+        return ToolExecResult(output=f"{self._name}:{arguments.get('value')}:{len(self.calls)}")
+
+
+def _call(name: str, call_id: str, value: str) -> ToolCall:
+    return ToolCall(name=name, call_id=call_id, arguments={"value": value}, id=f"id-{call_id}")
+
+
+def test_dedupe_tool_calls_positions():
+    reader = RecordingTool("reader")
+    executor = ToolExecutor([reader])
+    calls = [
+        _call("reader", "c1", "a"),
+        _call("reader", "c2", "b"),
+        _call("reader", "c3", "a"),
+        _call("reader", "c4", "b"),
+    ]
+
+    unique_calls, positions = executor._dedupe_tool_calls(calls)
+
+    assert [call.call_id for call in unique_calls] == ["c1", "c2"]
+    assert positions == [0, 1, 0, 1]
+
+
+def test_dedupe_skips_non_parallel_safe_tools():
+    bash = RecordingTool("bash", parallel_safe=False)
+    executor = ToolExecutor([bash])
+    calls = [_call("bash", "c1", "ls"), _call("bash", "c2", "ls")]
+
+    unique_calls, positions = executor._dedupe_tool_calls(calls)
+
+    assert [call.call_id for call in unique_calls] == ["c1", "c2"]
+    assert positions == [0, 1]
+
+
+def test_parallel_tool_call_remaps_duplicate_results():
+    reader = RecordingTool("reader")
+    executor = ToolExecutor([reader])
+    calls = [
+        _call("reader", "c1", "a"),
+        _call("reader", "c2", "b"),
+        _call("reader", "c3", "a"),
+    ]
+
+    results = asyncio.run(executor.parallel_tool_call(calls))
+
+    assert len(reader.calls) == 2
+    assert [r.call_id for r in results] == ["c1", "c2", "c3"]
+    assert [r.id for r in results] == ["id-c1", "id-c2", "id-c3"]
+    assert results[2].result == results[0].result
+    assert results[0].result.startswith("reader:a:")
+    assert results[1].result.startswith("reader:b:")
+
+
+def test_duplicate_after_task_done_reuses_earlier_result():
+    reader = RecordingTool("reader")
+    task_done = RecordingTool("task_done")
+    executor = ToolExecutor([reader, task_done])
+    calls = [
+        _call("reader", "c1", "a"),
+        _call("task_done", "c2", "done"),
+        _call("reader", "c3", "a"),
+    ]
+
+    results = asyncio.run(executor.parallel_tool_call(calls))
+
+    assert len(reader.calls) == 1
+    assert len(task_done.calls) == 1
+    assert [r.call_id for r in results] == ["c1", "c2", "c3"]
+    assert [r.name for r in results] == ["reader", "task_done", "reader"]
+    assert results[2].result == results[0].result
+
+
+def test_non_parallel_safe_batch_runs_sequentially():
+    reader = RecordingTool("reader")
+    bash = RecordingTool("bash", parallel_safe=False)
+    executor = ToolExecutor([reader, bash])
+    calls = [
+        _call("reader", "c1", "a"),
+        _call("bash", "c2", "ls"),
+        _call("reader", "c3", "b"),
+    ]
+
+    results = asyncio.run(executor.parallel_tool_call(calls))
+
+    assert [r.call_id for r in results] == ["c1", "c2", "c3"]
+    assert reader.max_active == 1
+    assert bash.max_active == 1
+    assert [c["value"] for c in reader.calls] == ["a", "b"]
+
+
+def test_parallel_safe_batch_runs_concurrently():
+    reader = RecordingTool("reader", delay=0.05)
+    executor = ToolExecutor([reader])
+    calls = [_call("reader", f"c{i}", str(i)) for i in range(3)]
+
+    results = asyncio.run(executor.parallel_tool_call(calls))
+
+    assert [r.call_id for r in results] == ["c0", "c1", "c2"]
+    assert reader.max_active > 1
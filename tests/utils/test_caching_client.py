@@ -0,0 +1,143 @@
+"""测试 CachingLLMClient 的缓存键规则和 JSON 序列化"""
+
+import asyncio
+
+from bi_agent.tools.base import ToolCall, ToolResult
+from bi_agent.utils.llm_clients.caching_client import CachingLLMClient
+from bi_agent.utils.llm_clients.llm_basics import (
+    MEMORY_CONTEXT_PREFIX,
+    LLMMessage,
+    LLMResponse,
+    LLMUsage,
+)
+
+
+class FakeLLMClient:
+    """记录调用次数的假 LLM 客户端"""
+
+    def __init__(self, model: str = "test-model", temperature: float = 0.0):
+        self.model = model
+        self.temperature = temperature
+        self.calls = 0
+
+    async def chat(self, messages, tools=None) -> LLMResponse:
+        self.calls += 1
+        return LLMResponse(
+            content=f"响应 {self.calls}",
+            usage=LLMUsage(input_tokens=100, output_tokens=20, reasoning_tokens=5),
+            model=self.model,
+            finish_reason="tool_calls",
+            tool_calls=[
+                ToolCall(
+                    name="python_executor",
+                    call_id=f"call-{self.calls}",
+                    arguments={"code": "print(1)", "options": {"timeout": 30, "files": ["a.csv"]}},
+                )
+            ],
+        )
+
+
+def _messages(*extra: LLMMessage) -> list[LLMMessage]:
+    return [
+        LLMMessage(role="system", content="你是数据分析助手"),
+        LLMMessage(role="user", content="数据分析任务：统计销售额"),
+        *extra,
+    ]
+
+
+def _chat(client: CachingLLMClient, messages, tools=None) -> LLMResponse:
+    return asyncio.run(client.chat(messages, tools=tools))
+
+
+def test_hit_round_trips_response_and_marks_usage():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner)
+
+    first = _chat(client, _messages())
+    second = _chat(client, _messages())
+
+    assert inner.calls == 1
+    assert second.content == first.content
+    assert second.model == first.model
+    assert second.finish_reason == first.finish_reason
+    assert second.tool_calls == first.tool_calls
+    assert isinstance(second.tool_calls[0], ToolCall)
+    assert second.tool_calls[0].arguments["options"] == {"timeout": 30, "files": ["a.csv"]}
+    assert second.usage == LLMUsage(input_tokens=0, output_tokens=0, cache_read_input_tokens=100)
+    # 首次请求的用量不受影响
+    assert first.usage.input_tokens == 100
+
+
+def test_hits_are_independent_copies():
+    client = CachingLLMClient(FakeLLMClient())
+    _chat(client, _messages())
+
+    hit = _chat(client, _messages())
+    hit.tool_calls[0].arguments["code"] = "被修改"
+
+    assert _chat(client, _messages()).tool_calls[0].arguments["code"] == "print(1)"
+
+
+def test_memory_messages_are_excluded_from_key():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner)
+    _chat(client, _messages(LLMMessage(role="user", content=MEMORY_CONTEXT_PREFIX + "\n记忆 A")))
+
+    _chat(client, _messages(LLMMessage(role="user", content=MEMORY_CONTEXT_PREFIX + "\n记忆 B")))
+    _chat(client, _messages())
+
+    assert inner.calls == 1
+
+
+def test_message_content_and_tool_results_are_part_of_key():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner)
+    succeeded = ToolResult(call_id="c1", name="bash", success=True, result="ok")
+    failed = ToolResult(call_id="c1", name="bash", success=False, error="失败")
+    _chat(client, _messages())
+
+    _chat(client, _messages(LLMMessage(role="user", content="继续")))
+    _chat(client, _messages(LLMMessage(role="user", tool_result=succeeded)))
+    _chat(client, _messages(LLMMessage(role="user", tool_result=failed)))
+
+    assert inner.calls == 4
+
+
+def test_model_and_temperature_are_part_of_key():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner)
+    _chat(client, _messages())
+
+    inner.model = "other-model"
+    _chat(client, _messages())
+    inner.temperature = 0.7
+    _chat(client, _messages())
+
+    assert inner.calls == 3
+
+
+def test_undecodable_entry_is_a_miss():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner)
+    _chat(client, _messages())
+    key = next(iter(client._cache))
+    client._cache[key] = b"\x80\x04not json"
+
+    response = _chat(client, _messages())
+
+    assert inner.calls == 2
+    assert response.content == "响应 2"
+    # 重新请求后写回了可解析的缓存
+    assert _chat(client, _messages()).content == "响应 2"
+    assert inner.calls == 2
+
+
+def test_lru_evicts_oldest_entry():
+    inner = FakeLLMClient()
+    client = CachingLLMClient(inner, max_entries=1)
+    _chat(client, _messages(LLMMessage(role="user", content="A")))
+    _chat(client, _messages(LLMMessage(role="user", content="B")))
+
+    _chat(client, _messages(LLMMessage(role="user", content="A")))
+
+    assert inner.calls == 3
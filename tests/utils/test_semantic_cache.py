@@ -0,0 +1,156 @@
+"""测试语义任务缓存的命中与失效规则"""
+
+import os
+
+import numpy as np
+import pytest
+
+from bi_agent.utils.semantic_cache import SemanticTaskCache
+
+TASK = "分析 2024 年的销售数据"
+REPHRASED = "帮我分析一下 2024 年的销售"
+OTHER = "统计用户留存"
+
+_VECTORS = {
+    TASK: [1.0, 0.0, 0.0],
+    REPHRASED: [0.99, 0.1, 0.0],
+    OTHER: [0.0, 0.0, 1.0],
+}
+
+
+def _embed(text: str) -> np.ndarray:
+    return np.asarray(_VECTORS[text], dtype=np.float32)
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    data_dir = tmp_path / "data"
+    output_dir = tmp_path / "output"
+    data_dir.mkdir()
+    output_dir.mkdir()
+    (data_dir / "sales.csv").write_text("month,amount\n1,100\n", encoding="utf-8")
+    report = output_dir / "report.md"
+    report.write_text("# 销售分析\n", encoding="utf-8")
+    return data_dir, output_dir, report
+
+
+def _cache(**kwargs) -> SemanticTaskCache:
+    return SemanticTaskCache(embedding_fn=_embed, **kwargs)
+
+
+def test_rephrased_task_hits_and_replays_reports(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    hit = cache.lookup(REPHRASED, str(data_dir), str(output_dir))
+
+    assert hit is not None
+    assert hit.final_result == "结果"
+    assert hit.report_paths == [str(report)]
+    assert cache.lookup(OTHER, str(data_dir), str(output_dir)) is None
+
+
+def test_different_directories_miss(dirs, tmp_path):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    assert cache.lookup(TASK, str(tmp_path / "other"), str(output_dir)) is None
+    assert cache.lookup(TASK, str(data_dir), str(tmp_path / "other")) is None
+
+
+def test_missing_report_is_a_miss(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    report.unlink()
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+
+def test_report_outside_output_dir_is_tracked(dirs, tmp_path):
+    data_dir, output_dir, _ = dirs
+    external = tmp_path / "external.md"
+    external.write_text("# 外部报告\n", encoding="utf-8")
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(external)])
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is not None
+
+    external.unlink()
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+
+def test_modified_output_file_is_a_miss(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    report.write_text("# 被覆盖的报告\n", encoding="utf-8")
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+
+def test_new_output_file_does_not_invalidate(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    (output_dir / "other.md").write_text("# 其他任务\n", encoding="utf-8")
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is not None
+
+
+def test_data_changes_are_a_miss(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    (data_dir / "new.csv").write_text("a\n1\n", encoding="utf-8")
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+    (data_dir / "new.csv").unlink()
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is not None
+
+    sales = data_dir / "sales.csv"
+    stat = sales.stat()
+    os.utime(sales, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+
+def test_output_dir_inside_data_dir_is_not_counted_as_data(tmp_path):
+    data_dir = tmp_path / "user"
+    output_dir = data_dir / "output"
+    output_dir.mkdir(parents=True)
+    (data_dir / "sales.csv").write_text("a\n1\n", encoding="utf-8")
+    cache = _cache()
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir))
+
+    (output_dir / "later.md").write_text("# 之后的报告\n", encoding="utf-8")
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is not None
+
+
+def test_expired_entries_miss(dirs):
+    data_dir, output_dir, report = dirs
+    cache = _cache(ttl=60)
+    cache.insert(TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)])
+
+    cache._entries[0].created_at -= 120
+
+    assert cache.lookup(TASK, str(data_dir), str(output_dir)) is None
+
+
+def test_entries_reload_from_disk(dirs, tmp_path):
+    data_dir, output_dir, report = dirs
+    cache_dir = tmp_path / "cache"
+    _cache(cache_dir=str(cache_dir)).insert(
+        TASK, "结果", str(data_dir), str(output_dir), report_paths=[str(report)]
+    )
+
+    hit = _cache(cache_dir=str(cache_dir)).lookup(REPHRASED, str(data_dir), str(output_dir))
+
+    assert hit is not None
+    assert hit.report_paths == [str(report)]